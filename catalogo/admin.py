@@ -1,6 +1,5 @@
 from django.contrib import admin
 
-# El módulo de catálogo no tiene modelos propios.
-# Utiliza los modelos de la app 'productos' en modo solo lectura.
+# El catálogo solo tiene modelos derivados de las ventas (ranking de más
+# vendidos), que se mantienen desde RankingProductoService y no se editan a mano.
 # La administración de productos se realiza desde la app 'productos'.
-
@@ -0,0 +1,26 @@
+"""
+Rearma las ventanas de 7 y 30 días del ranking de más vendidos a partir de los
+totales diarios por producto, descontando los días que salieron de cada
+ventana. Se programa una vez por día, poco después de medianoche.
+
+Uso:
+    python manage.py recalcular_mas_vendidos
+    python manage.py recalcular_mas_vendidos --fecha 2025-03-31   # ventanas que terminan ese día
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from catalogo.service_ranking import RankingProductoService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el ranking de productos más vendidos (últimos 7 y 30 días)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat,
+                            help='Último día de las ventanas (YYYY-MM-DD); por defecto hoy')
+
+    def handle(self, *args, **options):
+        productos = RankingProductoService.recalcular(options['fecha'])
+        self.stdout.write(f'Ranking de más vendidos recalculado: {productos} productos con ventas')
@@ -0,0 +1,31 @@
+"""
+Recalcula el puntaje de tendencia de los productos (vistas recientes del
+detalle, con más peso cuanto más nuevas) que ordena los productos destacados.
+Los destacados y su cache solo cambian cuando corre este comando.
+
+Uso:
+    python manage.py recalcular_tendencias                  # una pasada
+    python manage.py recalcular_tendencias --intervalo 900    # en bucle, cada 15 min
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalogo.service_vistas import VistasProductoService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el puntaje de tendencia que ordena los productos destacados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Segundos entre pasadas; 0 ejecuta una sola pasada')
+
+    def handle(self, *args, **options):
+        while True:
+            productos = VistasProductoService.recalcular_tendencias()
+            self.stdout.write(f'Tendencias recalculadas: {productos} productos con vistas')
+
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,52 @@
+"""
+Reconstruye los totales diarios de ventas por producto (tabla
+venta_producto_diaria) a partir del historial de ventas y luego recalcula el
+ranking de más vendidos. Se usa una vez al desplegar el ranking o para
+corregir un rango de fechas.
+
+Uso:
+    python manage.py reconstruir_ventas_producto                          # todo el historial
+    python manage.py reconstruir_ventas_producto --desde 2025-01-01 --hasta 2025-03-31
+
+Cada tramo de días se recalcula en su propia transacción; conviene correrlo
+con poco tráfico, porque una venta creada durante el tramo del día actual
+puede chocar con las filas que se están reinsertando.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalogo.service_ranking import RankingProductoService
+from ventas.services.service_resumen import ResumenVentaService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las ventas diarias por producto desde el historial y recalcula el ranking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat,
+                            help='Primer día (YYYY-MM-DD); por defecto el de la primera venta')
+        parser.add_argument('--hasta', type=date.fromisoformat,
+                            help='Último día (YYYY-MM-DD); por defecto el de la última venta')
+        parser.add_argument('--dias-por-lote', type=int, default=31,
+                            help='Días recalculados por transacción')
+
+    def handle(self, *args, **options):
+        primera, ultima = ResumenVentaService.rango_historico()
+        desde = options['desde'] or primera
+        hasta = options['hasta'] or ultima
+        if desde is None:
+            self.stdout.write('No hay ventas para reconstruir')
+            return
+        if desde > hasta:
+            raise CommandError("'--desde' no puede ser posterior a '--hasta'")
+
+        total = 0
+        for inicio, fin in ResumenVentaService.tramos(desde, hasta, options['dias_por_lote']):
+            filas = RankingProductoService.reconstruir(inicio, fin)
+            total += filas
+            self.stdout.write(f'{inicio} a {fin}: {filas} filas por producto y día')
+
+        self.stdout.write(f'Ventas por producto reconstruidas: {total} filas')
+        productos = RankingProductoService.recalcular()
+        self.stdout.write(f'Ranking de más vendidos recalculado: {productos} productos con ventas')
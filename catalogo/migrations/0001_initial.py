@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('productos', '0002_producto_stock_reservado_reservastock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingProducto',
+            fields=[
+                ('idRanking', models.AutoField(primary_key=True, serialize=False)),
+                ('unidades_7d', models.IntegerField(default=0)),
+                ('ingresos_7d', models.FloatField(default=0.0)),
+                ('unidades_30d', models.IntegerField(default=0)),
+                ('ingresos_30d', models.FloatField(default=0.0)),
+                ('fecha_calculo', models.DateField(blank=True, null=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Ranking de Producto',
+                'verbose_name_plural': 'Ranking de Productos',
+                'db_table': 'ranking_producto',
+                'ordering': ['-unidades_30d'],
+                'indexes': [models.Index(fields=['-unidades_30d'], name='ranking_producto_30d_idx'), models.Index(fields=['-unidades_7d'], name='ranking_producto_7d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaProductoDiaria',
+            fields=[
+                ('idVentaProducto', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('unidades', models.IntegerField(default=0)),
+                ('ingresos', models.FloatField(default=0.0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria de Producto',
+                'verbose_name_plural': 'Ventas Diarias de Productos',
+                'db_table': 'venta_producto_diaria',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='venta_producto_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='venta_producto_diaria_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0001_initial'),
+        ('productos', '0002_producto_stock_reservado_reservastock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TendenciaProducto',
+            fields=[
+                ('idTendencia', models.AutoField(primary_key=True, serialize=False)),
+                ('puntaje', models.FloatField(default=0.0)),
+                ('vistas_7d', models.IntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField()),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tendencia', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Tendencia de Producto',
+                'verbose_name_plural': 'Tendencias de Productos',
+                'db_table': 'tendencia_producto',
+                'ordering': ['-puntaje'],
+                'indexes': [models.Index(fields=['-puntaje'], name='tendencia_producto_puntaje_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VistaProductoDiaria',
+            fields=[
+                ('idVistaProducto', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('vistas', models.IntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vistas_diarias', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Vistas Diarias de Producto',
+                'verbose_name_plural': 'Vistas Diarias de Productos',
+                'db_table': 'vista_producto_diaria',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='vista_producto_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='vista_producto_diaria_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:04
+
+from django.db import migrations, models
+
+
+def crear_version(apps, schema_editor):
+    apps.get_model('catalogo', 'VersionCatalogo').objects.get_or_create(idVersion=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0002_tendenciaproducto_vistaproductodiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('idVersion', models.AutoField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Versión del Catálogo',
+                'verbose_name_plural': 'Versión del Catálogo',
+                'db_table': 'version_catalogo',
+            },
+        ),
+        migrations.RunPython(crear_version, migrations.RunPython.noop),
+    ]
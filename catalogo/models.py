@@ -1,3 +1,127 @@
 from django.db import models
 
-# Create your models here.
+
+class VentaProductoDiaria(models.Model):
+    """
+    Unidades e ingresos vendidos de cada producto por día, actualizados de
+    forma incremental al crear cada venta (base del ranking de más vendidos).
+    """
+    idVentaProducto = models.AutoField(primary_key=True)
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='ventas_diarias')
+    fecha = models.DateField()
+    unidades = models.IntegerField(default=0)
+    ingresos = models.FloatField(default=0.0)
+
+    class Meta:
+        db_table = 'venta_producto_diaria'
+        verbose_name = 'Venta Diaria de Producto'
+        verbose_name_plural = 'Ventas Diarias de Productos'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='venta_producto_diaria_uniq'),
+        ]
+        indexes = [
+            # Recalcular las ventanas de 7 y 30 días recorre solo los días recientes
+            models.Index(fields=['fecha'], name='venta_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.producto_id} - {self.fecha}: {self.unidades} u.'
+
+
+class RankingProducto(models.Model):
+    """
+    Ventas de los últimos 7 y 30 días por producto. Cada venta suma sus
+    unidades al crearse; el comando recalcular_mas_vendidos (diario) descuenta
+    los días que salen de las ventanas.
+    """
+    idRanking = models.AutoField(primary_key=True)
+    producto = models.OneToOneField('productos.Producto', on_delete=models.CASCADE, related_name='ranking')
+    unidades_7d = models.IntegerField(default=0)
+    ingresos_7d = models.FloatField(default=0.0)
+    unidades_30d = models.IntegerField(default=0)
+    ingresos_30d = models.FloatField(default=0.0)
+    fecha_calculo = models.DateField(blank=True, null=True)  # Último recálculo completo de las ventanas
+
+    class Meta:
+        db_table = 'ranking_producto'
+        verbose_name = 'Ranking de Producto'
+        verbose_name_plural = 'Ranking de Productos'
+        ordering = ['-unidades_30d']
+        indexes = [
+            models.Index(fields=['-unidades_30d'], name='ranking_producto_30d_idx'),
+            models.Index(fields=['-unidades_7d'], name='ranking_producto_7d_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.producto_id}: {self.unidades_7d} u. (7d) / {self.unidades_30d} u. (30d)'
+
+
+class VistaProductoDiaria(models.Model):
+    """
+    Vistas del detalle de cada producto por día. Cada proceso web las acumula
+    en memoria y las vuelca por lotes (ver catalogo/service_vistas.py).
+    """
+    idVistaProducto = models.AutoField(primary_key=True)
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='vistas_diarias')
+    fecha = models.DateField()
+    vistas = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'vista_producto_diaria'
+        verbose_name = 'Vistas Diarias de Producto'
+        verbose_name_plural = 'Vistas Diarias de Productos'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='vista_producto_diaria_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='vista_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.producto_id} - {self.fecha}: {self.vistas} vistas'
+
+
+class TendenciaProducto(models.Model):
+    """
+    Puntaje de tendencia por producto: vistas de los últimos días con más peso
+    cuanto más recientes. Lo recalcula periódicamente el comando
+    recalcular_tendencias y ordena los productos destacados.
+    """
+    idTendencia = models.AutoField(primary_key=True)
+    producto = models.OneToOneField('productos.Producto', on_delete=models.CASCADE, related_name='tendencia')
+    puntaje = models.FloatField(default=0.0)
+    vistas_7d = models.IntegerField(default=0)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        db_table = 'tendencia_producto'
+        verbose_name = 'Tendencia de Producto'
+        verbose_name_plural = 'Tendencias de Productos'
+        ordering = ['-puntaje']
+        indexes = [
+            models.Index(fields=['-puntaje'], name='tendencia_producto_puntaje_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.producto_id}: {self.puntaje:.2f}'
+
+
+class VersionCatalogo(models.Model):
+    """
+    Versión global del catálogo público (una sola fila). Se incrementa al
+    confirmarse cualquier cambio de productos, categorías o stock, desde
+    cualquier proceso; es parte de la clave del cache de respuestas y el ETag
+    de los listados (ver catalogo/service_cache.py).
+    """
+    idVersion = models.AutoField(primary_key=True)
+    version = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'version_catalogo'
+        verbose_name = 'Versión del Catálogo'
+        verbose_name_plural = 'Versión del Catálogo'
+
+    def __str__(self):
+        return f'Catálogo v{self.version}'
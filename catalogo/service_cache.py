@@ -0,0 +1,93 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework import status
+from .models import VersionCatalogo
+
+
+class CacheCatalogoService:
+    """
+    Cache de respuestas del catálogo público.
+
+    Cada respuesta se guarda bajo una clave con el endpoint, sus parámetros y
+    la versión global del catálogo. Cualquier cambio de productos, categorías
+    o stock incrementa la versión (ver catalogo/signals.py), así las entradas
+    anteriores dejan de leerse y vencen solas por su TTL, sin tener que
+    buscarlas y borrarlas.
+
+    La versión vive en la base (tabla version_catalogo) y no en el cache: el
+    cache puede ser local de cada proceso, y los cambios de stock también los
+    hacen otros procesos (workers de webhooks, comandos programados).
+    """
+
+    ID_VERSION = 1
+    CLAVE_ACIERTOS = 'catalogo:cache:aciertos'
+    CLAVE_FALLOS = 'catalogo:cache:fallos'
+
+    @staticmethod
+    def version():
+        """Versión vigente del catálogo (lectura por clave primaria)"""
+        return VersionCatalogo.objects.filter(
+            idVersion=CacheCatalogoService.ID_VERSION
+        ).values_list('version', flat=True).first() or 0
+
+    @staticmethod
+    def invalidar():
+        """
+        Incrementa la versión del catálogo cuando la transacción en curso se
+        confirma (o de inmediato si no hay una), así nadie vuelve a guardar
+        datos anteriores al cambio bajo la versión nueva, y los incrementos
+        siguen el orden de confirmación de los cambios.
+        """
+        def incrementar():
+            actualizadas = VersionCatalogo.objects.filter(
+                idVersion=CacheCatalogoService.ID_VERSION
+            ).update(version=F('version') + 1)
+            if not actualizadas:
+                VersionCatalogo.objects.get_or_create(idVersion=CacheCatalogoService.ID_VERSION)
+        transaction.on_commit(incrementar)
+
+    @staticmethod
+    def _contar(clave):
+        cache.add(clave, 0, timeout=None)
+        cache.incr(clave)
+
+    @staticmethod
+    def obtener(endpoint, generar, *parametros):
+        """
+        Respuesta cacheada de `generar(*parametros)`, una función de
+        CatalogoService que retorna (success, data, status_code). Solo se
+        guardan las respuestas exitosas.
+        """
+        firma = hashlib.sha1(repr(parametros).encode()).hexdigest()[:16]
+        clave = f'catalogo:v{CacheCatalogoService.version()}:{endpoint}:{firma}'
+
+        data = cache.get(clave)
+        if data is not None:
+            CacheCatalogoService._contar(CacheCatalogoService.CLAVE_ACIERTOS)
+            return True, data, status.HTTP_200_OK
+
+        CacheCatalogoService._contar(CacheCatalogoService.CLAVE_FALLOS)
+        success, data, status_code = generar(*parametros)
+        if success:
+            cache.set(clave, data, settings.CATALOGO_CACHE_SEGUNDOS)
+        return success, data, status_code
+
+    @staticmethod
+    def obtener_metricas():
+        """Aciertos, fallos y tasa de aciertos del cache del catálogo (solo para administrador)"""
+        try:
+            valores = cache.get_many([CacheCatalogoService.CLAVE_ACIERTOS, CacheCatalogoService.CLAVE_FALLOS])
+            aciertos = valores.get(CacheCatalogoService.CLAVE_ACIERTOS, 0)
+            fallos = valores.get(CacheCatalogoService.CLAVE_FALLOS, 0)
+            return True, {
+                "version": CacheCatalogoService.version(),
+                "aciertos": aciertos,
+                "fallos": fallos,
+                "tasa_aciertos": round(aciertos / (aciertos + fallos), 4) if aciertos + fallos else 0.0,
+                "ttl_segundos": settings.CATALOGO_CACHE_SEGUNDOS
+            }, status.HTTP_200_OK
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1,12 +1,34 @@
 from productos.models import Producto, Categoria
 from productos.serializers import ProductoDetailSerializer, CategoriaSerializer
+from productos.services.services_busqueda import BusquedaProductoService
+from .models import RankingProducto, TendenciaProducto
+from .service_cache import CacheCatalogoService
+from .service_vistas import VistasProductoService
 from rest_framework import status
-from django.db.models import Q
+from django.db.models import F
 
 
 class CatalogoService:
     """Servicio para manejar la lógica de negocio del catálogo público"""
     
+    @staticmethod
+    def validador(request, *args, **kwargs):
+        """
+        Validador del GET condicional de los listados: la versión global del
+        catálogo, que se incrementa al confirmarse cualquier cambio de
+        productos, categorías, stock, ranking o destacados. Sigue el orden de
+        confirmación, a diferencia de max(fecha_modificacion), que una
+        transacción larga puede confirmar con una fecha anterior a la vigente.
+        """
+        return (CacheCatalogoService.version(),)
+    
+    @staticmethod
+    def validador_producto(request, id_producto):
+        """Validador del GET condicional del detalle de un producto (None si no existe)"""
+        return Producto.objects.filter(idProducto=id_producto).values_list(
+            'fecha_modificacion', 'categoria__fecha_modificacion'
+        ).first()
+    
     @staticmethod
     def listar_productos(categoria_id=None):
         """
@@ -14,8 +36,8 @@ class CatalogoService:
         Opcionalmente filtra por categoría si se proporciona categoria_id.
         """
         try:
-            # Filtrar solo productos con stock disponible
-            productos = Producto.objects.select_related('categoria').filter(stock__gt=0)
+            # Filtrar solo productos con stock disponible (stock - reservas activas)
+            productos = Producto.objects.select_related('categoria').filter(stock__gt=F('stock_reservado'))
             
             # Filtrar por categoría si se proporciona
             if categoria_id:
@@ -36,7 +58,7 @@ class CatalogoService:
         try:
             producto = Producto.objects.select_related('categoria').get(
                 idProducto=id_producto,
-                stock__gt=0  # Solo mostrar si tiene stock
+                stock__gt=F('stock_reservado')  # Solo mostrar si tiene stock disponible
             )
             serializer = ProductoDetailSerializer(producto)
             return True, serializer.data, status.HTTP_200_OK
@@ -45,13 +67,25 @@ class CatalogoService:
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def buscar_productos(q, pagina=None, por_pagina=None):
+        """
+        Busca productos con stock disponible por nombre, categoría y
+        descripción, ordenados por relevancia y paginados.
+        """
+        params = {'q': q, 'pagina': pagina, 'por_pagina': por_pagina}
+        return BusquedaProductoService.buscar(
+            {campo: valor for campo, valor in params.items() if valor is not None},
+            Producto.objects.filter(stock__gt=F('stock_reservado'))
+        )
+    
     @staticmethod
     def listar_categorias():
         """Lista todas las categorías que tienen productos con stock"""
         try:
             # Solo mostrar categorías que tengan productos con stock
             categorias = Categoria.objects.filter(
-                productos__stock__gt=0
+                productos__stock__gt=F('productos__stock_reservado')
             ).distinct()
             
             serializer = CategoriaSerializer(categorias, many=True)
@@ -63,12 +97,24 @@ class CatalogoService:
     def productos_destacados():
         """
         Retorna productos destacados.
-        Criterio: Productos con mayor stock (asumiendo que son los más populares)
+        Criterio: Puntaje de tendencia por vistas recientes del detalle (ver
+        VistasProductoService); si hay menos de 10 productos en tendencia se
+        completa con los de mayor stock.
         """
         try:
-            productos = Producto.objects.select_related('categoria').filter(
-                stock__gt=0
-            ).order_by('-stock')[:10]  # Top 10 productos con más stock
+            limite = VistasProductoService.LIMITE_DESTACADOS
+            tendencias = TendenciaProducto.objects.select_related('producto__categoria').filter(
+                producto__stock__gt=F('producto__stock_reservado'),
+                puntaje__gt=0
+            ).order_by('-puntaje')[:limite]
+            productos = [fila.producto for fila in tendencias]
+
+            if len(productos) < limite:
+                productos += Producto.objects.select_related('categoria').filter(
+                    stock__gt=F('stock_reservado')
+                ).exclude(
+                    idProducto__in=[producto.idProducto for producto in productos]
+                ).order_by('-stock')[:limite - len(productos)]
             
             serializer = ProductoDetailSerializer(productos, many=True)
             return True, serializer.data, status.HTTP_200_OK
@@ -83,7 +129,7 @@ class CatalogoService:
         """
         try:
             productos = Producto.objects.select_related('categoria').filter(
-                stock__gt=0
+                stock__gt=F('stock_reservado')
             ).order_by('-fecha_creacion')[:10]  # Últimos 10 productos creados
             
             serializer = ProductoDetailSerializer(productos, many=True)
@@ -92,19 +138,24 @@ class CatalogoService:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
     @staticmethod
-    def productos_mas_vendidos():
+    def productos_mas_vendidos(dias=None):
         """
         Retorna los productos más vendidos.
-        Criterio: Productos con menor stock (asumiendo que han vendido más)
-        pero que aún tengan stock disponible.
+        Criterio: Unidades vendidas en los últimos 30 días (o 7 con ?dias=7),
+        leídas del ranking precalculado (ver RankingProductoService), solo
+        productos con stock disponible.
         """
         try:
-            productos = Producto.objects.select_related('categoria').filter(
-                stock__gt=0,
-                stock__lte=20  # Productos con stock bajo (han vendido más)
-            ).order_by('stock')[:10]  # Ordenar por menor stock primero
+            campo = {None: 'unidades_30d', '30': 'unidades_30d', '7': 'unidades_7d'}.get(dias)
+            if campo is None:
+                return False, {"error": "El parámetro 'dias' debe ser 7 o 30"}, status.HTTP_400_BAD_REQUEST
+
+            ranking = RankingProducto.objects.select_related('producto__categoria').filter(
+                producto__stock__gt=F('producto__stock_reservado'),
+                **{f'{campo}__gt': 0}
+            ).order_by(f'-{campo}')[:10]  # Top 10 por el índice de la ventana pedida
             
-            serializer = ProductoDetailSerializer(productos, many=True)
+            serializer = ProductoDetailSerializer([fila.producto for fila in ranking], many=True)
             return True, serializer.data, status.HTTP_200_OK
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -0,0 +1,132 @@
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Sum, Q, Exists, OuterRef
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from si2Backend.db import upsert, upsert_incremental
+from ventas.models import DetalleVenta
+from .models import VentaProductoDiaria, RankingProducto
+from .service_cache import CacheCatalogoService
+
+
+class RankingProductoService:
+    """
+    Ranking de productos más vendidos (tablas venta_producto_diaria y
+    ranking_producto).
+
+    Cada venta suma sus unidades e ingresos por producto al día de la venta y
+    a las ventanas de 7 y 30 días del ranking con upserts incrementales. Un
+    recálculo diario (comando recalcular_mas_vendidos) rearma las ventanas
+    desde los totales diarios para descontar los días que ya salieron.
+    """
+
+    LOTE_RECALCULO = 1000
+
+    @staticmethod
+    def registrar_venta(venta, detalles):
+        """
+        Suma las líneas de una venta recién creada a los totales diarios y al
+        ranking. Debe llamarse dentro de la transacción que crea la venta.
+        """
+        por_producto = {}
+        for detalle in detalles:
+            fila = por_producto.setdefault(detalle.producto_id, {'unidades': 0, 'ingresos': 0.0})
+            fila['unidades'] += detalle.cantidad
+            fila['ingresos'] += detalle.subtotal
+
+        fecha = timezone.localdate(venta.fecha_venta)
+        upsert_incremental(
+            VentaProductoDiaria,
+            [{'producto': producto, 'fecha': fecha, **fila} for producto, fila in por_producto.items()],
+            claves=['producto', 'fecha'],
+            incrementos=['unidades', 'ingresos']
+        )
+        upsert_incremental(
+            RankingProducto,
+            [
+                {
+                    'producto': producto,
+                    'unidades_7d': fila['unidades'], 'ingresos_7d': fila['ingresos'],
+                    'unidades_30d': fila['unidades'], 'ingresos_30d': fila['ingresos'],
+                }
+                for producto, fila in por_producto.items()
+            ],
+            claves=['producto'],
+            incrementos=['unidades_7d', 'ingresos_7d', 'unidades_30d', 'ingresos_30d']
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def recalcular(hoy=None):
+        """
+        Rearma el ranking con las ventas de los últimos 7 y 30 días (incluido
+        `hoy`) leídas de los totales diarios: un GROUP BY sobre a lo sumo 30
+        días, un INSERT ... ON CONFLICT DO UPDATE por lotes con los valores
+        absolutos y un DELETE de los productos sin ventas en la ventana.
+        Retorna la cantidad de productos con ventas.
+        """
+        hoy = hoy or timezone.localdate()
+        desde_7d = hoy - timedelta(days=6)
+        desde_30d = hoy - timedelta(days=29)
+
+        ventanas = VentaProductoDiaria.objects.filter(
+            fecha__gte=desde_30d, fecha__lte=hoy
+        ).values('producto').annotate(
+            unidades_7d=Sum('unidades', filter=Q(fecha__gte=desde_7d), default=0),
+            ingresos_7d=Sum('ingresos', filter=Q(fecha__gte=desde_7d), default=0.0),
+            unidades_30d=Sum('unidades'),
+            ingresos_30d=Sum('ingresos')
+        ).order_by()
+
+        ranking = [{**fila, 'fecha_calculo': hoy} for fila in ventanas]
+        for inicio in range(0, len(ranking), RankingProductoService.LOTE_RECALCULO):
+            upsert(
+                RankingProducto,
+                ranking[inicio:inicio + RankingProductoService.LOTE_RECALCULO],
+                claves=['producto'],
+                campos=['unidades_7d', 'ingresos_7d', 'unidades_30d', 'ingresos_30d', 'fecha_calculo']
+            )
+
+        # Solo salen del ranking los productos sin ventas en la ventana; el
+        # NOT EXISTS se evalúa al borrar, así no se pierde la fila de una
+        # venta confirmada mientras se recalculaba
+        RankingProducto.objects.filter(
+            ~Exists(VentaProductoDiaria.objects.filter(
+                producto=OuterRef('producto'), fecha__gte=desde_30d, fecha__lte=hoy
+            ))
+        ).delete()
+        CacheCatalogoService.invalidar()
+        return len(ranking)
+
+    @staticmethod
+    @transaction.atomic
+    def reconstruir(desde, hasta):
+        """
+        Recalcula desde cero los totales diarios por producto de los días
+        [desde, hasta] a partir de las líneas de venta guardadas.
+        Retorna la cantidad de filas generadas.
+        """
+        VentaProductoDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+
+        # Límites como instantes para que el filtro use el índice de fecha_venta
+        inicio = timezone.make_aware(datetime.combine(desde, time.min))
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+        detalles = DetalleVenta.objects.filter(
+            venta__fecha_venta__gte=inicio, venta__fecha_venta__lt=fin
+        ).annotate(fecha=TruncDate('venta__fecha_venta')).values('fecha', 'producto').annotate(
+            unidades=Sum('cantidad'),
+            ingresos=Sum('subtotal')
+        ).order_by()
+
+        filas = [
+            VentaProductoDiaria(
+                producto_id=fila['producto'],
+                fecha=fila['fecha'],
+                unidades=fila['unidades'],
+                ingresos=fila['ingresos']
+            )
+            for fila in detalles
+        ]
+        VentaProductoDiaria.objects.bulk_create(filas, batch_size=1000)
+        return len(filas)
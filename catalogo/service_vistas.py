@@ -0,0 +1,158 @@
+import atexit
+import os
+import threading
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import Sum, Q, F, Case, When, Value, FloatField, ExpressionWrapper
+from django.utils import timezone
+from productos.models import Producto
+from si2Backend.db import upsert_incremental
+from .models import VistaProductoDiaria, TendenciaProducto
+from .service_cache import CacheCatalogoService
+
+
+class ContadorVistas:
+    """
+    Vistas del detalle de productos acumuladas en memoria del proceso, por
+    producto y día, en lugar de un UPDATE por vista. Un hilo daemon (uno por
+    proceso, iniciado con la primera vista) las vuelca con un solo upsert cada
+    CATALOGO_VISTAS_VOLCADO_SEGUNDOS, fuera de las requests; al terminar el
+    proceso se intenta un último volcado (atexit no corre si el proceso muere
+    con SIGKILL, así que a lo sumo se pierde un intervalo).
+    """
+
+    def __init__(self):
+        self._vistas = Counter()
+        self._candado = threading.Lock()
+        self._pid_hilo = None
+        self._detener = threading.Event()
+
+    def registrar(self, id_producto):
+        with self._candado:
+            self._vistas[(id_producto, timezone.localdate())] += 1
+            # Por PID: un worker creado con fork no hereda el hilo del proceso padre
+            if self._pid_hilo != os.getpid():
+                self._pid_hilo = os.getpid()
+                threading.Thread(target=self._volcar_periodicamente, name='volcado-vistas', daemon=True).start()
+
+    def _volcar_periodicamente(self):
+        while not self._detener.wait(settings.CATALOGO_VISTAS_VOLCADO_SEGUNDOS):
+            # El hilo no pasa por el ciclo de requests: descartar conexiones vencidas o caídas
+            close_old_connections()
+            self.volcar()
+
+    def pendientes(self):
+        """Vistas acumuladas todavía sin guardar"""
+        with self._candado:
+            return sum(self._vistas.values())
+
+    def volcar(self):
+        """Guarda las vistas acumuladas; si falla, vuelven al contador para el próximo volcado"""
+        with self._candado:
+            pendientes, self._vistas = self._vistas, Counter()
+        if not pendientes:
+            return 0
+        try:
+            return VistasProductoService.guardar(pendientes)
+        except Exception as e:
+            with self._candado:
+                self._vistas.update(pendientes)
+            print(f"⚠️ No se pudieron guardar las vistas de productos: {str(e)}")
+            return 0
+
+
+contador_vistas = ContadorVistas()
+atexit.register(contador_vistas.volcar)
+
+
+class VistasProductoService:
+    """
+    Vistas diarias por producto (tabla vista_producto_diaria) y puntaje de
+    tendencia (tabla tendencia_producto) que ordena los productos destacados.
+
+    El puntaje suma las vistas de los últimos DIAS días, cada día con la mitad
+    de peso cada VIDA_MEDIA_DIAS días de antigüedad.
+    """
+
+    DIAS = 14
+    VIDA_MEDIA_DIAS = 3
+    LIMITE_DESTACADOS = 10
+
+    @staticmethod
+    @transaction.atomic
+    def guardar(vistas):
+        """
+        Suma un Counter {(id_producto, fecha): vistas} a las vistas diarias
+        con upserts por lotes. Ignora productos que ya no existen.
+        """
+        existentes = set(Producto.objects.filter(
+            idProducto__in={id_producto for id_producto, _ in vistas}
+        ).values_list('idProducto', flat=True))
+        filas = [
+            {'producto': id_producto, 'fecha': fecha, 'vistas': cantidad}
+            for (id_producto, fecha), cantidad in vistas.items()
+            if id_producto in existentes
+        ]
+
+        total = 0
+        for inicio in range(0, len(filas), 1000):
+            total += upsert_incremental(
+                VistaProductoDiaria,
+                filas[inicio:inicio + 1000],
+                claves=['producto', 'fecha'],
+                incrementos=['vistas']
+            )
+        return total
+
+    @staticmethod
+    def ids_destacados():
+        """IDs de los productos en tendencia con stock disponible, en orden (una consulta indexada)"""
+        return list(TendenciaProducto.objects.filter(
+            producto__stock__gt=F('producto__stock_reservado'),
+            puntaje__gt=0
+        ).order_by('-puntaje').values_list('producto_id', flat=True)[:VistasProductoService.LIMITE_DESTACADOS])
+
+    @staticmethod
+    @transaction.atomic
+    def recalcular_tendencias(ahora=None):
+        """
+        Rearma los puntajes de tendencia desde las vistas diarias (un GROUP BY
+        sobre los últimos DIAS días y un INSERT por lotes). Invalida el cache
+        del catálogo solo si cambiaron los destacados.
+        Retorna la cantidad de productos con vistas.
+        """
+        ahora = ahora or timezone.now()
+        hoy = timezone.localdate(ahora)
+        peso = Case(
+            *[
+                When(fecha=hoy - timedelta(days=edad), then=Value(0.5 ** (edad / VistasProductoService.VIDA_MEDIA_DIAS)))
+                for edad in range(VistasProductoService.DIAS)
+            ],
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+
+        puntajes = VistaProductoDiaria.objects.filter(
+            fecha__gt=hoy - timedelta(days=VistasProductoService.DIAS), fecha__lte=hoy
+        ).values('producto').annotate(
+            puntaje=Sum(ExpressionWrapper(F('vistas') * peso, output_field=FloatField())),
+            vistas_7d=Sum('vistas', filter=Q(fecha__gt=hoy - timedelta(days=7)), default=0)
+        ).order_by()
+
+        tendencias = [
+            TendenciaProducto(
+                producto_id=fila['producto'],
+                puntaje=fila['puntaje'],
+                vistas_7d=fila['vistas_7d'],
+                fecha_calculo=ahora
+            )
+            for fila in puntajes
+        ]
+        anteriores = VistasProductoService.ids_destacados()
+        TendenciaProducto.objects.all().delete()
+        TendenciaProducto.objects.bulk_create(tendencias, batch_size=1000)
+        if VistasProductoService.ids_destacados() != anteriores:
+            CacheCatalogoService.invalidar()
+        return len(tendencias)
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from productos.models import Producto, Categoria
+from productos.signals import stock_modificado
+from .service_cache import CacheCatalogoService
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_por_modelo(sender, **kwargs):
+    """Alta, edición o baja de un producto o categoría"""
+    CacheCatalogoService.invalidar()
+
+
+@receiver(stock_modificado)
+def invalidar_por_stock(sender, **kwargs):
+    """Cambios de stock o de reservas hechos con UPDATE por InventarioService (no disparan post_save)"""
+    CacheCatalogoService.invalidar()
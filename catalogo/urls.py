@@ -2,10 +2,12 @@ from django.urls import path
 from .views import (
     CatalogoProductosListView,
     CatalogoProductoDetailView,
+    CatalogoProductosBuscarView,
     CatalogoCategoriasListView,
     CatalogoProductosDestacadosView,
     CatalogoProductosNuevosView,
     CatalogoProductosMasVendidosView,
+    CatalogoEstadisticasCacheView,
 )
 
 app_name = 'catalogo'
@@ -19,6 +21,9 @@ urlpatterns = [
     # GET /api/catalogo/productos/{id}/ - Obtener detalles de un producto
     path('productos/<int:id_producto>/', CatalogoProductoDetailView.as_view(), name='producto-detail'),
     
+    # GET /api/catalogo/productos/buscar/?q={texto}&pagina={n}&por_pagina={n} - Buscar productos por relevancia
+    path('productos/buscar/', CatalogoProductosBuscarView.as_view(), name='productos-buscar'),
+    
     # GET /api/catalogo/categorias/ - Listar todas las categorías
     path('categorias/', CatalogoCategoriasListView.as_view(), name='categorias-list'),
     
@@ -28,6 +33,11 @@ urlpatterns = [
     # GET /api/catalogo/productos/nuevos/ - Productos nuevos
     path('productos/nuevos/', CatalogoProductosNuevosView.as_view(), name='productos-nuevos'),
     
-    # GET /api/catalogo/productos/mas-vendidos/ - Productos más vendidos
+    # GET /api/catalogo/productos/mas-vendidos/ - Productos más vendidos (últimos 30 días)
+    # GET /api/catalogo/productos/mas-vendidos/?dias=7 - Más vendidos de los últimos 7 días
     path('productos/mas-vendidos/', CatalogoProductosMasVendidosView.as_view(), name='productos-mas-vendidos'),
+    
+    # ==================== ADMIN ====================
+    # GET /api/catalogo/admin/estadisticas/cache/ - Tasa de aciertos del cache del catálogo (Admin)
+    path('admin/estadisticas/cache/', CatalogoEstadisticasCacheView.as_view(), name='admin-estadisticas-cache'),
 ]
@@ -2,8 +2,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from .service_catalogo import CatalogoService
+from .service_cache import CacheCatalogoService
+from .service_vistas import contador_vistas
+from ventas.permissions import IsAdminUser
+from si2Backend.condicional import get_condicional
 
 
+@get_condicional(CatalogoService.validador)
 class CatalogoProductosListView(APIView):
     """
     Vista pública para listar productos del catálogo.
@@ -14,10 +19,13 @@ class CatalogoProductosListView(APIView):
     def get(self, request):
         """Lista todos los productos o filtra por categoría"""
         categoria_id = request.query_params.get('categoria', None)
-        success, data, status = CatalogoService.listar_productos(categoria_id)
+        success, data, status = CacheCatalogoService.obtener(
+            'productos', CatalogoService.listar_productos, categoria_id
+        )
         return Response(data, status=status)
 
 
+@get_condicional(CatalogoService.validador_producto)
 class CatalogoProductoDetailView(APIView):
     """Vista pública para obtener detalles de un producto"""
     permission_classes = [AllowAny]
@@ -26,44 +34,90 @@ class CatalogoProductoDetailView(APIView):
         """Obtiene un producto específico"""
         success, data, status = CatalogoService.obtener_producto(id_producto)
         return Response(data, status=status)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Aquí y no en get: las respuestas 304 no ejecutan get pero también son vistas
+        if request.method == 'GET' and response.status_code in (200, 304):
+            contador_vistas.registrar(kwargs['id_producto'])
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+@get_condicional(CatalogoService.validador)
+class CatalogoProductosBuscarView(APIView):
+    """
+    Vista pública para buscar productos del catálogo por relevancia.
+    Query params: ?q={texto}&pagina={n}&por_pagina={n}
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Busca productos con stock por nombre, categoría o descripción"""
+        success, data, status = CacheCatalogoService.obtener(
+            'buscar', CatalogoService.buscar_productos,
+            request.query_params.get('q', ''),
+            request.query_params.get('pagina'),
+            request.query_params.get('por_pagina')
+        )
+        return Response(data, status=status)
 
 
+@get_condicional(CatalogoService.validador)
 class CatalogoCategoriasListView(APIView):
     """Vista pública para listar categorías disponibles"""
     permission_classes = [AllowAny]
     
     def get(self, request):
         """Lista todas las categorías con productos disponibles"""
-        success, data, status = CatalogoService.listar_categorias()
+        success, data, status = CacheCatalogoService.obtener('categorias', CatalogoService.listar_categorias)
         return Response(data, status=status)
 
 
+@get_condicional(CatalogoService.validador)
 class CatalogoProductosDestacadosView(APIView):
     """Vista pública para productos destacados"""
     permission_classes = [AllowAny]
     
     def get(self, request):
         """Retorna productos destacados"""
-        success, data, status = CatalogoService.productos_destacados()
+        success, data, status = CacheCatalogoService.obtener('destacados', CatalogoService.productos_destacados)
         return Response(data, status=status)
 
 
+@get_condicional(CatalogoService.validador)
 class CatalogoProductosNuevosView(APIView):
     """Vista pública para productos nuevos"""
     permission_classes = [AllowAny]
     
     def get(self, request):
         """Retorna productos más recientes"""
-        success, data, status = CatalogoService.productos_nuevos()
+        success, data, status = CacheCatalogoService.obtener('nuevos', CatalogoService.productos_nuevos)
         return Response(data, status=status)
 
 
+@get_condicional(CatalogoService.validador)
 class CatalogoProductosMasVendidosView(APIView):
-    """Vista pública para productos más vendidos"""
+    """
+    Vista pública para productos más vendidos.
+    Permite elegir la ventana usando query param: ?dias=7|30 (por defecto 30)
+    """
     permission_classes = [AllowAny]
     
     def get(self, request):
         """Retorna productos más vendidos"""
-        success, data, status = CatalogoService.productos_mas_vendidos()
+        dias = request.query_params.get('dias', None)
+        success, data, status = CacheCatalogoService.obtener(
+            'mas-vendidos', CatalogoService.productos_mas_vendidos, dias
+        )
         return Response(data, status=status)
 
+
+
+class CatalogoEstadisticasCacheView(APIView):
+    """
+    GET /api/catalogo/admin/estadisticas/cache/ - Aciertos, fallos y versión del cache del catálogo
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        success, data, status = CacheCatalogoService.obtener_metricas()
+        return Response(data, status=status)
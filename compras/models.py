@@ -19,6 +19,12 @@ class Proveedor(models.Model):
     def __str__(self):
         return self.nombre
     
+class CompraQuerySet(models.QuerySet):
+    def con_cantidad_productos(self):
+        """Anota cantidad_productos (detalles de cada compra) calculado en SQL"""
+        return self.annotate(cantidad_productos=models.Count('detalles'))
+
+
 class Compra(models.Model):
     idCompra = models.AutoField(primary_key=True)
     proveedor = models.ForeignKey(Proveedor, on_delete=models.PROTECT, related_name='compras')
@@ -28,6 +34,8 @@ class Compra(models.Model):
     
     imagen = CloudinaryField('imagen', blank=True, null=True)
     
+    objects = CompraQuerySet.as_manager()
+    
     class Meta:
         db_table = 'compra'
         verbose_name = 'Compra'
@@ -69,6 +69,9 @@ class CompraSerializer(serializers.ModelSerializer):
         read_only_fields = ['idCompra', 'total', 'fecha_compra', 'fecha_modificacion']
     
     def get_cantidad_productos(self, obj):
+        # Anotado por Compra.objects.con_cantidad_productos()
+        if hasattr(obj, 'cantidad_productos'):
+            return obj.cantidad_productos
         return obj.detalles.count()
 
 
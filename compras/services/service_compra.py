@@ -1,12 +1,14 @@
 from django.db import transaction
 from compras.models import Compra, DetalleCompra, Proveedor
 from productos.models import Producto
+from productos.services.services_inventario import InventarioService
 from compras.serializers import (
     CompraSerializer, 
     CrearCompraSerializer,
     ActualizarImagenCompraSerializer
 )
 from rest_framework import status
+from integraciones import obtener_cloudinary, IntegracionNoDisponible
 
 
 class CompraService:
@@ -16,7 +18,7 @@ class CompraService:
     def listar_compras():
         """Lista todas las compras con sus detalles"""
         try:
-            compras = Compra.objects.all().select_related('proveedor').prefetch_related('detalles__producto')
+            compras = Compra.objects.con_cantidad_productos().select_related('proveedor').prefetch_related('detalles__producto')
             serializer = CompraSerializer(compras, many=True)
             return True, serializer.data, status.HTTP_200_OK
         except Exception as e:
@@ -26,7 +28,7 @@ class CompraService:
     def obtener_compra(id_compra):
         """Obtiene una compra por ID con todos sus detalles"""
         try:
-            compra = Compra.objects.select_related('proveedor').prefetch_related(
+            compra = Compra.objects.con_cantidad_productos().select_related('proveedor').prefetch_related(
                 'detalles__producto__categoria'
             ).get(idCompra=id_compra)
             
@@ -66,39 +68,36 @@ class CompraService:
             detalles_creados = []
             
             for detalle_data in validated_data['detalles']:
-                # Obtener producto
-                producto = Producto.objects.select_for_update().get(
-                    idProducto=detalle_data['producto'].idProducto
-                )
-                
                 # Calcular subtotal
                 cantidad = detalle_data['cantidad']
                 precio = detalle_data['precio']
                 subtotal = cantidad * precio
                 
-                # Crear detalle de compra
-                detalle = DetalleCompra.objects.create(
+                detalles_creados.append(DetalleCompra(
                     compra=compra,
-                    producto=producto,
+                    producto=detalle_data['producto'],
                     cantidad=cantidad,
                     precio=precio,
                     subtotal=subtotal
-                )
-                detalles_creados.append(detalle)
-                
-                # **ACTUALIZAR STOCK DEL PRODUCTO**
-                producto.stock += cantidad
-                producto.save()
+                ))
                 
                 # Acumular total
                 total_compra += subtotal
             
+            # Crear los detalles de compra en un solo INSERT
+            DetalleCompra.objects.bulk_create(detalles_creados)
+            
+            # **ACTUALIZAR STOCK DE LOS PRODUCTOS** (un solo UPDATE atómico)
+            InventarioService.incrementar_stock(
+                (detalle.producto_id, detalle.cantidad) for detalle in detalles_creados
+            )
+            
             # Actualizar total de la compra
             compra.total = total_compra
             
             # Guardar imagen si se proporciona
             if 'imagen' in validated_data and validated_data['imagen']:
-                compra.imagen = validated_data['imagen']
+                compra.imagen = obtener_cloudinary().preparar_imagen(validated_data['imagen'])
             
             compra.save()
             
@@ -114,6 +113,8 @@ class CompraService:
             return False, {"error": "Proveedor no encontrado"}, status.HTTP_404_NOT_FOUND
         except Producto.DoesNotExist:
             return False, {"error": "Uno o más productos no existen"}, status.HTTP_404_NOT_FOUND
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
@@ -127,7 +128,7 @@ class CompraService:
             if not serializer.is_valid():
                 return False, serializer.errors, status.HTTP_400_BAD_REQUEST
             
-            compra.imagen = serializer.validated_data['imagen']
+            compra.imagen = obtener_cloudinary().preparar_imagen(serializer.validated_data['imagen'])
             compra.save()
             
             compra_serializada = CompraSerializer(compra)
@@ -138,6 +139,8 @@ class CompraService:
             
         except Compra.DoesNotExist:
             return False, {"error": "Compra no encontrada"}, status.HTTP_404_NOT_FOUND
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
@@ -162,7 +165,7 @@ class CompraService:
             
             # Actualizar imagen si se proporciona
             if 'imagen' in data and data['imagen']:
-                compra.imagen = data['imagen']
+                compra.imagen = obtener_cloudinary().preparar_imagen(data['imagen'])
             
             compra.save()
             
@@ -174,6 +177,8 @@ class CompraService:
             
         except Compra.DoesNotExist:
             return False, {"error": "Compra no encontrada"}, status.HTTP_404_NOT_FOUND
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
@@ -208,7 +213,7 @@ class CompraService:
     def listar_compras_por_proveedor(id_proveedor):
         """Lista todas las compras de un proveedor específico"""
         try:
-            compras = Compra.objects.filter(
+            compras = Compra.objects.con_cantidad_productos().filter(
                 proveedor__idProveedor=id_proveedor
             ).select_related('proveedor').prefetch_related('detalles__producto')
             
@@ -0,0 +1,9 @@
+"""
+Capa común para servicios externos (Stripe, Firebase, Cloudinary): conexiones
+reutilizadas, plazo por llamada, reintentos con jitter, circuit breaker,
+métricas por proveedor e implementaciones falsas locales.
+"""
+from integraciones.proveedores import obtener_stripe, obtener_firebase, obtener_cloudinary
+from integraciones.resiliencia import IntegracionNoDisponible
+
+__all__ = ['obtener_stripe', 'obtener_firebase', 'obtener_cloudinary', 'IntegracionNoDisponible']
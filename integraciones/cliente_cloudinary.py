@@ -0,0 +1,36 @@
+"""
+Cliente de Cloudinary para subir imágenes.
+
+pycloudinary ya reutiliza conexiones (un PoolManager de urllib3 por proceso);
+aquí se agrega el timeout por intento, los reintentos y el circuit breaker.
+Los servicios suben el archivo con `preparar_imagen` antes de asignarlo al
+CloudinaryField, así el campo guarda el recurso sin volver a subirlo.
+"""
+from cloudinary import exceptions, uploader
+from django.core.files.uploadedfile import UploadedFile
+
+from integraciones.resiliencia import ClienteResiliente, timeout_actual
+
+
+class ClienteCloudinary(ClienteResiliente):
+    nombre = 'cloudinary'
+
+    def es_transitorio(self, error):
+        # Error a secas: red, socket o respuesta ilegible; GeneralError: 5xx
+        return type(error) is exceptions.Error or isinstance(
+            error, (exceptions.GeneralError, exceptions.RateLimited)
+        )
+
+    def subir(self, archivo, plazo=None, **opciones):
+        """Sube un archivo y retorna el CloudinaryResource"""
+        def subir_archivo():
+            if hasattr(archivo, 'seekable') and archivo.seekable():
+                archivo.seek(0)
+            return uploader.upload_resource(archivo, timeout=timeout_actual(self.timeout), **opciones)
+        return self.llamar(subir_archivo, plazo_llamada=plazo)
+
+    def preparar_imagen(self, valor):
+        """Sube `valor` si es un archivo recibido; cualquier otro valor se devuelve igual"""
+        if isinstance(valor, UploadedFile):
+            return self.subir(valor, type='upload', resource_type='image')
+        return valor
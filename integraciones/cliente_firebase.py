@@ -0,0 +1,34 @@
+"""
+Cliente de Firebase Cloud Messaging.
+
+La app de firebase_admin (inicializada en notificaciones.firebase_config con
+httpTimeout) reutiliza una sesión HTTP autenticada con keep-alive; el timeout
+de cada intento es ese httpTimeout y el plazo total lo controla
+ClienteResiliente.
+"""
+from firebase_admin import exceptions, messaging
+
+from integraciones.resiliencia import ClienteResiliente
+
+
+class ClienteFirebase(ClienteResiliente):
+    nombre = 'firebase'
+
+    ERRORES_TRANSITORIOS = (
+        exceptions.UnavailableError,
+        exceptions.InternalError,
+        exceptions.DeadlineExceededError,
+        exceptions.ResourceExhaustedError,
+        exceptions.UnknownError,
+    )
+
+    def es_transitorio(self, error):
+        return isinstance(error, self.ERRORES_TRANSITORIOS)
+
+    def enviar(self, mensaje, plazo=None):
+        """Envía un messaging.Message; retorna el ID del mensaje"""
+        return self.llamar(messaging.send, mensaje, plazo_llamada=plazo)
+
+    def enviar_multicast(self, mensaje, plazo=None):
+        """Envía un messaging.MulticastMessage; retorna el BatchResponse"""
+        return self.llamar(messaging.send_each_for_multicast, mensaje, plazo_llamada=plazo)
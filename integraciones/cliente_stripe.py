@@ -0,0 +1,95 @@
+"""
+Cliente de Stripe.
+
+Usa un StripeClient propio (sin tocar stripe.api_key global) cuyo cliente HTTP
+mantiene una sesión keep-alive de requests por hilo y toma el timeout del
+plazo en curso. Los reintentos los hace ClienteResiliente, no la librería; los
+POST llevan siempre idempotency_key, así repetirlos es seguro.
+"""
+import uuid
+
+import stripe
+from django.conf import settings
+
+from integraciones.resiliencia import ClienteResiliente, timeout_actual
+
+
+class _HTTPStripe(stripe.RequestsClient):
+    """RequestsClient con el timeout de cada petición tomado del plazo del hilo"""
+
+    @property
+    def _timeout(self):
+        return timeout_actual(self._timeout_defecto)
+
+    @_timeout.setter
+    def _timeout(self, valor):
+        self._timeout_defecto = valor
+
+
+class ClienteStripe(ClienteResiliente):
+    nombre = 'stripe'
+
+    def __init__(self, **config):
+        super().__init__(**config)
+        self._cliente = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=_HTTPStripe(timeout=self.timeout),
+            max_network_retries=0
+        )
+
+    def es_transitorio(self, error):
+        if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)):
+            return True
+        return isinstance(error, stripe.StripeError) and (error.http_status or 0) >= 500
+
+    @staticmethod
+    def _opciones(idempotency_key):
+        return {'idempotency_key': idempotency_key or uuid.uuid4().hex}
+
+    # ==================== PAYMENT INTENTS ====================
+
+    def crear_payment_intent(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(
+            self._cliente.v1.payment_intents.create,
+            params=params, options=self._opciones(idempotency_key), plazo_llamada=plazo
+        )
+
+    def obtener_payment_intent(self, id_intent, plazo=None):
+        return self.llamar(self._cliente.v1.payment_intents.retrieve, id_intent, plazo_llamada=plazo)
+
+    def cancelar_payment_intent(self, id_intent, plazo=None):
+        return self.llamar(
+            self._cliente.v1.payment_intents.cancel,
+            id_intent, options=self._opciones(None), plazo_llamada=plazo
+        )
+
+    # ==================== CHECKOUT SESSIONS ====================
+
+    def crear_checkout_session(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(
+            self._cliente.v1.checkout.sessions.create,
+            params=params, options=self._opciones(idempotency_key), plazo_llamada=plazo
+        )
+
+    def obtener_checkout_session(self, id_sesion, plazo=None):
+        return self.llamar(self._cliente.v1.checkout.sessions.retrieve, id_sesion, plazo_llamada=plazo)
+
+    def expirar_checkout_session(self, id_sesion, plazo=None):
+        return self.llamar(
+            self._cliente.v1.checkout.sessions.expire,
+            id_sesion, options=self._opciones(None), plazo_llamada=plazo
+        )
+
+    # ==================== REEMBOLSOS ====================
+
+    def crear_reembolso(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(
+            self._cliente.v1.refunds.create,
+            params=params, options=self._opciones(idempotency_key), plazo_llamada=plazo
+        )
+
+    # ==================== WEBHOOKS ====================
+
+    def construir_evento(self, payload, firma, secreto):
+        """Verifica la firma de un webhook (local, sin llamar a Stripe)"""
+        return stripe.Webhook.construct_event(payload, firma, secreto)
@@ -0,0 +1,197 @@
+"""
+Implementaciones locales de los proveedores, sin red, para desarrollo,
+benchmarks y pruebas manuales. Se activan por proveedor con la variable
+INTEGRACIONES_FALSAS (por ejemplo "stripe,firebase").
+
+Pasan por el mismo ClienteResiliente que los clientes reales (breaker,
+reintentos y métricas) y permiten simular latencia y fallos:
+
+    cliente = obtener_stripe()
+    cliente.latencia = 0.3
+    cliente.programar_fallo(stripe.APIConnectionError('caído'), veces=2)
+
+La firma de los webhooks se verifica igual que con el cliente real
+(stripe.Webhook.construct_event no llama a Stripe); para enviar eventos a mano,
+firmarlos con un secreto de prueba:
+
+    firma = obtener_stripe().firmar_evento(payload, settings.STRIPE_WEBHOOK_SECRET)
+"""
+import hashlib
+import hmac
+import itertools
+import threading
+import time
+import uuid
+
+import stripe
+from cloudinary import CloudinaryResource
+from firebase_admin import messaging
+
+from integraciones.cliente_cloudinary import ClienteCloudinary
+from integraciones.cliente_firebase import ClienteFirebase
+from integraciones.cliente_stripe import ClienteStripe
+from integraciones.resiliencia import ClienteResiliente
+
+
+class _Simulador:
+    """Latencia y fallos programados, aplicados al inicio de cada llamada"""
+
+    def _iniciar_simulador(self):
+        self.latencia = 0.0
+        self._fallos = []
+        self._candado = threading.Lock()
+
+    def programar_fallo(self, error, veces=1):
+        """Las próximas `veces` llamadas lanzan `error`"""
+        with self._candado:
+            self._fallos.extend([error] * veces)
+
+    def _simular(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._candado:
+            error = self._fallos.pop(0) if self._fallos else None
+        if error is not None:
+            raise error
+
+
+class StripeFalso(_Simulador, ClienteStripe):
+    """Payment Intents y Checkout Sessions en memoria, con idempotencia"""
+
+    def __init__(self, **config):
+        ClienteResiliente.__init__(self, **config)
+        self._iniciar_simulador()
+        self.objetos = {}
+        self._idempotencia = {}
+
+    def registrar(self, datos):
+        """Agrega (o reemplaza) un objeto con su 'id', como si ya existiera en Stripe"""
+        with self._candado:
+            self.objetos[datos['id']] = dict(datos)
+
+    def _objeto(self, datos):
+        return stripe.StripeObject.construct_from(datos, 'sk_falso')
+
+    def _crear(self, prefijo, idempotency_key, datos):
+        def crear():
+            self._simular()
+            with self._candado:
+                if idempotency_key and idempotency_key in self._idempotencia:
+                    return self._objeto(self.objetos[self._idempotencia[idempotency_key]])
+                id_objeto = f'{prefijo}_falso_{uuid.uuid4().hex[:24]}'
+                self.objetos[id_objeto] = {'id': id_objeto, 'created': int(time.time()), **datos(id_objeto)}
+                if idempotency_key:
+                    self._idempotencia[idempotency_key] = id_objeto
+                return self._objeto(self.objetos[id_objeto])
+        return crear
+
+    def _leer(self, id_objeto, cambios=None):
+        def leer():
+            self._simular()
+            with self._candado:
+                if id_objeto not in self.objetos:
+                    raise stripe.InvalidRequestError(f'No such object: {id_objeto}', 'id', http_status=404)
+                self.objetos[id_objeto].update(cambios or {})
+                return self._objeto(self.objetos[id_objeto])
+        return leer
+
+    def crear_payment_intent(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(self._crear('pi', idempotency_key, lambda id_objeto: {
+            'object': 'payment_intent',
+            'client_secret': f'{id_objeto}_secret_falso',
+            'status': 'requires_payment_method',
+            **params
+        }), plazo_llamada=plazo)
+
+    def obtener_payment_intent(self, id_intent, plazo=None):
+        return self.llamar(self._leer(id_intent), plazo_llamada=plazo)
+
+    def cancelar_payment_intent(self, id_intent, plazo=None):
+        return self.llamar(self._leer(id_intent, {'status': 'canceled'}), plazo_llamada=plazo)
+
+    def crear_checkout_session(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(self._crear('cs', idempotency_key, lambda id_objeto: {
+            'object': 'checkout.session',
+            'url': f'https://checkout.stripe.test/c/pay/{id_objeto}',
+            'status': 'open',
+            'payment_status': 'unpaid',
+            'payment_intent': None,
+            'amount_total': sum(
+                linea['price_data']['unit_amount'] * linea['quantity']
+                for linea in params.get('line_items', [])
+            ),
+            'expires_at': params.get('expires_at', int(time.time()) + 24 * 3600),
+            **params
+        }), plazo_llamada=plazo)
+
+    def obtener_checkout_session(self, id_sesion, plazo=None):
+        return self.llamar(self._leer(id_sesion), plazo_llamada=plazo)
+
+    def expirar_checkout_session(self, id_sesion, plazo=None):
+        return self.llamar(self._leer(id_sesion, {'status': 'expired'}), plazo_llamada=plazo)
+
+    def crear_reembolso(self, idempotency_key=None, plazo=None, **params):
+        return self.llamar(self._crear('re', idempotency_key, lambda id_objeto: {
+            'object': 'refund',
+            'status': 'succeeded',
+            **params
+        }), plazo_llamada=plazo)
+
+    def firmar_evento(self, payload, secreto, momento=None):
+        """Cabecera Stripe-Signature de un payload, como la genera Stripe"""
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        momento = int(momento or time.time())
+        firma = hmac.new(secreto.encode(), f'{momento}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        return f't={momento},v1={firma}'
+
+
+class FirebaseFalso(_Simulador, ClienteFirebase):
+    """Registra los mensajes en memoria y responde como si todos se entregaran"""
+
+    def __init__(self, **config):
+        ClienteResiliente.__init__(self, **config)
+        self._iniciar_simulador()
+        self.enviados = []
+        self._secuencia = itertools.count(1)
+
+    def _registrar(self, mensaje):
+        self.enviados.append(mensaje)
+        return f'projects/falso/messages/{next(self._secuencia)}'
+
+    def enviar(self, mensaje, plazo=None):
+        def enviar():
+            self._simular()
+            return self._registrar(mensaje)
+        return self.llamar(enviar, plazo_llamada=plazo)
+
+    def enviar_multicast(self, mensaje, plazo=None):
+        def enviar():
+            self._simular()
+            return messaging.BatchResponse([
+                messaging.SendResponse({'name': self._registrar(token)}, None)
+                for token in mensaje.tokens
+            ])
+        return self.llamar(enviar, plazo_llamada=plazo)
+
+
+class CloudinaryFalso(_Simulador, ClienteCloudinary):
+    """Devuelve un recurso con public_id local sin subir el archivo"""
+
+    def __init__(self, **config):
+        ClienteResiliente.__init__(self, **config)
+        self._iniciar_simulador()
+
+    def subir(self, archivo, plazo=None, **opciones):
+        def subir_archivo():
+            self._simular()
+            nombre = getattr(archivo, 'name', '') or ''
+            return CloudinaryResource(
+                public_id=f'falso/{uuid.uuid4().hex}',
+                format=nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else 'jpg',
+                version=1,
+                type=opciones.get('type', 'upload'),
+                resource_type=opciones.get('resource_type', 'image'),
+                metadata={}
+            )
+        return self.llamar(subir_archivo, plazo_llamada=plazo)
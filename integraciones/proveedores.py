@@ -0,0 +1,66 @@
+"""
+Registro de clientes: una instancia por proveedor y por proceso (comparten el
+pool de conexiones y el estado del circuit breaker), real o falsa según
+INTEGRACIONES_FALSAS.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+CLIENTES = {
+    'stripe': ('integraciones.cliente_stripe.ClienteStripe', 'integraciones.falsos.StripeFalso'),
+    'firebase': ('integraciones.cliente_firebase.ClienteFirebase', 'integraciones.falsos.FirebaseFalso'),
+    'cloudinary': ('integraciones.cliente_cloudinary.ClienteCloudinary', 'integraciones.falsos.CloudinaryFalso'),
+}
+
+_instancias = {}
+_candado = threading.Lock()
+
+
+def usa_falso(proveedor):
+    return proveedor in settings.INTEGRACIONES_FALSAS
+
+
+def obtener(proveedor):
+    """Cliente del proveedor, creado al primer uso con su configuración de INTEGRACIONES"""
+    cliente = _instancias.get(proveedor)
+    if cliente is None:
+        with _candado:
+            cliente = _instancias.get(proveedor)
+            if cliente is None:
+                real, falso = CLIENTES[proveedor]
+                clase = import_string(falso if usa_falso(proveedor) else real)
+                cliente = _instancias[proveedor] = clase(**settings.INTEGRACIONES.get(proveedor, {}))
+    return cliente
+
+
+def obtener_stripe():
+    return obtener('stripe')
+
+
+def obtener_firebase():
+    return obtener('firebase')
+
+
+def obtener_cloudinary():
+    return obtener('cloudinary')
+
+
+def reiniciar():
+    """Descarta los clientes creados (se recrean con la configuración vigente)"""
+    with _candado:
+        _instancias.clear()
+
+
+def metricas():
+    """Métricas de cada proveedor; contadores y estado del circuito son los de este proceso"""
+    return {
+        proveedor: {
+            **obtener(proveedor).metricas(),
+            'falso': usa_falso(proveedor),
+            'proceso': os.getpid()
+        }
+        for proveedor in CLIENTES
+    }
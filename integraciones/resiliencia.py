@@ -0,0 +1,285 @@
+"""
+Primitivas de resiliencia para llamadas a servicios externos: plazo por
+llamada, reintentos con jitter, circuit breaker y métricas por proveedor.
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+class IntegracionNoDisponible(Exception):
+    """El circuito del proveedor está abierto: se falla rápido sin llamarlo"""
+
+    def __init__(self, proveedor):
+        self.proveedor = proveedor
+        super().__init__(
+            f'El servicio {proveedor} no está disponible en este momento, intente nuevamente en unos segundos'
+        )
+
+
+# ==================== PLAZO POR LLAMADA ====================
+
+_local = threading.local()
+
+
+@contextmanager
+def plazo(segundos):
+    """Fija el timeout de las peticiones HTTP hechas por este hilo dentro del bloque"""
+    anterior = getattr(_local, 'timeout', None)
+    _local.timeout = segundos
+    try:
+        yield
+    finally:
+        _local.timeout = anterior
+
+
+def timeout_actual(defecto):
+    """Timeout del plazo en curso en este hilo, o `defecto` si no hay ninguno"""
+    timeout = getattr(_local, 'timeout', None)
+    return defecto if timeout is None else timeout
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proceso.
+
+    - cerrado: las llamadas pasan; `umbral_fallos` fallos transitorios seguidos lo abren.
+    - abierto: las llamadas se rechazan sin ir a la red durante `segundos_abierto`.
+    - semiabierto: pasa una sola llamada de prueba; si sale bien se cierra,
+      si falla vuelve a abrirse.
+    """
+
+    def __init__(self, nombre, umbral_fallos=5, segundos_abierto=30):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+        self._estado = 'cerrado'
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._candado = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._candado:
+            if self._estado == 'abierto' and time.monotonic() - self._abierto_desde >= self.segundos_abierto:
+                return 'semiabierto'
+            return self._estado
+
+    def permitir(self):
+        """True si la llamada puede hacerse"""
+        with self._candado:
+            if self._estado == 'cerrado':
+                return True
+            if self._estado == 'abierto':
+                if time.monotonic() - self._abierto_desde < self.segundos_abierto:
+                    return False
+                self._estado = 'semiabierto'
+                self._prueba_en_curso = False
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self):
+        with self._candado:
+            self._estado = 'cerrado'
+            self._fallos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._candado:
+            self._fallos += 1
+            if self._estado == 'semiabierto' or self._fallos >= self.umbral_fallos:
+                self._estado = 'abierto'
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+
+# ==================== LÍMITE DE TASA ====================
+
+class LimiteTasa:
+    """
+    Token bucket compartido entre hilos: como máximo `por_segundo` llamadas
+    por segundo en promedio, con ráfagas de hasta `rafaga`.
+    """
+
+    def __init__(self, por_segundo, rafaga=None):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga or max(1, int(por_segundo))
+        self._fichas = float(self.rafaga)
+        self._ultima = time.monotonic()
+        self._candado = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya una ficha disponible y la consume"""
+        while True:
+            with self._candado:
+                ahora = time.monotonic()
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultima) * self.por_segundo)
+                self._ultima = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                faltante = (1 - self._fichas) / self.por_segundo
+            time.sleep(faltante)
+
+
+# ==================== MÉTRICAS ====================
+
+class Metricas:
+    """
+    Contadores por proveedor en memoria de cada proceso (igual que el estado
+    del circuit breaker), con la latencia en un histograma de cubetas en
+    milisegundos. Registrar una llamada no sale del proceso; cada proceso
+    informa solo lo que él mismo llamó.
+    """
+
+    CUBETAS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+    CONTADORES = ['llamadas', 'errores', 'reintentos', 'rechazadas', 'latencia_ms']
+
+    _contadores = defaultdict(Counter)
+    _candado = threading.Lock()
+
+    @staticmethod
+    def _sumar(proveedor, *valores):
+        """Suma varios (nombre, valor) de una vez"""
+        with Metricas._candado:
+            contadores = Metricas._contadores[proveedor]
+            for nombre, valor in valores:
+                contadores[nombre] += valor
+
+    @staticmethod
+    def registrar_llamada(proveedor, milisegundos, error=False):
+        cubeta = next((limite for limite in Metricas.CUBETAS_MS if milisegundos <= limite), 'mas')
+        Metricas._sumar(
+            proveedor,
+            ('llamadas', 1),
+            ('latencia_ms', int(milisegundos)),
+            ('errores', 1 if error else 0),
+            (f'latencia_hasta_{cubeta}', 1)
+        )
+
+    @staticmethod
+    def registrar_reintento(proveedor):
+        Metricas._sumar(proveedor, ('reintentos', 1))
+
+    @staticmethod
+    def registrar_rechazo(proveedor):
+        Metricas._sumar(proveedor, ('rechazadas', 1))
+
+    @staticmethod
+    def leer(proveedor):
+        """Contadores, latencia promedio, p95 aproximado (límite de cubeta) e histograma"""
+        cubetas = [*Metricas.CUBETAS_MS, 'mas']
+        with Metricas._candado:
+            valores = Counter(Metricas._contadores.get(proveedor, {}))
+        valor = lambda nombre: valores[nombre]
+
+        llamadas = valor('llamadas')
+        histograma = {str(cubeta): valor(f'latencia_hasta_{cubeta}') for cubeta in cubetas}
+
+        p95, acumuladas = None, 0
+        for cubeta in cubetas:
+            acumuladas += histograma[str(cubeta)]
+            if llamadas and acumuladas >= llamadas * 0.95:
+                p95 = cubeta
+                break
+
+        return {
+            **{nombre: valor(nombre) for nombre in Metricas.CONTADORES if nombre != 'latencia_ms'},
+            'tasa_error': round(valor('errores') / llamadas, 4) if llamadas else 0,
+            'latencia_promedio_ms': round(valor('latencia_ms') / llamadas, 1) if llamadas else 0,
+            'latencia_p95_ms_hasta': p95,
+            'histograma_ms': histograma,
+        }
+
+    @staticmethod
+    def reiniciar(proveedor):
+        with Metricas._candado:
+            Metricas._contadores.pop(proveedor, None)
+
+
+# ==================== CLIENTE BASE ====================
+
+class ClienteResiliente:
+    """
+    Base de los clientes de integraciones/. Toda llamada a la red pasa por
+    `llamar`, que aplica el circuit breaker, el plazo total, los reintentos
+    con jitter (solo ante errores transitorios) y registra las métricas.
+
+    Cada subclase define `nombre` y `es_transitorio(error)`.
+    """
+
+    nombre = None
+
+    def __init__(self, timeout=10, intentos=3, plazo=20, espera_base=0.2, espera_maxima=2.0,
+                 umbral_fallos=5, segundos_abierto=30):
+        self.timeout = timeout              # Segundos por intento
+        self.intentos = intentos            # Intentos totales (1 = sin reintentos)
+        self.plazo = plazo                  # Segundos para todos los intentos de una llamada
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.breaker = CircuitBreaker(self.nombre, umbral_fallos, segundos_abierto)
+
+    def es_transitorio(self, error):
+        """True si el error indica un problema del proveedor (reintentable y cuenta para el breaker)"""
+        return False
+
+    def espera(self, intento):
+        """Backoff exponencial con jitter completo: uniforme entre 0 y base * 2^intento"""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+
+    def llamar(self, funcion, *args, reintentable=True, plazo_llamada=None, **kwargs):
+        """
+        Ejecuta `funcion(*args, **kwargs)` contra el proveedor.
+
+        Args:
+            reintentable: False para operaciones que no deben repetirse
+            plazo_llamada: segundos totales para esta llamada (defecto: self.plazo)
+
+        Raises:
+            IntegracionNoDisponible: si el circuito está abierto
+            el error del proveedor si no es transitorio o se agotaron intentos y plazo
+        """
+        if not self.breaker.permitir():
+            Metricas.registrar_rechazo(self.nombre)
+            raise IntegracionNoDisponible(self.nombre)
+
+        limite = time.monotonic() + (plazo_llamada or self.plazo)
+        intento = 0
+        while True:
+            timeout = max(min(self.timeout, limite - time.monotonic()), 0.1)
+            inicio = time.perf_counter()
+            try:
+                with plazo(timeout):
+                    resultado = funcion(*args, **kwargs)
+            except Exception as e:
+                Metricas.registrar_llamada(self.nombre, (time.perf_counter() - inicio) * 1000, error=True)
+                if not self.es_transitorio(e):
+                    # Error del pedido (4xx): el proveedor responde bien
+                    self.breaker.registrar_exito()
+                    raise
+                self.breaker.registrar_fallo()
+
+                intento += 1
+                espera = self.espera(intento)
+                if not reintentable or intento >= self.intentos or time.monotonic() + espera >= limite:
+                    raise
+                time.sleep(espera)
+                if not self.breaker.permitir():
+                    Metricas.registrar_rechazo(self.nombre)
+                    raise IntegracionNoDisponible(self.nombre) from e
+                Metricas.registrar_reintento(self.nombre)
+                continue
+
+            Metricas.registrar_llamada(self.nombre, (time.perf_counter() - inicio) * 1000)
+            self.breaker.registrar_exito()
+            return resultado
+
+    def metricas(self):
+        return {**Metricas.leer(self.nombre), 'circuito': self.breaker.estado}
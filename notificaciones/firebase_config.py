@@ -13,6 +13,9 @@ IMPORTANTE: Necesitas obtener tu archivo de credenciales de Firebase:
 
 import firebase_admin
 from firebase_admin import credentials, messaging
+from django.conf import settings
+from integraciones import obtener_firebase
+from integraciones.proveedores import usa_falso
 import os
 from pathlib import Path
 
@@ -34,11 +37,19 @@ def initialize_firebase():
     if _firebase_initialized:
         return True
     
+    # Con el cliente falso no se necesitan credenciales
+    if usa_falso('firebase'):
+        _firebase_initialized = True
+        return True
+    
     if not firebase_admin._apps:
         try:
             if os.path.exists(FIREBASE_CREDENTIALS_PATH):
                 cred = credentials.Certificate(str(FIREBASE_CREDENTIALS_PATH))
-                firebase_admin.initialize_app(cred)
+                # Timeout (s) de cada petición HTTP a FCM
+                firebase_admin.initialize_app(cred, {
+                    'httpTimeout': settings.INTEGRACIONES['firebase']['timeout']
+                })
                 _firebase_initialized = True
                 print("✅ Firebase inicializado correctamente")
                 return True
@@ -82,15 +93,20 @@ def send_push_notification(fcm_token, title, body, data=None):
         )
         
         # Enviar el mensaje
-        response = messaging.send(message)
+        response = obtener_firebase().enviar(message)
         return True, response
     except Exception as e:
         return False, str(e)
 
 
+# FCM acepta hasta 500 tokens por envío multicast
+MAX_TOKENS_MULTICAST = 500
+
+
 def send_push_notification_multicast(fcm_tokens, title, body, data=None):
     """
     Envía una notificación push a múltiples dispositivos.
+    Los tokens se envían en tandas de MAX_TOKENS_MULTICAST.
     
     Args:
         fcm_tokens (list): Lista de tokens FCM de los dispositivos
@@ -105,19 +121,24 @@ def send_push_notification_multicast(fcm_tokens, title, body, data=None):
         return 0, len(fcm_tokens), "Firebase no está inicializado"
     
     try:
-        # Construir el mensaje multicast
-        message = messaging.MulticastMessage(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data or {},
-            tokens=fcm_tokens,
-        )
-        
-        # Enviar el mensaje
-        response = messaging.send_multicast(message)
-        return response.success_count, response.failure_count, response.responses
+        success_count, failure_count, responses = 0, 0, []
+        for inicio in range(0, len(fcm_tokens), MAX_TOKENS_MULTICAST):
+            # Construir el mensaje multicast
+            message = messaging.MulticastMessage(
+                notification=messaging.Notification(
+                    title=title,
+                    body=body,
+                ),
+                data=data or {},
+                tokens=fcm_tokens[inicio:inicio + MAX_TOKENS_MULTICAST],
+            )
+            
+            # Enviar el mensaje (send_multicast ya no existe en firebase_admin 7)
+            response = obtener_firebase().enviar_multicast(message)
+            success_count += response.success_count
+            failure_count += response.failure_count
+            responses.extend(response.responses)
+        return success_count, failure_count, responses
     except Exception as e:
         return 0, len(fcm_tokens), str(e)
 
@@ -151,7 +172,7 @@ def send_notification_to_topic(topic, title, body, data=None):
         )
         
         # Enviar el mensaje
-        response = messaging.send(message)
+        response = obtener_firebase().enviar(message)
         return True, response
     except Exception as e:
         return False, str(e)
@@ -89,6 +89,27 @@ class NotificacionService:
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def crear_notificaciones_individuales(notificaciones):
+        """
+        Crea notificaciones distintas para distintos usuarios con dos INSERT
+        (uno para Notificacion y otro para UserNoti), sin enviar push.
+        
+        Args:
+            notificaciones (list): tuplas (id_usuario, titulo, mensaje)
+        
+        Returns:
+            list: UserNoti creados
+        """
+        creadas = Notificacion.objects.bulk_create([
+            Notificacion(titulo=titulo, mensaje=mensaje)
+            for _, titulo, mensaje in notificaciones
+        ])
+        return UserNoti.objects.bulk_create([
+            UserNoti(usuario_id=id_usuario, notificacion=notificacion, leido=False)
+            for (id_usuario, _, _), notificacion in zip(notificaciones, creadas)
+        ])
+    
     @staticmethod
     def listar_notificaciones_usuario(id_usuario):
         """Lista todas las notificaciones de un usuario"""
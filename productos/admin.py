@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Categoria, Producto
+from .models import Categoria, Producto, ReservaStock
+from .services.services_busqueda import BusquedaProductoService
 
 
 @admin.register(Categoria)
@@ -15,10 +16,26 @@ class CategoriaAdmin(admin.ModelAdmin):
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     """Configuración del admin para Producto"""
-    list_display = ['idProducto', 'nombre', 'precio', 'stock', 'categoria', 'fecha_creacion']
-    search_fields = ['nombre']
+    list_display = ['idProducto', 'nombre', 'precio', 'stock', 'stock_reservado', 'categoria', 'fecha_creacion']
+    search_fields = ['nombre', 'categoria__nombre', 'descripcion']
     list_filter = ['categoria', 'fecha_creacion']
     ordering = ['-fecha_creacion']
-    readonly_fields = ['idProducto', 'fecha_creacion', 'fecha_modificacion']
+    readonly_fields = ['idProducto', 'stock_reservado', 'fecha_creacion', 'fecha_modificacion']
     list_select_related = ['categoria']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Búsqueda de texto completo (índice GIN) en lugar de nombre__icontains"""
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return BusquedaProductoService.filtrar(queryset, search_term), False
+
+
+@admin.register(ReservaStock)
+class ReservaStockAdmin(admin.ModelAdmin):
+    """Configuración del admin para ReservaStock"""
+    list_display = ['idReserva', 'producto', 'cantidad', 'referencia', 'expira', 'fecha_creacion']
+    search_fields = ['referencia', 'producto__nombre']
+    ordering = ['expira']
+    readonly_fields = ['idReserva', 'fecha_creacion']
+    list_select_related = ['producto']
 
@@ -0,0 +1,120 @@
+"""
+Benchmark de "flash sale": muchos hilos compran a la vez el mismo producto.
+
+Compara el descuento condicional de InventarioService con el patrón anterior
+de leer el stock en Python y guardarlo (lectura-escritura sin bloqueo), y
+reporta el throughput y cuántas unidades se vendieron de más (oversell).
+
+Uso:
+    python manage.py benchmark_flash_sale
+    python manage.py benchmark_flash_sale --hilos 64 --stock 500 --intentos 50
+    python manage.py benchmark_flash_sale --estrategia lectura-escritura
+
+Requiere PostgreSQL (SQLite serializa las escrituras y no es representativo).
+"""
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from productos.models import Categoria, Producto
+from productos.services.services_inventario import InventarioService, StockInsuficienteError
+
+
+class Command(BaseCommand):
+    help = 'Simula una flash sale concurrente sobre un único producto y mide throughput y oversell'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=32, help='Compradores concurrentes')
+        parser.add_argument('--stock', type=int, default=200, help='Stock inicial del producto')
+        parser.add_argument('--intentos', type=int, default=20, help='Compras que intenta cada hilo')
+        parser.add_argument('--cantidad', type=int, default=1, help='Unidades por compra')
+        parser.add_argument('--estrategia', choices=['condicional', 'lectura-escritura'],
+                            default='condicional')
+
+    def handle(self, *args, **options):
+        categoria = Categoria.objects.create(nombre=f'Flash sale {uuid.uuid4().hex[:8]}')
+        producto = Producto.objects.create(
+            nombre='Producto flash sale',
+            precio=1.0,
+            stock=options['stock'],
+            categoria=categoria
+        )
+
+        comprar = {
+            'condicional': self._comprar_condicional,
+            'lectura-escritura': self._comprar_lectura_escritura,
+        }[options['estrategia']]
+
+        vendidas = []
+        rechazadas = []
+        errores = []
+        barrera = threading.Barrier(options['hilos'])
+
+        def comprador():
+            ok = no = err = 0
+            try:
+                barrera.wait()
+                for _ in range(options['intentos']):
+                    try:
+                        if comprar(producto.idProducto, options['cantidad']):
+                            ok += 1
+                        else:
+                            no += 1
+                    except Exception:
+                        err += 1
+            finally:
+                vendidas.append(ok)
+                rechazadas.append(no)
+                errores.append(err)
+                connection.close()
+
+        hilos = [threading.Thread(target=comprador) for _ in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        try:
+            producto.refresh_from_db()
+            unidades_vendidas = sum(vendidas) * options['cantidad']
+            intentos = options['hilos'] * options['intentos']
+            oversell = max(0, unidades_vendidas - options['stock'])
+            perdidas = (options['stock'] - unidades_vendidas) - producto.stock
+
+            self.stdout.write(f"Estrategia:             {options['estrategia']}")
+            self.stdout.write(f"Hilos x intentos:       {options['hilos']} x {options['intentos']}")
+            self.stdout.write(f"Duración:               {duracion:.3f} s")
+            self.stdout.write(f"Throughput:             {intentos / duracion:.1f} intentos/s, "
+                              f"{sum(vendidas) / duracion:.1f} ventas/s")
+            self.stdout.write(f"Ventas aceptadas:       {sum(vendidas)} ({unidades_vendidas} unidades)")
+            self.stdout.write(f"Ventas rechazadas:      {sum(rechazadas)}")
+            self.stdout.write(f"Errores:                {sum(errores)}")
+            self.stdout.write(f"Stock inicial / final:  {options['stock']} / {producto.stock}")
+            self.stdout.write(f"Oversell (unidades):    {oversell}")
+            self.stdout.write(f"Actualizaciones perdidas: {perdidas}")
+        finally:
+            producto.delete()
+            categoria.delete()
+
+    @staticmethod
+    def _comprar_condicional(id_producto, cantidad):
+        try:
+            InventarioService.descontar_stock({id_producto: cantidad})
+            return True
+        except StockInsuficienteError:
+            return False
+
+    @staticmethod
+    def _comprar_lectura_escritura(id_producto, cantidad):
+        """Patrón anterior: leer, comprobar y guardar desde Python sin bloqueo"""
+        producto = Producto.objects.get(idProducto=id_producto)
+        if producto.stock < cantidad:
+            return False
+        producto.stock -= cantidad
+        producto.save()
+        return True
@@ -0,0 +1,32 @@
+"""
+Libera las reservas de stock cuyo checkout expiró sin pagarse.
+
+Uso:
+    python manage.py liberar_reservas_vencidas               # una pasada
+    python manage.py liberar_reservas_vencidas --intervalo 60  # en bucle, cada 60 s
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from productos.services.services_inventario import InventarioService
+
+
+class Command(BaseCommand):
+    help = 'Libera en bloque las reservas de stock vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Reservas liberadas por transacción')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Segundos entre pasadas; 0 ejecuta una sola pasada')
+
+    def handle(self, *args, **options):
+        while True:
+            liberadas = InventarioService.liberar_reservas_vencidas(lote=options['lote'])
+            if liberadas or not options['intervalo']:
+                self.stdout.write(f'Reservas vencidas liberadas: {liberadas}')
+
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
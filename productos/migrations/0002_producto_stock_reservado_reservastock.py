@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='stock_reservado',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('idReserva', models.AutoField(primary_key=True, serialize=False)),
+                ('cantidad', models.IntegerField()),
+                ('referencia', models.CharField(db_index=True, max_length=64)),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Stock',
+                'verbose_name_plural': 'Reservas de Stock',
+                'db_table': 'reserva_stock',
+                'ordering': ['expira'],
+            },
+        ),
+    ]
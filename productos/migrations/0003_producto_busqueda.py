@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models
+
+
+# Español sin acentos: unaccent normaliza cada palabra antes del stemmer
+CREAR_CONFIGURACION = """
+    CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = pg_catalog.spanish);
+    ALTER TEXT SEARCH CONFIGURATION es_unaccent
+        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+"""
+
+BORRAR_CONFIGURACION = "DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent;"
+
+# Mismo vector que BusquedaProductoService.vector(), para los productos existentes
+LLENAR_BUSQUEDA = """
+    UPDATE producto p SET busqueda =
+        setweight(to_tsvector('es_unaccent', coalesce(p.nombre, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', coalesce(c.nombre, '')), 'B') ||
+        setweight(to_tsvector('es_unaccent', coalesce(p.descripcion, '')), 'C')
+    FROM categoria c
+    WHERE c."idCategoria" = p.categoria_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_stock_reservado_reservastock'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunSQL(CREAR_CONFIGURACION, BORRAR_CONFIGURACION),
+        migrations.AddField(
+            model_name='producto',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='descripcion',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='producto_busqueda_gin'),
+        ),
+        migrations.RunSQL(LLENAR_BUSQUEDA, migrations.RunSQL.noop),
+    ]
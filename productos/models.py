@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from cloudinary.models import CloudinaryField
 
 
@@ -22,18 +24,47 @@ class Categoria(models.Model):
 class Producto(models.Model):
     idProducto = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=200)
+    descripcion = models.TextField(blank=True, null=True)
     precio = models.FloatField()
     stock = models.IntegerField(default=0)
+    stock_reservado = models.IntegerField(default=0)  # Unidades retenidas por checkouts en curso
     imagen = CloudinaryField('imagen', blank=True, null=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
+    # Nombre, categoría y descripción para la búsqueda de texto completo (ver BusquedaProductoService)
+    busqueda = SearchVectorField(blank=True, null=True, editable=False)
     
     class Meta:
         db_table = 'producto'
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         ordering = ['-fecha_creacion']
+        indexes = [
+            GinIndex(fields=['busqueda'], name='producto_busqueda_gin'),
+        ]
     
     def __str__(self):
         return self.nombre
+
+
+class ReservaStock(models.Model):
+    """
+    Unidades retenidas para un checkout de Stripe mientras el cliente paga.
+    La reserva se consume al confirmarse el pago o se libera al expirar.
+    """
+    idReserva = models.AutoField(primary_key=True)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reservas')
+    cantidad = models.IntegerField()
+    referencia = models.CharField(max_length=64, db_index=True)  # client_reference_id del checkout
+    expira = models.DateTimeField(db_index=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'reserva_stock'
+        verbose_name = 'Reserva de Stock'
+        verbose_name_plural = 'Reservas de Stock'
+        ordering = ['expira']
+    
+    def __str__(self):
+        return f'Reserva {self.idReserva} - {self.producto.nombre} x{self.cantidad}'
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Categoria, Producto
+from integraciones import obtener_cloudinary
 
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -17,7 +18,7 @@ class ProductoSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Producto
-        fields = ['idProducto', 'nombre', 'precio', 'stock', 'imagen', 'idCategoria', 'fecha_creacion', 'fecha_modificacion']
+        fields = ['idProducto', 'nombre', 'descripcion', 'precio', 'stock', 'imagen', 'idCategoria', 'fecha_creacion', 'fecha_modificacion']
         read_only_fields = ['idProducto', 'fecha_creacion', 'fecha_modificacion']
     
     def create(self, validated_data):
@@ -26,6 +27,8 @@ class ProductoSerializer(serializers.ModelSerializer):
         try:
             categoria = Categoria.objects.get(idCategoria=id_categoria)
             validated_data['categoria'] = categoria
+            if 'imagen' in validated_data:
+                validated_data['imagen'] = obtener_cloudinary().preparar_imagen(validated_data['imagen'])
             return Producto.objects.create(**validated_data)
         except Categoria.DoesNotExist:
             raise serializers.ValidationError({"idCategoria": "La categoría no existe"})
@@ -41,6 +44,9 @@ class ProductoSerializer(serializers.ModelSerializer):
             except Categoria.DoesNotExist:
                 raise serializers.ValidationError({"idCategoria": "La categoría no existe"})
         
+        if 'imagen' in validated_data:
+            validated_data['imagen'] = obtener_cloudinary().preparar_imagen(validated_data['imagen'])
+        
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -51,10 +57,11 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
     """Serializer detallado para Producto (para listar/obtener con categoría completa)"""
     categoria = CategoriaSerializer(read_only=True)
     imagen_url = serializers.SerializerMethodField()
+    stock_disponible = serializers.SerializerMethodField()
     
     class Meta:
         model = Producto
-        fields = ['idProducto', 'nombre', 'precio', 'stock', 'imagen', 'imagen_url', 'categoria', 'fecha_creacion', 'fecha_modificacion']
+        fields = ['idProducto', 'nombre', 'descripcion', 'precio', 'stock', 'stock_disponible', 'imagen', 'imagen_url', 'categoria', 'fecha_creacion', 'fecha_modificacion']
         read_only_fields = ['idProducto', 'fecha_creacion', 'fecha_modificacion']
     
     def get_imagen_url(self, obj):
@@ -62,3 +69,14 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
         if obj.imagen:
             return obj.imagen.url
         return None
+    
+    def get_stock_disponible(self, obj):
+        """Stock menos las unidades reservadas por checkouts en curso"""
+        return max(obj.stock - obj.stock_reservado, 0)
+
+
+class BusquedaProductoSerializer(serializers.Serializer):
+    """Parámetros de la búsqueda de productos"""
+    q = serializers.CharField(max_length=200)
+    pagina = serializers.IntegerField(min_value=1, default=1)
+    por_pagina = serializers.IntegerField(min_value=1, max_value=100, default=20)
@@ -0,0 +1,90 @@
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+from django.db.models import F, OuterRef, Subquery
+from productos.models import Producto, Categoria
+from productos.serializers import ProductoDetailSerializer, BusquedaProductoSerializer
+from rest_framework import status
+
+
+class BusquedaProductoService:
+    """
+    Búsqueda de texto completo de productos (PostgreSQL).
+
+    Producto.busqueda guarda un tsvector con el nombre (peso A), el nombre de
+    la categoría (B) y la descripción (C) bajo la configuración es_unaccent
+    (español sin acentos: "camara" encuentra "Cámara"), con índice GIN. Se
+    actualiza al guardar un producto o su categoría (ver productos/signals.py).
+    """
+
+    CONFIGURACION = 'es_unaccent'
+
+    @staticmethod
+    def vector():
+        """Expresión del tsvector de cada producto, para usar en un UPDATE"""
+        configuracion = BusquedaProductoService.CONFIGURACION
+        # Subconsulta y no categoria__nombre: un UPDATE no admite joins
+        categoria = Subquery(
+            Categoria.objects.filter(idCategoria=OuterRef('categoria_id')).values('nombre')[:1]
+        )
+        return (
+            SearchVector('nombre', weight='A', config=configuracion) +
+            SearchVector(categoria, weight='B', config=configuracion) +
+            SearchVector('descripcion', weight='C', config=configuracion)
+        )
+
+    @staticmethod
+    def actualizar_indice(productos):
+        """Recalcula el tsvector de los productos del queryset con un solo UPDATE"""
+        return productos.update(busqueda=BusquedaProductoService.vector())
+
+    @staticmethod
+    def filtrar(productos, texto):
+        """
+        Productos del queryset que coinciden con `texto`, del más al menos
+        relevante. Acepta la sintaxis de buscador web: "frase exacta",
+        palabra1 or palabra2, -excluida.
+        """
+        consulta = SearchQuery(texto, search_type='websearch', config=BusquedaProductoService.CONFIGURACION)
+        return productos.filter(busqueda=consulta).annotate(
+            relevancia=SearchRank(F('busqueda'), consulta)
+        ).order_by('-relevancia', 'idProducto')
+
+    @staticmethod
+    def buscar(params, productos=None):
+        """
+        Página de resultados de la búsqueda, ordenada por relevancia.
+
+        Params:
+            q: texto a buscar
+            pagina (opcional): número de página, desde 1 (defecto 1)
+            por_pagina (opcional): resultados por página (1-100, defecto 20)
+        """
+        try:
+            serializer = BusquedaProductoSerializer(data=params)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+
+            validated_data = serializer.validated_data
+            if productos is None:
+                productos = Producto.objects.all()
+            resultados = BusquedaProductoService.filtrar(productos, validated_data['q'])
+
+            por_pagina = validated_data['por_pagina']
+            inicio = (validated_data['pagina'] - 1) * por_pagina
+            pagina = list(resultados.select_related('categoria')[inicio:inicio + por_pagina])
+            # Una página incompleta es la última: el total sale sin el COUNT
+            if pagina and len(pagina) < por_pagina or validated_data['pagina'] == 1 and not pagina:
+                total = inicio + len(pagina)
+            else:
+                total = resultados.count()
+
+            return True, {
+                "q": validated_data['q'],
+                "pagina": validated_data['pagina'],
+                "por_pagina": por_pagina,
+                "total": total,
+                "paginas": -(-total // por_pagina),
+                "resultados": ProductoDetailSerializer(pagina, many=True).data
+            }, status.HTTP_200_OK
+
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
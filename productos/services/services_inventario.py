@@ -0,0 +1,287 @@
+from django.db import transaction
+from django.db.models import Case, When, F, Q, IntegerField, Subquery
+from django.utils import timezone
+from productos.models import Producto, ReservaStock
+from productos.signals import stock_modificado
+
+
+class StockInsuficienteError(Exception):
+    """Se lanza cuando un producto no tiene stock suficiente para un descuento"""
+
+    def __init__(self, producto, solicitado):
+        self.producto = producto
+        self.solicitado = solicitado
+        self.disponible = max(producto.stock - producto.stock_reservado, 0)
+        super().__init__(
+            f"Stock insuficiente para {producto.nombre}. Disponible: {self.disponible}"
+        )
+
+
+class _DescuentoIncompleto(Exception):
+    """Uso interno: fuerza el rollback de un descuento parcial"""
+
+
+class InventarioService:
+    """
+    Motor único de cambios de stock usado por ventas, compras y productos.
+
+    Todos los cambios se aplican como UPDATE atómicos en la base de datos
+    (stock = stock - n WHERE stock >= n) en lugar de leer y escribir desde
+    Python, así no se pierden actualizaciones concurrentes y no hace falta
+    mantener bloqueos de fila mientras se ejecuta lógica de negocio.
+
+    Las unidades reservadas por checkouts en curso (stock_reservado) no se
+    consideran disponibles: disponible = stock - stock_reservado.
+
+    Los UPDATE de varias filas bloquean los productos en orden de idProducto
+    (ver _filas_bloqueadas), así dos carritos con los mismos productos en
+    distinto orden no se bloquean mutuamente.
+    """
+
+    @staticmethod
+    def _agrupar(cantidades):
+        """
+        Normaliza las cantidades a un dict {id_producto: cantidad}.
+        Acepta un dict o una lista de pares (id_producto, cantidad); las
+        cantidades de un mismo producto se suman.
+        """
+        items = cantidades.items() if isinstance(cantidades, dict) else cantidades
+        agrupadas = {}
+        for id_producto, cantidad in items:
+            agrupadas[id_producto] = agrupadas.get(id_producto, 0) + cantidad
+        return agrupadas
+
+    @staticmethod
+    def _expresion_stock(cantidades, signo, campo='stock'):
+        """CASE idProducto WHEN ... THEN campo +/- n para un UPDATE de varias filas"""
+        return Case(
+            *[When(idProducto=id_producto, then=F(campo) + signo * cantidad)
+              for id_producto, cantidad in cantidades.items()],
+            output_field=IntegerField()
+        )
+    
+    @staticmethod
+    def _filas_bloqueadas(ids_productos):
+        """
+        Productos a actualizar, bloqueados en orden fijo por el mismo UPDATE:
+        WHERE idProducto IN (SELECT ... ORDER BY idProducto FOR UPDATE)
+        """
+        return Producto.objects.filter(idProducto__in=Subquery(
+            Producto.objects.select_for_update().filter(
+                idProducto__in=list(ids_productos)
+            ).order_by('idProducto').values('idProducto')
+        ))
+
+    @staticmethod
+    def _condicion_disponible(cantidades):
+        """WHERE (idProducto = x AND stock - stock_reservado >= n) OR ..."""
+        condicion = Q()
+        for id_producto, cantidad in cantidades.items():
+            condicion |= Q(idProducto=id_producto, stock__gte=F('stock_reservado') + cantidad)
+        return condicion
+
+    @staticmethod
+    def _notificar(cantidades):
+        """Avisa el cambio de stock a quienes lo cachean (señal productos.signals.stock_modificado)"""
+        stock_modificado.send(sender=Producto, ids_productos=list(cantidades))
+
+    @staticmethod
+    def descontar_stock(cantidades):
+        """
+        Descuenta stock de uno o varios productos con semántica todo-o-nada.
+
+        Ejecuta un único UPDATE condicional sobre todas las líneas, que bloquea
+        los productos en orden de idProducto; si alguna no tiene stock
+        suficiente no se descuenta ninguna.
+
+        Raises:
+            StockInsuficienteError: si algún producto no tiene stock suficiente
+            Producto.DoesNotExist: si algún producto no existe
+        """
+        cantidades = InventarioService._agrupar(cantidades)
+        if not cantidades:
+            return 0
+
+        try:
+            with transaction.atomic():
+                actualizados = InventarioService._filas_bloqueadas(cantidades).filter(
+                    InventarioService._condicion_disponible(cantidades)
+                ).update(
+                    stock=InventarioService._expresion_stock(cantidades, -1),
+                    fecha_modificacion=timezone.now()
+                )
+                if actualizados != len(cantidades):
+                    # Revierte el descuento parcial de las líneas que sí tenían stock
+                    raise _DescuentoIncompleto()
+        except _DescuentoIncompleto:
+            raise InventarioService._diagnosticar(cantidades)
+
+        InventarioService._notificar(cantidades)
+        return actualizados
+
+    @staticmethod
+    def incrementar_stock(cantidades):
+        """
+        Incrementa el stock de uno o varios productos con un solo UPDATE, en su
+        propia transacción (o la que esté en curso): el SELECT ... FOR UPDATE
+        de _filas_bloqueadas necesita una, y si algún producto no existe no se
+        incrementa ninguno.
+        """
+        cantidades = InventarioService._agrupar(cantidades)
+        if not cantidades:
+            return 0
+
+        with transaction.atomic():
+            actualizados = InventarioService._filas_bloqueadas(cantidades).update(
+                stock=InventarioService._expresion_stock(cantidades, 1),
+                fecha_modificacion=timezone.now()
+            )
+            if actualizados != len(cantidades):
+                raise Producto.DoesNotExist("Uno o más productos no existen")
+        InventarioService._notificar(cantidades)
+        return actualizados
+
+    @staticmethod
+    @transaction.atomic
+    def ajustar_stock(id_producto, cantidad):
+        """
+        Suma (cantidad > 0) o resta (cantidad < 0) stock a un producto sin
+        permitir que quede negativo. Retorna el producto actualizado.
+        """
+        if cantidad < 0:
+            InventarioService.descontar_stock({id_producto: -cantidad})
+        else:
+            InventarioService.incrementar_stock({id_producto: cantidad})
+        return Producto.objects.select_related('categoria').get(idProducto=id_producto)
+
+    # ==================== RESERVAS ====================
+
+    @staticmethod
+    def reservar_stock(cantidades, referencia, expira):
+        """
+        Retiene unidades para un checkout hasta `expira`, con semántica todo-o-nada.
+
+        Cuesta un UPDATE condicional (stock_reservado += n WHERE disponible >= n)
+        y un INSERT de las reservas; no se mantiene ningún bloqueo después del
+        COMMIT, así que la llamada a Stripe puede hacerse fuera de la transacción.
+
+        Raises:
+            StockInsuficienteError: si algún producto no tiene stock disponible
+            Producto.DoesNotExist: si algún producto no existe
+        """
+        cantidades = InventarioService._agrupar(cantidades)
+
+        try:
+            with transaction.atomic():
+                actualizados = InventarioService._filas_bloqueadas(cantidades).filter(
+                    InventarioService._condicion_disponible(cantidades)
+                ).update(
+                    stock_reservado=InventarioService._expresion_stock(cantidades, 1, 'stock_reservado'),
+                    fecha_modificacion=timezone.now()
+                )
+                if actualizados != len(cantidades):
+                    raise _DescuentoIncompleto()
+
+                ReservaStock.objects.bulk_create([
+                    ReservaStock(
+                        producto_id=id_producto,
+                        cantidad=cantidad,
+                        referencia=referencia,
+                        expira=expira
+                    )
+                    for id_producto, cantidad in cantidades.items()
+                ])
+        except _DescuentoIncompleto:
+            raise InventarioService._diagnosticar(cantidades)
+
+        InventarioService._notificar(cantidades)
+
+    @staticmethod
+    @transaction.atomic
+    def confirmar_reserva(referencia):
+        """
+        Convierte las reservas de un checkout pagado en descuento de stock.
+        Retorna False si ya no hay reservas (expiraron y fueron liberadas).
+        """
+        reservas = list(
+            ReservaStock.objects.select_for_update().filter(referencia=referencia)
+        )
+        if not reservas:
+            return False
+
+        cantidades = InventarioService._agrupar(
+            (reserva.producto_id, reserva.cantidad) for reserva in reservas
+        )
+        InventarioService._filas_bloqueadas(cantidades).update(
+            stock=InventarioService._expresion_stock(cantidades, -1),
+            stock_reservado=InventarioService._expresion_stock(cantidades, -1, 'stock_reservado'),
+            fecha_modificacion=timezone.now()
+        )
+        ReservaStock.objects.filter(idReserva__in=[r.idReserva for r in reservas]).delete()
+        InventarioService._notificar(cantidades)
+        return True
+
+    @staticmethod
+    def liberar_reserva(referencia):
+        """Libera las reservas de un checkout cancelado o expirado"""
+        return InventarioService.liberar_reservas([referencia])
+
+    @staticmethod
+    @transaction.atomic
+    def liberar_reservas(referencias):
+        """Libera de una vez las reservas de varios checkouts (un SELECT, un UPDATE y un DELETE)"""
+        reservas = list(
+            ReservaStock.objects.select_for_update().filter(referencia__in=referencias)
+        )
+        return InventarioService._liberar(reservas)
+
+    @staticmethod
+    def liberar_reservas_vencidas(lote=1000):
+        """
+        Libera en bloque las reservas vencidas, de a `lote` por transacción.
+        Las filas bloqueadas por un checkout que se está confirmando se saltan.
+        Retorna la cantidad de reservas liberadas.
+        """
+        total = 0
+        while True:
+            with transaction.atomic():
+                reservas = list(
+                    ReservaStock.objects.select_for_update(skip_locked=True).filter(
+                        expira__lte=timezone.now()
+                    ).order_by('expira')[:lote]
+                )
+                liberadas = InventarioService._liberar(reservas)
+            total += liberadas
+            if liberadas < lote:
+                return total
+
+    @staticmethod
+    def _liberar(reservas):
+        """Devuelve al stock disponible las reservas dadas (UPDATE + DELETE)"""
+        if not reservas:
+            return 0
+
+        cantidades = InventarioService._agrupar(
+            (reserva.producto_id, reserva.cantidad) for reserva in reservas
+        )
+        InventarioService._filas_bloqueadas(cantidades).update(
+            stock_reservado=InventarioService._expresion_stock(cantidades, -1, 'stock_reservado'),
+            fecha_modificacion=timezone.now()
+        )
+        ReservaStock.objects.filter(idReserva__in=[r.idReserva for r in reservas]).delete()
+        InventarioService._notificar(cantidades)
+        return len(reservas)
+
+    @staticmethod
+    def _diagnosticar(cantidades):
+        """Construye la excepción que explica por qué falló un descuento"""
+        productos = Producto.objects.in_bulk(list(cantidades.keys()))
+        for id_producto, cantidad in cantidades.items():
+            producto = productos.get(id_producto)
+            if producto is None:
+                return Producto.DoesNotExist("Uno o más productos no existen")
+            if producto.stock - producto.stock_reservado < cantidad:
+                return StockInsuficienteError(producto, cantidad)
+        # El stock cambió entre el UPDATE y la lectura; se informa el primero
+        id_producto, cantidad = next(iter(cantidades.items()))
+        return StockInsuficienteError(productos[id_producto], cantidad)
@@ -1,7 +1,9 @@
 from productos.models import Producto, Categoria
 from productos.serializers import ProductoSerializer, ProductoDetailSerializer
+from productos.services.services_inventario import InventarioService, StockInsuficienteError
 from rest_framework import status
-from django.db.models import Q
+from productos.services.services_busqueda import BusquedaProductoService
+from integraciones import IntegracionNoDisponible
 
 
 class ProductoService:
@@ -28,6 +30,8 @@ class ProductoService:
                 detail_serializer = ProductoDetailSerializer(producto)
                 return True, detail_serializer.data, status.HTTP_201_CREATED
             return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
@@ -57,6 +61,8 @@ class ProductoService:
             return False, serializer.errors, status.HTTP_400_BAD_REQUEST
         except Producto.DoesNotExist:
             return False, {"error": "Producto no encontrado"}, status.HTTP_404_NOT_FOUND
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
@@ -76,16 +82,12 @@ class ProductoService:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
     @staticmethod
-    def buscar_productos(query):
-        """Busca productos por nombre"""
-        try:
-            productos = Producto.objects.select_related('categoria').filter(
-                Q(nombre__icontains=query)
-            )
-            serializer = ProductoDetailSerializer(productos, many=True)
-            return True, serializer.data, status.HTTP_200_OK
-        except Exception as e:
-            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    def buscar_productos(params):
+        """
+        Busca productos por nombre, categoría y descripción (texto completo),
+        ordenados por relevancia y paginados (ver BusquedaProductoService.buscar)
+        """
+        return BusquedaProductoService.buscar(params)
     
     @staticmethod
     def listar_productos_por_categoria(id_categoria):
@@ -103,21 +105,19 @@ class ProductoService:
     
     @staticmethod
     def actualizar_stock(id_producto, cantidad):
-        """Actualiza el stock de un producto"""
+        """
+        Actualiza el stock de un producto.
+        El cambio se aplica con un UPDATE atómico (stock = stock + cantidad) y
+        los descuentos solo se aplican si no dejan el stock en negativo.
+        """
         try:
-            producto = Producto.objects.get(idProducto=id_producto)
-            nuevo_stock = producto.stock + cantidad
-            
-            if nuevo_stock < 0:
-                return False, {
-                    "error": "El stock no puede ser negativo"
-                }, status.HTTP_400_BAD_REQUEST
-            
-            producto.stock = nuevo_stock
-            producto.save()
-            
+            producto = InventarioService.ajustar_stock(id_producto, cantidad)
             serializer = ProductoDetailSerializer(producto)
             return True, serializer.data, status.HTTP_200_OK
+        except StockInsuficienteError:
+            return False, {
+                "error": "El stock no puede ser negativo"
+            }, status.HTTP_400_BAD_REQUEST
         except Producto.DoesNotExist:
             return False, {"error": "Producto no encontrado"}, status.HTTP_404_NOT_FOUND
         except Exception as e:
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+from productos.models import Producto, Categoria
+from productos.services.services_busqueda import BusquedaProductoService
+
+# Enviada por InventarioService después de cada UPDATE de stock o stock_reservado
+# (los UPDATE en bloque no disparan post_save). Argumentos: ids_productos
+stock_modificado = Signal()
+
+
+# Campos de Producto que forman parte del tsvector de búsqueda
+CAMPOS_BUSQUEDA = {'nombre', 'descripcion', 'categoria'}
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_busqueda_producto(sender, instance, update_fields=None, **kwargs):
+    """Recalcula el tsvector del producto guardado (salvo que solo cambien otros campos)"""
+    if update_fields and not CAMPOS_BUSQUEDA & set(update_fields):
+        return
+    BusquedaProductoService.actualizar_indice(Producto.objects.filter(idProducto=instance.idProducto))
+
+
+@receiver(post_save, sender=Categoria)
+def actualizar_busqueda_categoria(sender, instance, created, **kwargs):
+    """El nombre de la categoría está en el tsvector de todos sus productos"""
+    if not created:
+        BusquedaProductoService.actualizar_indice(Producto.objects.filter(categoria_id=instance.idCategoria))
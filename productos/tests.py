@@ -1,3 +1,61 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
+from productos.models import Categoria, Producto, ReservaStock
+from productos.services.services_inventario import InventarioService, StockInsuficienteError
 
-# Create your tests here.
+
+class InventarioServiceTests(TestCase):
+    """Descuentos todo-o-nada y reservas de stock"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Cámaras')
+        self.camara = Producto.objects.create(nombre='Cámara', precio=100, stock=5, categoria=categoria)
+        self.lente = Producto.objects.create(nombre='Lente', precio=50, stock=2, categoria=categoria)
+
+    def stock(self, producto):
+        producto.refresh_from_db()
+        return producto.stock, producto.stock_reservado
+
+    def test_faltante_parcial_no_descuenta_ninguna_linea(self):
+        # La cámara alcanza, el lente no: no se descuenta ninguna de las dos
+        with self.assertRaises(StockInsuficienteError) as contexto:
+            InventarioService.descontar_stock({self.camara.idProducto: 2, self.lente.idProducto: 3})
+
+        self.assertEqual(contexto.exception.producto.idProducto, self.lente.idProducto)
+        self.assertEqual(self.stock(self.camara), (5, 0))
+        self.assertEqual(self.stock(self.lente), (2, 0))
+
+    def test_incremento_con_producto_inexistente_no_suma_ninguna_linea(self):
+        with self.assertRaises(Producto.DoesNotExist):
+            InventarioService.incrementar_stock({self.camara.idProducto: 3, 999999: 1})
+
+        self.assertEqual(self.stock(self.camara), (5, 0))
+
+    def test_unidades_reservadas_no_estan_disponibles(self):
+        InventarioService.reservar_stock(
+            {self.lente.idProducto: 2}, 'checkout-1', timezone.now() + timedelta(minutes=15)
+        )
+
+        with self.assertRaises(StockInsuficienteError):
+            InventarioService.descontar_stock([(self.camara.idProducto, 1), (self.lente.idProducto, 1)])
+        self.assertEqual(self.stock(self.camara), (5, 0))
+        self.assertEqual(self.stock(self.lente), (2, 2))
+
+    def test_reserva_vencida_libera_el_stock(self):
+        InventarioService.reservar_stock(
+            {self.camara.idProducto: 3, self.lente.idProducto: 2}, 'checkout-1', timezone.now() - timedelta(seconds=1)
+        )
+        InventarioService.reservar_stock(
+            {self.camara.idProducto: 1}, 'checkout-2', timezone.now() + timedelta(minutes=15)
+        )
+
+        self.assertEqual(InventarioService.liberar_reservas_vencidas(), 2)
+        self.assertEqual(self.stock(self.camara), (5, 1))
+        self.assertEqual(self.stock(self.lente), (2, 0))
+        self.assertEqual(list(ReservaStock.objects.values_list('referencia', flat=True)), ['checkout-2'])
+
+        # Lo liberado vuelve a estar disponible
+        InventarioService.descontar_stock({self.camara.idProducto: 4, self.lente.idProducto: 2})
+        self.assertEqual(self.stock(self.camara), (1, 1))
+        self.assertEqual(self.stock(self.lente), (0, 0))
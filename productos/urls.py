@@ -41,7 +41,7 @@ urlpatterns = [
     # DELETE /api/productos/<id>/ - Eliminar un producto
     path('<int:id_producto>/', ProductoDetailView.as_view(), name='producto-detail'),
     
-    # GET /api/productos/buscar/?q=<query> - Buscar productos
+    # GET /api/productos/buscar/?q=<query>&pagina=<n>&por_pagina=<n> - Buscar productos por relevancia
     path('buscar/', ProductoBuscarView.as_view(), name='producto-buscar'),
     
     # GET /api/productos/categoria/<id_categoria>/ - Listar productos por categoría
@@ -110,11 +110,11 @@ class ProductoBuscarView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Busca productos por nombre"""
+        """Busca productos por nombre, categoría o descripción (?q=&pagina=&por_pagina=)"""
         query = request.query_params.get('q', '')
         if not query:
             return Response({"error": "Debe proporcionar un término de búsqueda (q)"}, status=400)
-        success, data, status = ProductoService.buscar_productos(query)
+        success, data, status = ProductoService.buscar_productos(request.query_params)
         return Response(data, status=status)
 
 
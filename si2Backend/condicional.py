@@ -0,0 +1,33 @@
+"""
+GET condicional (ETag / 304 Not Modified) para las APIView de lectura.
+
+    @get_condicional(CatalogoService.validador)
+    class CatalogoProductosListView(APIView):
+        ...
+
+El validador recibe los mismos argumentos que el método get (request ya
+autenticado) y retorna una tupla de valores que cambian cuando cambia la
+respuesta, calculados con una consulta indexada (un contador de versión
+global o por usuario, incrementado al confirmarse cada cambio). Si el ETag resultante
+coincide con el If-None-Match del cliente se responde 304 sin ejecutar la vista.
+"""
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def _etag(validador):
+    def etag(request, *args, **kwargs):
+        partes = validador(request, *args, **kwargs)
+        if partes is None:
+            return None
+        # La URL completa entra en el ETag: cada combinación de parámetros es otra respuesta
+        firma = repr((request.get_full_path(), *partes))
+        return hashlib.md5(firma.encode(), usedforsecurity=False).hexdigest()
+    return etag
+
+
+def get_condicional(validador):
+    """Decorador de clase que agrega ETag y respuestas 304 al get de una APIView"""
+    return method_decorator(condition(etag_func=_etag(validador)), name='get')
@@ -0,0 +1,81 @@
+"""
+Utilidades de base de datos compartidas por las apps del proyecto.
+"""
+from django.db import connection
+
+
+def upsert_incremental(modelo, filas, claves, incrementos, condicion=None):
+    """
+    Inserta filas o, si ya existen, les suma los valores, en una sola sentencia:
+
+        INSERT INTO tabla (...) VALUES (...), (...)
+        ON CONFLICT (claves) [WHERE condicion]
+        DO UPDATE SET campo = tabla.campo + EXCLUDED.campo
+
+    Es seguro con escrituras concurrentes sobre la misma fila (no hay lectura
+    previa desde Python) y requiere un índice único sobre `claves`.
+
+    Args:
+        modelo: clase del modelo Django
+        filas (list[dict]): valores por nombre de campo (claves + incrementos)
+        claves (list[str]): campos del índice único
+        incrementos (list[str]): campos que se suman en caso de conflicto
+        condicion (str): predicado SQL del índice único parcial, si lo es
+
+    Returns:
+        int: filas insertadas o actualizadas
+    """
+    return _upsert(modelo, filas, claves, incrementos, '{tabla}.{columna} + EXCLUDED.{columna}', condicion)
+
+
+def upsert(modelo, filas, claves, campos, condicion=None):
+    """
+    Inserta filas o, si ya existen, les reemplaza los valores, en una sola sentencia:
+
+        INSERT INTO tabla (...) VALUES (...), (...)
+        ON CONFLICT (claves) [WHERE condicion]
+        DO UPDATE SET campo = EXCLUDED.campo
+
+    A diferencia de borrar e insertar, las filas que no cambian de clave se
+    actualizan en su lugar. Requiere un índice único sobre `claves`.
+
+    Args:
+        modelo: clase del modelo Django
+        filas (list[dict]): valores por nombre de campo (claves + campos)
+        claves (list[str]): campos del índice único
+        campos (list[str]): campos que se reemplazan en caso de conflicto
+        condicion (str): predicado SQL del índice único parcial, si lo es
+
+    Returns:
+        int: filas insertadas o actualizadas
+    """
+    return _upsert(modelo, filas, claves, campos, 'EXCLUDED.{columna}', condicion)
+
+
+def _upsert(modelo, filas, claves, campos_conflicto, valor_conflicto, condicion):
+    if not filas:
+        return 0
+
+    qn = connection.ops.quote_name
+    tabla = qn(modelo._meta.db_table)
+    campos = list(claves) + list(campos_conflicto)
+    columnas = [qn(modelo._meta.get_field(campo).column) for campo in campos]
+
+    valores = ', '.join(['(' + ', '.join(['%s'] * len(campos)) + ')'] * len(filas))
+    parametros = [fila[campo] for fila in filas for campo in campos]
+
+    actualizaciones = ', '.join(
+        f'{columna} = {valor_conflicto.format(tabla=tabla, columna=columna)}'
+        for columna in columnas[len(claves):]
+    )
+    sql = (
+        f'INSERT INTO {tabla} ({", ".join(columnas)}) VALUES {valores} '
+        f'ON CONFLICT ({", ".join(columnas[:len(claves)])})'
+        f'{f" WHERE {condicion}" if condicion else ""} '
+        f'DO UPDATE SET {actualizaciones}'
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.rowcount
+
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Búsqueda de texto completo de productos
     'corsheaders',  # CORS headers
     'rest_framework',
     'rest_framework_simplejwt',
@@ -161,6 +162,13 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 # Media files
 MEDIA_URL = '/media/'
 
+# Cache
+# Por defecto en memoria de cada proceso; en producción usar un backend
+# compartido, por ejemplo CACHE_URL=rediscache://host:6379/1
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -251,3 +259,56 @@ STRIPE_WEBHOOK_SECRET = env('STRIPE_WEBHOOK_SECRET', default='')
 
 # URL del frontend (para redirecciones después del pago)
 FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
+
+# Minutos que se reserva el stock de un checkout al contado (Stripe acepta de 30 min a 24 h)
+RESERVA_STOCK_MINUTOS = env.int('RESERVA_STOCK_MINUTOS', default=30)
+
+# Tasa de mora diaria sobre el monto de cada cuota vencida (0.001 = 0.1% por día)
+CUOTA_TASA_MORA_DIARIA = env.float('CUOTA_TASA_MORA_DIARIA', default=0.001)
+
+# Checkout asíncrono: hilos por proceso que llaman a Stripe y solicitudes en cola
+# por proceso antes de responder 503
+CHECKOUT_ASINCRONO_HILOS = env.int('CHECKOUT_ASINCRONO_HILOS', default=4)
+CHECKOUT_ASINCRONO_MAX_EN_COLA = env.int('CHECKOUT_ASINCRONO_MAX_EN_COLA', default=50)
+
+# Segundos máximos que GET de una solicitud de checkout espera un resultado. Cada
+# espera ocupa un worker: se mantiene corta y el cliente reintenta según Retry-After
+CHECKOUT_ASINCRONO_ESPERA_MAXIMA = env.float('CHECKOUT_ASINCRONO_ESPERA_MAXIMA', default=2)
+
+# ==================== INTEGRACIONES ====================
+# Por proveedor: timeout por intento (s), intentos totales, plazo total por llamada (s),
+# fallos transitorios seguidos que abren el circuito y segundos que permanece abierto
+INTEGRACIONES = {
+    'stripe': {
+        'timeout': env.float('STRIPE_TIMEOUT', default=10),
+        'intentos': env.int('STRIPE_INTENTOS', default=3),
+        'plazo': env.float('STRIPE_PLAZO', default=20),
+        'umbral_fallos': 5,
+        'segundos_abierto': 30,
+    },
+    'firebase': {
+        'timeout': env.float('FIREBASE_TIMEOUT', default=5),
+        'intentos': env.int('FIREBASE_INTENTOS', default=2),
+        'plazo': env.float('FIREBASE_PLAZO', default=10),
+        'umbral_fallos': 5,
+        'segundos_abierto': 60,
+    },
+    'cloudinary': {
+        'timeout': env.float('CLOUDINARY_TIMEOUT', default=30),
+        'intentos': env.int('CLOUDINARY_INTENTOS', default=2),
+        'plazo': env.float('CLOUDINARY_PLAZO', default=60),
+        'umbral_fallos': 3,
+        'segundos_abierto': 60,
+    },
+}
+
+# Proveedores que usan la implementación local de integraciones/falsos.py (ej. "stripe,firebase")
+INTEGRACIONES_FALSAS = env.list('INTEGRACIONES_FALSAS', default=[])
+
+# Segundos que se guarda cada respuesta del catálogo público; los cambios de
+# productos, categorías o stock la invalidan antes (ver catalogo/service_cache.py)
+CATALOGO_CACHE_SEGUNDOS = env.int('CATALOGO_CACHE_SEGUNDOS', default=300)
+
+# Cada proceso acumula en memoria las vistas del detalle de productos y las
+# guarda con un upsert por lote cada tantos segundos (ver catalogo/service_vistas.py)
+CATALOGO_VISTAS_VOLCADO_SEGUNDOS = env.int('CATALOGO_VISTAS_VOLCADO_SEGUNDOS', default=60)
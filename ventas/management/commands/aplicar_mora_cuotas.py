@@ -0,0 +1,39 @@
+"""
+Acumula la mora diaria de las cuotas vencidas (pensado para correr cada noche).
+
+Repetir la ejecución para la misma fecha de corte no suma mora dos veces, y si
+una ejecución se interrumpe la siguiente completa las cuotas que faltaron.
+
+Uso:
+    python manage.py aplicar_mora_cuotas                        # corte hoy, tasa de settings
+    python manage.py aplicar_mora_cuotas --fecha 2025-06-30 --tasa 0.002
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from ventas.services.service_mora import MoraService
+
+
+class Command(BaseCommand):
+    help = 'Acumula la mora de las cuotas vencidas con UPDATE por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat,
+                            help='Fecha de corte (YYYY-MM-DD); por defecto hoy')
+        parser.add_argument('--tasa', type=float,
+                            help='Tasa de mora diaria; por defecto CUOTA_TASA_MORA_DIARIA')
+        parser.add_argument('--lote', type=int, default=10000,
+                            help='Rango de IDs de cuota actualizado por transacción')
+
+    def handle(self, *args, **options):
+        ejecucion, afectadas, duracion = MoraService.aplicar_mora(
+            fecha_corte=options['fecha'],
+            tasa_diaria=options['tasa'],
+            lote=options['lote']
+        )
+        self.stdout.write(f'Cuotas actualizadas: {afectadas} en {duracion:.2f} s')
+        self.stdout.write(
+            f'Total de la fecha {ejecucion.fecha_corte} (tasa {ejecucion.tasa_diaria}): '
+            f'{ejecucion.cuotas_afectadas} cuotas, ${ejecucion.monto_generado:.2f} de mora generada'
+        )
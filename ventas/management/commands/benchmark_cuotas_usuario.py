@@ -0,0 +1,121 @@
+"""
+Benchmark de las consultas "mis cuotas" y "mis ventas".
+
+Genera un volumen grande de cuotas (un millón por defecto) repartidas entre
+muchos usuarios y, para un usuario de muestra, compara el filtro anterior por
+JOIN (venta__usuario) con el filtro por la columna copiada Cuota.usuario.
+Muestra el tiempo promedio de cada consulta y su plan (EXPLAIN; en PostgreSQL
+con ANALYZE).
+
+Uso:
+    python manage.py benchmark_cuotas_usuario
+    python manage.py benchmark_cuotas_usuario --cuotas 200000 --usuarios 2000 --repeticiones 20
+"""
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from usuarios.models import Rol, Usuario
+from ventas.models import MetodoPago, Venta, Cuota
+
+
+class Command(BaseCommand):
+    help = 'Compara tiempo y plan de las consultas de cuotas por usuario (JOIN contra columna copiada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cuotas', type=int, default=1_000_000,
+                            help='Cantidad de cuotas a generar')
+        parser.add_argument('--usuarios', type=int, default=10_000,
+                            help='Usuarios entre los que se reparten las ventas')
+        parser.add_argument('--repeticiones', type=int, default=10,
+                            help='Ejecuciones de cada consulta')
+        parser.add_argument('--lote', type=int, default=10_000,
+                            help='Filas por INSERT al generar los datos')
+
+    def handle(self, *args, **options):
+        metodo_pago = MetodoPago.objects.first()
+        if metodo_pago is None:
+            raise CommandError('No hay métodos de pago. Ejecute las migraciones primero.')
+
+        sufijo = uuid.uuid4().hex[:8]
+        rol, _ = Rol.objects.get_or_create(nombre='Cliente')
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(
+                username=f'benchmark_{sufijo}_{i}',
+                email=f'benchmark_{sufijo}_{i}@example.com',
+                password='!',
+                rol=rol
+            )
+            for i in range(options['usuarios'])
+        ], batch_size=options['lote'])
+
+        try:
+            inicio = time.perf_counter()
+            self._generar(usuarios, metodo_pago, options['cuotas'], options['lote'])
+            self.stdout.write(
+                f"{options['cuotas']} cuotas generadas en {time.perf_counter() - inicio:.1f} s"
+            )
+
+            usuario = random.choice(usuarios)
+            consultas = [
+                ('mis cuotas (JOIN)', Cuota.objects.filter(venta__usuario=usuario).order_by('fecha_vencimiento')),
+                ('mis cuotas (columna)', Cuota.objects.filter(usuario=usuario).order_by('fecha_vencimiento')),
+                ('mis pendientes (JOIN)', Cuota.objects.filter(venta__usuario=usuario, pagada=False).order_by('fecha_vencimiento')),
+                ('mis pendientes (columna)', Cuota.objects.filter(usuario=usuario, pagada=False).order_by('fecha_vencimiento')),
+                ('mis ventas', Venta.objects.filter(usuario=usuario).order_by('-fecha_venta')),
+            ]
+            opciones_explain = {'analyze': True} if connection.vendor == 'postgresql' else {}
+
+            self.stdout.write(f"\n{'consulta':<26} {'filas':>6} {'promedio ms':>12}")
+            planes = []
+            for nombre, consulta in consultas:
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    filas = len(list(consulta.values_list('pk', flat=True)))
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                self.stdout.write(f'{nombre:<26} {filas:>6} {sum(tiempos) / len(tiempos):>12.3f}')
+                planes.append((nombre, consulta.explain(**opciones_explain)))
+
+            for nombre, plan in planes:
+                self.stdout.write(f'\n--- {nombre} ---\n{plan}')
+        finally:
+            Cuota.objects.filter(usuario__in=usuarios).delete()
+            Venta.objects.filter(usuario__in=usuarios).delete()
+            Usuario.objects.filter(username__startswith=f'benchmark_{sufijo}_').delete()
+
+    def _generar(self, usuarios, metodo_pago, total_cuotas, lote):
+        """Ventas de 12 cuotas con la primera mitad pagada, en INSERTs por lotes"""
+        hoy = timezone.now().date()
+        cantidad_ventas = max(1, total_cuotas // 12)
+
+        for desde in range(0, cantidad_ventas, lote):
+            ventas = Venta.objects.bulk_create([
+                Venta(
+                    usuario=random.choice(usuarios),
+                    metodoPago=metodo_pago,
+                    subtotal=120.0,
+                    total=134.4,
+                    nrocuotas=12
+                )
+                for _ in range(min(lote, cantidad_ventas - desde))
+            ])
+
+            cuotas = [
+                Cuota(
+                    venta_id=venta.pk,
+                    usuario_id=venta.usuario_id,
+                    numero_cuota=i,
+                    monto=11.2,
+                    fecha_vencimiento=hoy + timedelta(days=30 * (i - 6)),
+                    pagada=i <= 6
+                )
+                for venta in ventas
+                for i in range(1, 13)
+            ]
+            Cuota.objects.bulk_create(cuotas, batch_size=lote)
@@ -0,0 +1,138 @@
+"""
+Benchmark de VentaService.crear_venta_con_cuotas.
+
+Mide, para distintos tamaños de carrito, cuántas consultas (round trips) hace
+la creación de una venta en cuotas y cuánto tiempo se mantienen bloqueadas las
+filas de producto (desde la primera sentencia que las bloquea hasta el COMMIT).
+
+Uso:
+    python manage.py benchmark_venta_cuotas
+    python manage.py benchmark_venta_cuotas --tamanos 1 5 20 50 --cuotas 12 --repeticiones 5
+"""
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from productos.models import Categoria, Producto
+from usuarios.models import Rol, Usuario
+from ventas.models import MetodoPago, Venta, ResumenVentaDiario
+from ventas.services.service_venta import VentaService
+
+
+class MedidorBloqueo:
+    """
+    Registra el instante de la primera sentencia que bloquea filas de producto
+    (SELECT ... FOR UPDATE o UPDATE producto) y el instante del COMMIT que las
+    libera.
+    """
+
+    def __init__(self):
+        self.inicio_bloqueo = None
+        self.fin_bloqueo = None
+
+    def __call__(self, execute, sql, params, many, context):
+        sql_normalizado = sql.lstrip().upper()
+        if self.inicio_bloqueo is None and (
+            'FOR UPDATE' in sql_normalizado or sql_normalizado.startswith('UPDATE "PRODUCTO"')
+        ):
+            self.inicio_bloqueo = time.perf_counter()
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def medir(self):
+        commit_original = connection.commit
+
+        def commit_medido():
+            commit_original()
+            if self.inicio_bloqueo is not None and self.fin_bloqueo is None:
+                self.fin_bloqueo = time.perf_counter()
+
+        connection.commit = commit_medido
+        try:
+            with connection.execute_wrapper(self):
+                yield self
+        finally:
+            del connection.commit
+
+    @property
+    def milisegundos(self):
+        if self.inicio_bloqueo is None or self.fin_bloqueo is None:
+            return 0.0
+        return (self.fin_bloqueo - self.inicio_bloqueo) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Mide round trips y tiempo de bloqueo de crear_venta_con_cuotas según el tamaño del carrito'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[1, 5, 10, 20, 50],
+                            help='Tamaños de carrito (cantidad de productos distintos)')
+        parser.add_argument('--cuotas', type=int, default=12, choices=[3, 6, 12],
+                            help='Número de cuotas de cada venta')
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Ventas por tamaño de carrito')
+
+    def handle(self, *args, **options):
+        metodo_pago = MetodoPago.objects.first()
+        if metodo_pago is None:
+            raise CommandError('No hay métodos de pago. Ejecute las migraciones primero.')
+
+        sufijo = uuid.uuid4().hex[:8]
+        rol, _ = Rol.objects.get_or_create(nombre='Cliente')
+        usuario = Usuario.objects.create(
+            username=f'benchmark_{sufijo}',
+            email=f'benchmark_{sufijo}@example.com',
+            password='!',
+            rol=rol
+        )
+        categoria = Categoria.objects.create(nombre=f'Benchmark {sufijo}')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto benchmark {i}', precio=10.0 + i, stock=1_000_000, categoria=categoria)
+            for i in range(max(options['tamanos']))
+        ])
+
+        self.stdout.write(
+            f"{'productos':>10} {'consultas':>10} {'bloqueo ms':>12} {'total ms':>10}"
+        )
+
+        try:
+            for tamano in options['tamanos']:
+                data = {
+                    'metodoPago': metodo_pago.idMetodoPago,
+                    'nrocuotas': options['cuotas'],
+                    'detalles': [
+                        {'producto': producto.idProducto, 'cantidad': 1}
+                        for producto in productos[:tamano]
+                    ],
+                }
+
+                consultas, bloqueo, total = [], [], []
+                for _ in range(options['repeticiones']):
+                    medidor = MedidorBloqueo()
+
+                    inicio = time.perf_counter()
+                    with CaptureQueriesContext(connection) as capturadas, medidor.medir():
+                        success, result, status_code = VentaService.crear_venta_con_cuotas(data, usuario)
+                    total.append((time.perf_counter() - inicio) * 1000)
+
+                    if not success:
+                        raise CommandError(f'La venta falló: {result}')
+
+                    consultas.append(len(capturadas.captured_queries))
+                    bloqueo.append(medidor.milisegundos)
+
+                self.stdout.write(
+                    f'{tamano:>10} {sum(consultas) / len(consultas):>10.1f} '
+                    f'{sum(bloqueo) / len(bloqueo):>12.2f} {sum(total) / len(total):>10.2f}'
+                )
+        finally:
+            Venta.objects.filter(usuario=usuario).delete()
+            # Los resúmenes diarios de la categoría de prueba solo tienen estas ventas
+            ResumenVentaDiario.objects.filter(categoria=categoria).delete()
+            Producto.objects.filter(categoria=categoria).delete()
+            categoria.delete()
+            usuario.delete()
@@ -0,0 +1,118 @@
+"""
+Concilia con Stripe los pagos cuyo webhook no llegó: cuotas pendientes con un
+Payment Intent o Checkout Session ya pagados y checkouts al contado pagados
+sin venta (ver ConciliacionService).
+
+Uso:
+    python manage.py conciliar_stripe --dry-run             # solo muestra las diferencias
+    python manage.py conciliar_stripe --hilos 8 --por-segundo 20
+    python manage.py conciliar_stripe --falso --falso-pagados 0.3 --dry-run   # contra el Stripe local
+"""
+import random
+from collections import defaultdict
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from integraciones import IntegracionNoDisponible
+from integraciones.falsos import StripeFalso
+from ventas.models import Cuota, CheckoutPendiente
+from ventas.services.service_conciliacion import ConciliacionService
+
+
+class Command(BaseCommand):
+    help = 'Liquida cuotas y crea ventas pagadas en Stripe cuyo webhook no se procesó'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Muestra las diferencias sin modificar la base de datos')
+        parser.add_argument('--hilos', type=int, default=8,
+                            help='Consultas simultáneas a Stripe')
+        parser.add_argument('--por-segundo', type=float, default=20,
+                            help='Máximo de consultas por segundo a Stripe (en modo test Stripe permite 25)')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Registros locales por página')
+        parser.add_argument('--dias', type=int, default=30,
+                            help='Solo registros modificados en los últimos N días; 0 revisa todos')
+        parser.add_argument('--falso', action='store_true',
+                            help='Usa un Stripe local poblado con los IDs pendientes de la base')
+        parser.add_argument('--falso-pagados', type=float, default=0.5,
+                            help='Con --falso, fracción de objetos que figuran pagados')
+        parser.add_argument('--falso-latencia', type=float, default=0.05,
+                            help='Con --falso, segundos de latencia simulada por consulta')
+
+    def handle(self, *args, **options):
+        cliente = self._stripe_falso(options) if options['falso'] else None
+        conciliacion = ConciliacionService(
+            cliente=cliente,
+            hilos=options['hilos'],
+            por_segundo=options['por_segundo'],
+            lote=options['lote'],
+            dias=options['dias'],
+            aplicar=not options['dry_run']
+        )
+
+        def al_terminar_pagina(tipo, pagina):
+            for cambio in conciliacion.cambios:
+                self.stdout.write(('[dry-run] ' if options['dry_run'] else '') + cambio)
+            conciliacion.cambios.clear()
+
+        inicio = time.perf_counter()
+        try:
+            resumen = conciliacion.ejecutar(al_terminar_pagina)
+        except IntegracionNoDisponible as e:
+            self.stderr.write(f'Conciliación interrumpida: {e}')
+            resumen = conciliacion.resumen
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{'[dry-run] ' if options['dry_run'] else ''}"
+            f"Consultados: {resumen['consultados']} ({resumen['consultados'] / duracion:.1f}/s)"
+            f" | Cuotas pagadas: {resumen['cuotas_pagadas']}"
+            f" | Ventas creadas: {resumen['ventas_creadas']}"
+            f" | Checkouts expirados: {resumen['checkouts_expirados']}"
+            f" | No encontrados: {resumen['no_encontrados']}"
+            f" | Errores: {resumen['errores']}"
+            f" | {duracion:.1f} s"
+        )
+
+    def _stripe_falso(self, options):
+        """StripeFalso con un objeto por cada ID pendiente en la base, pagado o no al azar"""
+        falso = StripeFalso(**settings.INTEGRACIONES['stripe'])
+        falso.latencia = options['falso_latencia']
+        pagado = lambda: random.random() < options['falso_pagados']
+
+        cuotas = Cuota.objects.filter(pagada=False).filter(
+            Q(stripe_payment_intent_id__isnull=False) | Q(stripe_checkout_session_id__isnull=False)
+        ).values_list('idCuota', 'stripe_payment_intent_id', 'stripe_checkout_session_id')
+        sesiones = set(
+            CheckoutPendiente.objects.filter(estado__in=['pendiente', 'expirado'])
+            .values_list('stripe_checkout_session_id', flat=True)
+        )
+        # Como en Stripe, el metadata de cada pago lista las cuotas que cubre
+        intents = defaultdict(list)
+        sesiones_cuotas = defaultdict(list)
+        for id_cuota, id_intent, id_sesion in cuotas.iterator():
+            if id_intent:
+                intents[id_intent].append(str(id_cuota))
+            if id_sesion:
+                sesiones_cuotas[id_sesion].append(str(id_cuota))
+        for id_intent, ids_cuotas in intents.items():
+            falso.registrar({
+                'id': id_intent, 'object': 'payment_intent',
+                'status': 'succeeded' if pagado() else 'requires_payment_method',
+                'metadata': {'cuota_ids': ','.join(ids_cuotas)}
+            })
+        for id_sesion in sesiones | set(sesiones_cuotas):
+            ids_cuotas = sesiones_cuotas.get(id_sesion)
+            sesion_pagada = pagado()
+            falso.registrar({
+                'id': id_sesion, 'object': 'checkout.session',
+                'status': 'complete' if sesion_pagada else random.choice(['open', 'expired']),
+                'payment_status': 'paid' if sesion_pagada else 'unpaid',
+                'payment_intent': None,
+                'metadata': {'cuota_ids': ','.join(ids_cuotas)} if ids_cuotas else {'tipo': 'venta_contado'}
+            })
+        return falso
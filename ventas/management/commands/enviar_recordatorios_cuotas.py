@@ -0,0 +1,41 @@
+"""
+Envía recordatorios de cuotas por vencer y avisos de cuotas recién vencidas.
+
+Pensado para correr una vez al día (cron). Cada ejecución retoma desde la
+marca de agua de la anterior, así que puede repetirse o interrumpirse sin
+duplicar notificaciones.
+
+Uso:
+    python manage.py enviar_recordatorios_cuotas             # vencen en 3 días + vencidas
+    python manage.py enviar_recordatorios_cuotas --dias 5 --solo proximas
+"""
+from django.core.management.base import BaseCommand
+
+from ventas.services.service_recordatorio import RecordatorioCuotaService
+
+
+class Command(BaseCommand):
+    help = 'Crea notificaciones (y push) para cuotas por vencer y recién vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=3,
+                            help='Días de anticipación del recordatorio de vencimiento')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Cuotas procesadas por transacción y por envío push')
+        parser.add_argument('--solo', choices=['proximas', 'vencidas'],
+                            help='Ejecutar solo uno de los dos recordatorios')
+
+    def handle(self, *args, **options):
+        if options['solo'] != 'vencidas':
+            resumen = RecordatorioCuotaService.procesar_proximas(dias=options['dias'], lote=options['lote'])
+            self.stdout.write(f'Cuotas por vencer: {self._formatear(resumen)}')
+
+        if options['solo'] != 'proximas':
+            resumen = RecordatorioCuotaService.procesar_vencidas(lote=options['lote'])
+            self.stdout.write(f'Cuotas vencidas: {self._formatear(resumen)}')
+
+    def _formatear(self, resumen):
+        return (
+            f"{resumen['cuotas']} cuotas, {resumen['notificaciones']} notificaciones, "
+            f"push {resumen['push_enviados']} enviados / {resumen['push_fallidos']} fallidos"
+        )
@@ -0,0 +1,32 @@
+"""
+Expira los checkouts al contado que no se pagaron y libera su stock reservado.
+
+Uso:
+    python manage.py expirar_checkouts_pendientes                # una pasada
+    python manage.py expirar_checkouts_pendientes --intervalo 60   # en bucle, cada 60 s
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ventas.services.service_venta import VentaService
+
+
+class Command(BaseCommand):
+    help = 'Marca como expirados en bloque los checkouts pendientes vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Checkouts expirados por transacción')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Segundos entre pasadas; 0 ejecuta una sola pasada')
+
+    def handle(self, *args, **options):
+        while True:
+            expirados = VentaService.expirar_checkouts_pendientes(lote=options['lote'])
+            if expirados or not options['intervalo']:
+                self.stdout.write(f'Checkouts pendientes expirados: {expirados}')
+
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
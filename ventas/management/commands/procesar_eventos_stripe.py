@@ -0,0 +1,87 @@
+"""
+Worker de la bandeja de eventos de Stripe (tabla evento_stripe).
+
+El webhook solo guarda los eventos; este comando los reclama por lotes con
+SKIP LOCKED y los aplica en paralelo. Se pueden levantar varios procesos a la vez.
+
+Uso:
+    python manage.py procesar_eventos_stripe                  # drena la bandeja y termina
+    python manage.py procesar_eventos_stripe --intervalo 1 --workers 4
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ventas.services.service_webhook import WebhookService
+
+
+class Command(BaseCommand):
+    help = 'Procesa los eventos pendientes de la bandeja de webhooks de Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Hilos que procesan eventos en paralelo')
+        parser.add_argument('--lote', type=int, default=50,
+                            help='Eventos reclamados por cada hilo en cada vuelta')
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help='Segundos de espera con la bandeja vacía; 0 drena una vez y termina')
+        parser.add_argument('--reporte', type=int, default=60,
+                            help='Segundos entre reportes de lag y throughput')
+
+    def handle(self, *args, **options):
+        self.contadores = {'procesados': 0, 'errores': 0}
+        self.bloqueo = threading.Lock()
+        inicio = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            hilos = [
+                pool.submit(self._trabajar, options['lote'], options['intervalo'], options['reporte'])
+                for _ in range(options['workers'])
+            ]
+            for hilo in hilos:
+                hilo.result()
+
+        self._reportar(time.perf_counter() - inicio)
+
+    def _trabajar(self, lote, intervalo, reporte):
+        """Bucle de un hilo: reclama un lote, lo aplica y repite"""
+        try:
+            ultimo_reporte = time.perf_counter()
+            while True:
+                eventos = WebhookService.reclamar_eventos(lote)
+                for evento in eventos:
+                    ok = WebhookService.procesar_evento(evento)
+                    with self.bloqueo:
+                        self.contadores['procesados' if ok else 'errores'] += 1
+
+                if not eventos:
+                    if not intervalo:
+                        return
+                    time.sleep(intervalo)
+
+                if intervalo and time.perf_counter() - ultimo_reporte >= reporte:
+                    ultimo_reporte = time.perf_counter()
+                    self._reportar()
+        finally:
+            # Cada hilo abre su propia conexión; se cierra al terminar
+            connection.close()
+
+    def _reportar(self, duracion=None):
+        with self.bloqueo:
+            procesados, errores = self.contadores['procesados'], self.contadores['errores']
+
+        linea = f'Procesados: {procesados} | Errores: {errores}'
+        if duracion:
+            linea += f' | {procesados / duracion:.1f} eventos/s'
+
+        success, estadisticas, _ = WebhookService.obtener_estadisticas()
+        if success:
+            linea += (
+                f" | Pendientes: {estadisticas['pendientes']}"
+                f" | Lag: {estadisticas['lag_segundos']} s"
+                f" | Throughput (último minuto): {estadisticas['throughput_por_segundo']} eventos/s"
+            )
+        self.stdout.write(linea)
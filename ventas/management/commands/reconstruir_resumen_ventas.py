@@ -0,0 +1,48 @@
+"""
+Reconstruye los rollups diarios de ventas (tabla resumen_venta_diario) a partir
+del historial de ventas. Se usa una vez al desplegar los rollups o para
+corregir un rango de fechas.
+
+Uso:
+    python manage.py reconstruir_resumen_ventas                          # todo el historial
+    python manage.py reconstruir_resumen_ventas --desde 2025-01-01 --hasta 2025-03-31
+
+Cada tramo de días se recalcula en su propia transacción; conviene correrlo
+con poco tráfico, porque una venta creada durante el tramo del día actual
+puede chocar con las filas que se están reinsertando.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ventas.services.service_resumen import ResumenVentaService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups diarios de ventas desde el historial'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat,
+                            help='Primer día (YYYY-MM-DD); por defecto el de la primera venta')
+        parser.add_argument('--hasta', type=date.fromisoformat,
+                            help='Último día (YYYY-MM-DD); por defecto el de la última venta')
+        parser.add_argument('--dias-por-lote', type=int, default=31,
+                            help='Días recalculados por transacción')
+
+    def handle(self, *args, **options):
+        primera, ultima = ResumenVentaService.rango_historico()
+        desde = options['desde'] or primera
+        hasta = options['hasta'] or ultima
+        if desde is None:
+            self.stdout.write('No hay ventas para resumir')
+            return
+        if desde > hasta:
+            raise CommandError("'--desde' no puede ser posterior a '--hasta'")
+
+        total = 0
+        for inicio, fin in ResumenVentaService.tramos(desde, hasta, options['dias_por_lote']):
+            filas = ResumenVentaService.reconstruir(inicio, fin)
+            total += filas
+            self.stdout.write(f'{inicio} a {fin}: {filas} filas de resumen')
+
+        self.stdout.write(f'Rollups reconstruidos: {total} filas')
@@ -0,0 +1,40 @@
+"""
+Recupera las solicitudes de checkout asíncrono que quedaron sin resultado
+(por ejemplo, si el proceso que las tenía en cola se reinició).
+
+Uso:
+    python manage.py recuperar_solicitudes_checkout                # una pasada
+    python manage.py recuperar_solicitudes_checkout --intervalo 30   # en bucle, cada 30 s
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ventas.services.service_checkout_asincrono import CheckoutAsincronoService
+
+
+class Command(BaseCommand):
+    help = 'Procesa solicitudes de checkout pendientes huérfanas y cierra las interrumpidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antiguedad', type=int, default=30,
+                            help='Segundos sin procesar a partir de los cuales una solicitud pendiente se retoma')
+        parser.add_argument('--limite-procesando', type=int, default=600,
+                            help='Segundos en proceso a partir de los cuales una solicitud se marca fallida')
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help='Segundos entre pasadas; 0 ejecuta una sola pasada')
+
+    def handle(self, *args, **options):
+        while True:
+            procesadas, interrumpidas = CheckoutAsincronoService.recuperar_solicitudes(
+                antiguedad=options['antiguedad'],
+                limite_procesando=options['limite_procesando']
+            )
+            if procesadas or interrumpidas or not options['intervalo']:
+                self.stdout.write(
+                    f'Solicitudes procesadas: {procesadas} - interrumpidas: {interrumpidas}'
+                )
+
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
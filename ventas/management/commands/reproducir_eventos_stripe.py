@@ -0,0 +1,147 @@
+"""
+Reaplica eventos de Stripe exportados a un archivo NDJSON (un evento JSON por
+línea, por ejemplo la salida de `stripe events list` o de la API /v1/events).
+
+El archivo se lee como stream, de a --lote eventos: cada lote se registra en
+la bandeja (evento_stripe) con un solo INSERT ... ON CONFLICT DO NOTHING, se
+reclaman los que todavía no se aplicaron y se procesan en paralelo con los
+mismos handlers que el webhook (WebhookService.procesar_evento). Los eventos
+de un mismo objeto de Stripe se aplican en el orden del archivo, en un mismo hilo.
+
+Uso:
+    python manage.py reproducir_eventos_stripe eventos.ndjson
+    python manage.py reproducir_eventos_stripe eventos.ndjson --workers 8 --lote 1000
+    python manage.py reproducir_eventos_stripe - < eventos.ndjson
+"""
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ventas.services.service_webhook import WebhookService
+
+
+class Command(BaseCommand):
+    help = 'Reaplica en paralelo eventos de Stripe exportados en NDJSON, omitiendo los ya aplicados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Archivo NDJSON con eventos de Stripe ('-' para stdin)")
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Hilos que aplican eventos en paralelo')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Eventos leídos, registrados y reclamados por vuelta')
+        parser.add_argument('--tipos', default='',
+                            help='Solo estos tipos de evento, separados por coma (por defecto todos)')
+        parser.add_argument('--reaplicar', action='store_true',
+                            help='Vuelve a aplicar también los eventos ya procesados')
+        parser.add_argument('--reporte', type=float, default=5,
+                            help='Segundos entre reportes de avance')
+
+    def handle(self, *args, **options):
+        tipos = {tipo.strip() for tipo in options['tipos'].split(',') if tipo.strip()}
+        self.contadores = {'leidos': 0, 'aplicados': 0, 'omitidos': 0, 'errores': 0, 'invalidos': 0}
+        self.bloqueo = threading.Lock()
+
+        try:
+            archivo = sys.stdin if options['archivo'] == '-' else open(options['archivo'], encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'No se pudo abrir el archivo: {e}')
+
+        inicio = ultimo_reporte = time.perf_counter()
+        with archivo, ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for lote in self._lotes(archivo, options['lote'], tipos):
+                self._aplicar_lote(pool, lote, options['workers'], options['reaplicar'])
+
+                if time.perf_counter() - ultimo_reporte >= options['reporte']:
+                    ultimo_reporte = time.perf_counter()
+                    self._reportar(ultimo_reporte - inicio)
+
+        self._reportar(time.perf_counter() - inicio, final=True)
+
+    def _lotes(self, archivo, tamano, tipos):
+        """Lee el NDJSON línea por línea y entrega listas de hasta `tamano` eventos"""
+        lote = []
+        for numero, linea in enumerate(archivo, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                evento = json.loads(linea)
+            except ValueError:
+                evento = None
+            if not (
+                isinstance(evento, dict) and evento.get('id') and evento.get('type') and
+                isinstance(evento.get('data'), dict) and isinstance(evento['data'].get('object'), dict)
+            ):
+                self.contadores['invalidos'] += 1
+                self.stderr.write(f'Línea {numero}: no es un evento de Stripe válido')
+                continue
+
+            self.contadores['leidos'] += 1
+            if tipos and evento['type'] not in tipos:
+                self.contadores['omitidos'] += 1
+                continue
+            lote.append(evento)
+            if len(lote) >= tamano:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _aplicar_lote(self, pool, lote, workers, reaplicar):
+        """Registra el lote, reclama los pendientes y los aplica repartidos entre los hilos"""
+        # Un evento repetido dentro del archivo se aplica una sola vez
+        orden = {}
+        for evento in lote:
+            orden.setdefault(evento['id'], len(orden))
+
+        WebhookService.registrar_eventos(lote)
+        reclamados = WebhookService.reclamar_eventos_por_id(list(orden), reaplicar=reaplicar)
+        with self.bloqueo:
+            self.contadores['omitidos'] += len(lote) - len(reclamados)
+        if not reclamados:
+            return
+
+        # Los eventos del mismo objeto van al mismo hilo, en el orden del archivo
+        reclamados.sort(key=lambda evento: orden[evento.stripe_event_id])
+        grupos = [[] for _ in range(workers)]
+        for evento in reclamados:
+            objeto = evento.payload['data']['object'].get('id', evento.stripe_event_id)
+            grupos[hash(objeto) % workers].append(evento)
+
+        for tarea in [pool.submit(self._aplicar, grupo) for grupo in grupos if grupo]:
+            tarea.result()
+
+    def _aplicar(self, eventos):
+        try:
+            for evento in eventos:
+                ok = WebhookService.procesar_evento(evento)
+                with self.bloqueo:
+                    self.contadores['aplicados' if ok else 'errores'] += 1
+        finally:
+            # Cada hilo usa su propia conexión; se cierra al terminar su parte del lote
+            connection.close()
+
+    def _reportar(self, duracion, final=False):
+        with self.bloqueo:
+            contadores = dict(self.contadores)
+
+        linea = (
+            f"{'Total' if final else 'Avance'}: {contadores['leidos']} leídos"
+            f" | Aplicados: {contadores['aplicados']}"
+            f" | Omitidos: {contadores['omitidos']}"
+            f" | Errores: {contadores['errores']}"
+        )
+        if contadores['invalidos']:
+            linea += f" | Líneas inválidas: {contadores['invalidos']}"
+        if duracion:
+            linea += (
+                f" | {contadores['aplicados'] / duracion:.1f} eventos aplicados/s"
+                f" | {contadores['leidos'] / duracion:.1f} eventos leídos/s"
+                f" | {duracion:.1f} s"
+            )
+        self.stdout.write(linea)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_create_metodos_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoStripe',
+            fields=[
+                ('idEvento', models.AutoField(primary_key=True, serialize=False)),
+                ('stripe_event_id', models.CharField(max_length=255, unique=True)),
+                ('tipo', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('procesado', 'Procesado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('fecha_recepcion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_reclamo', models.DateTimeField(blank=True, null=True)),
+                ('fecha_procesado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Stripe',
+                'verbose_name_plural': 'Eventos de Stripe',
+                'db_table': 'evento_stripe',
+                'ordering': ['fecha_recepcion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_recepcion'], name='evento_stripe_estado_idx'), models.Index(fields=['fecha_procesado'], name='evento_stripe_procesado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('ventas', '0003_evento_stripe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutPendiente',
+            fields=[
+                ('idCheckout', models.AutoField(primary_key=True, serialize=False)),
+                ('stripe_checkout_session_id', models.CharField(max_length=255, unique=True)),
+                ('referencia', models.CharField(max_length=64, unique=True)),
+                ('subtotal', models.FloatField()),
+                ('total', models.FloatField()),
+                ('lineas', models.JSONField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('expirado', 'Expirado')], default='pendiente', max_length=20)),
+                ('expira', models.DateTimeField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+                ('metodoPago', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='checkouts_pendientes', to='ventas.metodopago')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkouts_pendientes', to='usuarios.usuario')),
+            ],
+            options={
+                'verbose_name': 'Checkout Pendiente',
+                'verbose_name_plural': 'Checkouts Pendientes',
+                'db_table': 'checkout_pendiente',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'expira'], name='checkout_pend_estado_idx')],
+            },
+        ),
+    ]
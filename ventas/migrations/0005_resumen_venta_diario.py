@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_stock_reservado_reservastock'),
+        ('ventas', '0004_checkout_pendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiario',
+            fields=[
+                ('idResumen', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('nrocuotas', models.IntegerField(choices=[(1, 'Al contado'), (3, '3 cuotas'), (6, '6 cuotas'), (12, '12 cuotas')])),
+                ('cantidad_ventas', models.IntegerField(default=0)),
+                ('unidades', models.IntegerField(default=0)),
+                ('monto_total', models.FloatField(default=0.0)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='resumenes_venta', to='productos.categoria')),
+                ('metodoPago', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='resumenes_diarios', to='ventas.metodopago')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'db_table': 'resumen_venta_diario',
+                'ordering': ['-fecha'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('fecha', 'metodoPago', 'nrocuotas'), name='resumen_venta_total_uniq'), models.UniqueConstraint(condition=models.Q(('categoria__isnull', False)), fields=('fecha', 'metodoPago', 'nrocuotas', 'categoria'), name='resumen_venta_categoria_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_resumen_venta_diario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(condition=models.Q(('pagada', False)), fields=['fecha_vencimiento'], include=('monto',), name='cuota_pendiente_venc_idx'),
+        ),
+    ]
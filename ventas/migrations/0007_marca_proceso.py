@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0006_cuota_pendiente_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaProceso',
+            fields=[
+                ('idMarca', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('fecha', models.DateField()),
+                ('ultimo_id', models.IntegerField(blank=True, null=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Proceso',
+                'verbose_name_plural': 'Marcas de Procesos',
+                'db_table': 'marca_proceso',
+            },
+        ),
+    ]
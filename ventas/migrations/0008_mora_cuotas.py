@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0007_marca_proceso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionMora',
+            fields=[
+                ('idEjecucion', models.AutoField(primary_key=True, serialize=False)),
+                ('fecha_corte', models.DateField(unique=True)),
+                ('tasa_diaria', models.FloatField()),
+                ('cuotas_afectadas', models.IntegerField(default=0)),
+                ('monto_generado', models.FloatField(default=0.0)),
+                ('duracion_segundos', models.FloatField(default=0.0)),
+                ('fecha_inicio', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Mora',
+                'verbose_name_plural': 'Ejecuciones de Mora',
+                'db_table': 'ejecucion_mora',
+                'ordering': ['-fecha_corte'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cuota',
+            name='monto_mora',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='cuota',
+            name='mora_hasta',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
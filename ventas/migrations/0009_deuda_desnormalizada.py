@@ -0,0 +1,103 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Sum, Count, F, OuterRef, Subquery, Value, FloatField, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def calcular_deuda(apps, schema_editor):
+    """Saldos iniciales de las ventas en cuotas y resumen de sus usuarios"""
+    Venta = apps.get_model('ventas', 'Venta')
+    Cuota = apps.get_model('ventas', 'Cuota')
+    ResumenDeudaUsuario = apps.get_model('ventas', 'ResumenDeudaUsuario')
+
+    pendientes = Cuota.objects.filter(venta=OuterRef('pk'), pagada=False)
+    pagadas = Cuota.objects.filter(venta=OuterRef('pk'), pagada=True)
+    Venta.objects.filter(nrocuotas__gt=1).update(
+        saldo_pendiente=Coalesce(
+            Subquery(pendientes.values('venta').annotate(total=Sum('monto')).values('total')),
+            Value(0.0), output_field=FloatField()
+        ),
+        cuotas_pagadas=Coalesce(
+            Subquery(pagadas.values('venta').annotate(cantidad=Count('idCuota')).values('cantidad')),
+            Value(0), output_field=IntegerField()
+        ),
+        proxima_fecha_vencimiento=Subquery(
+            pendientes.order_by('fecha_vencimiento').values('fecha_vencimiento')[:1]
+        )
+    )
+
+    ResumenDeudaUsuario.objects.bulk_create([
+        ResumenDeudaUsuario(usuario_id=id_usuario)
+        for id_usuario in Venta.objects.filter(nrocuotas__gt=1).values_list('usuario_id', flat=True).order_by().distinct()
+    ], batch_size=1000)
+
+    con_saldo = Venta.objects.filter(usuario=OuterRef('usuario'), saldo_pendiente__gt=0).values('usuario')
+    ResumenDeudaUsuario.objects.update(
+        saldo_pendiente=Coalesce(
+            Subquery(con_saldo.annotate(total=Sum('saldo_pendiente')).values('total')),
+            Value(0.0), output_field=FloatField()
+        ),
+        cuotas_pendientes=Coalesce(
+            Subquery(con_saldo.annotate(cantidad=Sum(F('nrocuotas') - F('cuotas_pagadas'))).values('cantidad')),
+            Value(0), output_field=IntegerField()
+        ),
+        ventas_con_saldo=Coalesce(
+            Subquery(con_saldo.annotate(cantidad=Count('idVenta')).values('cantidad')),
+            Value(0), output_field=IntegerField()
+        ),
+        proxima_fecha_vencimiento=Subquery(
+            Venta.objects.filter(
+                usuario=OuterRef('usuario'), proxima_fecha_vencimiento__isnull=False
+            ).order_by('proxima_fecha_vencimiento').values('proxima_fecha_vencimiento')[:1]
+        ),
+        version=1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('ventas', '0008_mora_cuotas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='cuotas_pagadas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='proxima_fecha_vencimiento',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='saldo_pendiente',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name='ResumenDeudaUsuario',
+            fields=[
+                ('idResumen', models.AutoField(primary_key=True, serialize=False)),
+                ('saldo_pendiente', models.FloatField(default=0.0)),
+                ('cuotas_pendientes', models.IntegerField(default=0)),
+                ('ventas_con_saldo', models.IntegerField(default=0)),
+                ('proxima_fecha_vencimiento', models.DateField(blank=True, null=True)),
+                ('version', models.IntegerField(default=0)),
+                ('fecha_modificacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_deuda', to='usuarios.usuario')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Deuda',
+                'verbose_name_plural': 'Resúmenes de Deuda',
+                'db_table': 'resumen_deuda_usuario',
+                'indexes': [models.Index(fields=['-saldo_pendiente'], name='resumen_deuda_saldo_idx')],
+            },
+        ),
+        migrations.RunPython(calcular_deuda, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Max, OuterRef, Subquery
+
+LOTE = 50000
+
+
+def copiar_usuario(apps, schema_editor):
+    """
+    Copia venta.usuario_id a cada cuota por tramos de IDs, cada tramo en su
+    propia transacción para no mantener bloqueada toda la tabla.
+    """
+    Venta = apps.get_model('ventas', 'Venta')
+    Cuota = apps.get_model('ventas', 'Cuota')
+
+    ultimo = Cuota.objects.aggregate(ultimo=Max('idCuota'))['ultimo'] or 0
+    usuario_venta = Subquery(Venta.objects.filter(idVenta=OuterRef('venta_id')).values('usuario_id')[:1])
+
+    for desde in range(1, ultimo + 1, LOTE):
+        with transaction.atomic():
+            Cuota.objects.filter(
+                idCuota__gte=desde, idCuota__lt=desde + LOTE, usuario__isnull=True
+            ).update(usuario=usuario_venta)
+
+
+class Migration(migrations.Migration):
+
+    # Cada tramo del backfill confirma por separado
+    atomic = False
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('ventas', '0009_deuda_desnormalizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuota',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='cuotas', to='usuarios.usuario'),
+        ),
+        migrations.RunPython(copiar_usuario, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cuota',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='cuotas', to='usuarios.usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(fields=['usuario', 'pagada', 'fecha_vencimiento'], name='cuota_usuario_pagada_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['usuario', 'fecha_venta'], name='venta_usuario_fecha_idx'),
+        ),
+    ]
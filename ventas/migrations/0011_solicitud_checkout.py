@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:37
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('ventas', '0010_usuario_en_cuota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudCheckout',
+            fields=[
+                ('idSolicitud', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('datos', models.JSONField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('codigo_estado', models.IntegerField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_checkout', to='usuarios.usuario')),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Checkout',
+                'verbose_name_plural': 'Solicitudes de Checkout',
+                'db_table': 'solicitud_checkout',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='solicitud_checkout_estado_idx')],
+            },
+        ),
+    ]
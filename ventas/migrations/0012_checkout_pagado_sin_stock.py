@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0011_solicitud_checkout'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='checkoutpendiente',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('expirado', 'Expirado'), ('pagado_sin_stock', 'Pagado sin stock'), ('reembolsado', 'Reembolsado')], default='pendiente', max_length=20),
+        ),
+    ]
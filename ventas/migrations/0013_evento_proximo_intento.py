@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0012_checkout_pagado_sin_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventostripe',
+            name='proximo_intento',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
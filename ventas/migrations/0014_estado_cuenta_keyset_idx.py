@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:17
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        ('ventas', '0013_evento_proximo_intento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cuota',
+            index=models.Index(condition=models.Q(('pagada', True)), fields=['usuario', 'fecha_pago', 'idCuota'], name='cuota_usuario_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(models.F('usuario'), django.db.models.functions.datetime.TruncDate('fecha_venta'), models.F('idVenta'), name='venta_usuario_dia_idx'),
+        ),
+    ]
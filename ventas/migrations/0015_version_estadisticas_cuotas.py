@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+def crear_version(apps, schema_editor):
+    apps.get_model('ventas', 'VersionEstadisticasCuotas').objects.get_or_create(idVersion=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0014_estado_cuenta_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionEstadisticasCuotas',
+            fields=[
+                ('idVersion', models.AutoField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Versión de Estadísticas de Cuotas',
+                'verbose_name_plural': 'Versión de Estadísticas de Cuotas',
+                'db_table': 'version_estadisticas_cuotas',
+            },
+        ),
+        migrations.RunPython(crear_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0015_version_estadisticas_cuotas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PagoDuplicado',
+            fields=[
+                ('idPagoDuplicado', models.AutoField(primary_key=True, serialize=False)),
+                ('stripe_id', models.CharField(max_length=255)),
+                ('stripe_payment_intent_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('monto', models.FloatField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Reembolso pendiente'), ('reembolsado', 'Reembolsado')], default='pendiente', max_length=20)),
+                ('stripe_refund_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+                ('cuota', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pagos_duplicados', to='ventas.cuota')),
+            ],
+            options={
+                'verbose_name': 'Pago Duplicado',
+                'verbose_name_plural': 'Pagos Duplicados',
+                'db_table': 'pago_duplicado',
+                'ordering': ['-fecha_creacion'],
+                'constraints': [models.UniqueConstraint(fields=('cuota', 'stripe_id'), name='pago_duplicado_uniq')],
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Count, Case, When, Value, Prefetch, F
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
 # Create your models here.
@@ -20,6 +24,16 @@ class MetodoPago(models.Model):
         return self.nombre
 
 
+class VentaQuerySet(models.QuerySet):
+    def con_cantidad_productos(self):
+        """Anota cantidad_productos (detalles de cada venta) calculado en SQL"""
+        return self.annotate(cantidad_productos=Count('detalles'))
+
+    def con_cuotas(self):
+        """Precarga las cuotas de cada venta con su estado de vencimiento anotado"""
+        return self.prefetch_related(Prefetch('cuotas', queryset=Cuota.objects.con_estado()))
+
+
 class Venta(models.Model):
     OPCIONES_CUOTAS = [
         (1, 'Al contado'),
@@ -40,6 +54,11 @@ class Venta(models.Model):
     # Cuotas
     nrocuotas = models.IntegerField(default=1, choices=OPCIONES_CUOTAS)
     
+    # Estado de pago (se actualiza en la misma transacción que paga cada cuota)
+    saldo_pendiente = models.FloatField(default=0.0)  # Suma de las cuotas sin pagar
+    cuotas_pagadas = models.IntegerField(default=0)
+    proxima_fecha_vencimiento = models.DateField(blank=True, null=True)  # Null si no debe cuotas
+    
     # Stripe
     stripe_payment_intent_id = models.CharField(max_length=255, blank=True, null=True)
     stripe_checkout_session_id = models.CharField(max_length=255, blank=True, null=True)
@@ -48,11 +67,22 @@ class Venta(models.Model):
     fecha_venta = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
 
+    objects = VentaQuerySet.as_manager()
+
     class Meta:
         db_table = 'venta'
         verbose_name = 'Venta'
         verbose_name_plural = 'Ventas'
         ordering = ['-fecha_venta']
+        indexes = [
+            # Mis ventas, de la más reciente a la más antigua
+            models.Index(fields=['usuario', 'fecha_venta'], name='venta_usuario_fecha_idx'),
+            # Keyset del estado de cuenta: (día de la venta en TIME_ZONE = UTC, idVenta) por usuario
+            models.Index(
+                F('usuario'), TruncDate('fecha_venta'), F('idVenta'),
+                name='venta_usuario_dia_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Venta {self.idVenta} - Total: ${self.total}'  
@@ -81,9 +111,25 @@ class DetalleVenta(models.Model):
 
 
 
+class CuotaQuerySet(models.QuerySet):
+    def con_estado(self):
+        """
+        Anota vencida (pendiente y con vencimiento anterior a hoy) calculado en
+        SQL, equivalente a la propiedad esta_vencida.
+        """
+        return self.annotate(vencida=Case(
+            When(pagada=False, fecha_vencimiento__lt=timezone.now().date(), then=Value(True)),
+            default=Value(False),
+            output_field=models.BooleanField()
+        ))
+
+
 class Cuota(models.Model):
     idCuota = models.AutoField(primary_key=True)
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='cuotas')
+    # Copia de venta.usuario para filtrar las cuotas de un usuario sin JOIN;
+    # sin índice propio porque lo cubre cuota_usuario_pagada_venc_idx
+    usuario = models.ForeignKey('usuarios.Usuario', on_delete=models.PROTECT, related_name='cuotas', db_index=False)
     
     numero_cuota = models.IntegerField()  # 1, 2, 3...
     monto = models.FloatField()  # Monto de la cuota
@@ -99,15 +145,38 @@ class Cuota(models.Model):
     # Stripe - Para pago con link externo (Web)
     stripe_checkout_session_id = models.CharField(max_length=255, blank=True, null=True)
     
+    # Mora acumulada por atraso y último día hasta el que se calculó
+    monto_mora = models.FloatField(default=0.0)
+    mora_hasta = models.DateField(blank=True, null=True)
+    
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
 
+    objects = CuotaQuerySet.as_manager()
+
     class Meta:
         db_table = 'cuota'
         verbose_name = 'Cuota'
         verbose_name_plural = 'Cuotas'
         ordering = ['venta', 'numero_cuota']
         unique_together = ['venta', 'numero_cuota']
+        indexes = [
+            # Solo cuotas pendientes: estadísticas, vencidas y proyección de cobros
+            models.Index(
+                fields=['fecha_vencimiento'],
+                include=['monto'],
+                condition=models.Q(pagada=False),
+                name='cuota_pendiente_venc_idx'
+            ),
+            # Mis cuotas / mis cuotas pendientes, ordenadas por vencimiento
+            models.Index(fields=['usuario', 'pagada', 'fecha_vencimiento'], name='cuota_usuario_pagada_venc_idx'),
+            # Pagos del estado de cuenta, en orden de keyset (fecha_pago, idCuota)
+            models.Index(
+                fields=['usuario', 'fecha_pago', 'idCuota'],
+                condition=models.Q(pagada=True),
+                name='cuota_usuario_pago_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Cuota {self.numero_cuota}/{self.venta.nrocuotas} - Venta {self.venta.idVenta}'
@@ -118,3 +187,288 @@ class Cuota(models.Model):
         if self.pagada:
             return False
         return timezone.now().date() > self.fecha_vencimiento 
+
+
+class EventoStripe(models.Model):
+    """
+    Bandeja de entrada (inbox) de eventos del webhook de Stripe.
+    El webhook solo guarda el evento; un worker lo procesa después.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('procesado', 'Procesado'),
+        ('error', 'Error'),
+    ]
+    
+    idEvento = models.AutoField(primary_key=True)
+    stripe_event_id = models.CharField(max_length=255, unique=True)  # Deduplica reintentos de Stripe
+    tipo = models.CharField(max_length=100)
+    payload = models.JSONField()
+    
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    
+    fecha_recepcion = models.DateTimeField(auto_now_add=True)
+    fecha_reclamo = models.DateTimeField(blank=True, null=True)  # Cuándo lo tomó un worker
+    proximo_intento = models.DateTimeField(blank=True, null=True)  # Con error: no se reintenta antes
+    fecha_procesado = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'evento_stripe'
+        verbose_name = 'Evento de Stripe'
+        verbose_name_plural = 'Eventos de Stripe'
+        ordering = ['fecha_recepcion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_recepcion'], name='evento_stripe_estado_idx'),
+            models.Index(fields=['fecha_procesado'], name='evento_stripe_procesado_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} {self.stripe_event_id} ({self.estado})'
+
+
+class CheckoutPendiente(models.Model):
+    """
+    Carrito validado de un checkout al contado de Stripe, guardado en el servidor
+    hasta que el webhook confirme el pago (Stripe limita el metadata a 500 caracteres).
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('completado', 'Completado'),
+        ('expirado', 'Expirado'),
+        ('pagado_sin_stock', 'Pagado sin stock'),  # Reembolso pendiente: revisar a mano
+        ('reembolsado', 'Reembolsado'),
+    ]
+    
+    idCheckout = models.AutoField(primary_key=True)
+    stripe_checkout_session_id = models.CharField(max_length=255, unique=True)
+    referencia = models.CharField(max_length=64, unique=True)  # Referencia de la reserva de stock
+    usuario = models.ForeignKey('usuarios.Usuario', on_delete=models.CASCADE, related_name='checkouts_pendientes')
+    metodoPago = models.ForeignKey(MetodoPago, on_delete=models.PROTECT, related_name='checkouts_pendientes')
+    
+    subtotal = models.FloatField()
+    total = models.FloatField()
+    lineas = models.JSONField()  # [{"producto_id", "cantidad", "precio"}] con el precio al crear el checkout
+    
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    expira = models.DateTimeField()
+    
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'checkout_pendiente'
+        verbose_name = 'Checkout Pendiente'
+        verbose_name_plural = 'Checkouts Pendientes'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'expira'], name='checkout_pend_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f'Checkout {self.stripe_checkout_session_id} ({self.estado})'
+
+
+class SolicitudCheckout(models.Model):
+    """
+    Creación asíncrona de un checkout al contado: el POST la registra y
+    responde 202, un hilo del pool llama a Stripe y el cliente consulta el
+    estado hasta obtener la URL del checkout.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    idSolicitud = models.AutoField(primary_key=True)
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)  # Identificador público
+    usuario = models.ForeignKey('usuarios.Usuario', on_delete=models.CASCADE, related_name='solicitudes_checkout')
+    datos = models.JSONField()  # Cuerpo original del POST /api/ventas/
+    
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    resultado = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)  # Respuesta del checkout o del error
+    codigo_estado = models.IntegerField(blank=True, null=True)  # Código HTTP del resultado
+    
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'solicitud_checkout'
+        verbose_name = 'Solicitud de Checkout'
+        verbose_name_plural = 'Solicitudes de Checkout'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='solicitud_checkout_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f'Solicitud {self.token} ({self.estado})'
+
+
+class ResumenVentaDiario(models.Model):
+    """
+    Rollup diario de ventas, actualizado de forma incremental al crear cada venta.
+    
+    Las filas con categoria NULL resumen la venta completa (cantidad y total);
+    las filas con categoría resumen sus líneas de detalle (unidades y subtotal).
+    """
+    idResumen = models.AutoField(primary_key=True)
+    fecha = models.DateField()
+    metodoPago = models.ForeignKey(MetodoPago, on_delete=models.PROTECT, related_name='resumenes_diarios')
+    nrocuotas = models.IntegerField(choices=Venta.OPCIONES_CUOTAS)
+    categoria = models.ForeignKey('productos.Categoria', on_delete=models.PROTECT,
+                                  related_name='resumenes_venta', blank=True, null=True)
+    
+    cantidad_ventas = models.IntegerField(default=0)
+    unidades = models.IntegerField(default=0)  # Solo en filas por categoría
+    monto_total = models.FloatField(default=0.0)
+
+    class Meta:
+        db_table = 'resumen_venta_diario'
+        verbose_name = 'Resumen Diario de Ventas'
+        verbose_name_plural = 'Resúmenes Diarios de Ventas'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'metodoPago', 'nrocuotas'],
+                condition=models.Q(categoria__isnull=True),
+                name='resumen_venta_total_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['fecha', 'metodoPago', 'nrocuotas', 'categoria'],
+                condition=models.Q(categoria__isnull=False),
+                name='resumen_venta_categoria_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Resumen {self.fecha} - Método {self.metodoPago_id} - {self.nrocuotas} cuotas'
+
+
+class MarcaProceso(models.Model):
+    """
+    Marca de agua (watermark) de un proceso por lotes: hasta qué fecha e ID
+    llegó la última ejecución, para retomar desde ahí sin reprocesar.
+    """
+    idMarca = models.AutoField(primary_key=True)
+    nombre = models.CharField(max_length=100, unique=True)
+    fecha = models.DateField()
+    ultimo_id = models.IntegerField(blank=True, null=True)  # None: la fecha se procesó completa
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'marca_proceso'
+        verbose_name = 'Marca de Proceso'
+        verbose_name_plural = 'Marcas de Procesos'
+
+    def __str__(self):
+        return f'{self.nombre}: {self.fecha} / {self.ultimo_id}'
+
+
+class EjecucionMora(models.Model):
+    """
+    Historial del cálculo nocturno de mora: una fila por fecha de corte.
+    Junto con Cuota.mora_hasta hace que repetir el cálculo no duplique mora.
+    """
+    idEjecucion = models.AutoField(primary_key=True)
+    fecha_corte = models.DateField(unique=True)  # Día hasta el que se acumuló la mora
+    tasa_diaria = models.FloatField()
+    cuotas_afectadas = models.IntegerField(default=0)
+    monto_generado = models.FloatField(default=0.0)
+    duracion_segundos = models.FloatField(default=0.0)
+    fecha_inicio = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'ejecucion_mora'
+        verbose_name = 'Ejecución de Mora'
+        verbose_name_plural = 'Ejecuciones de Mora'
+        ordering = ['-fecha_corte']
+
+    def __str__(self):
+        return f'Mora al {self.fecha_corte}: {self.cuotas_afectadas} cuotas'
+
+
+class ResumenDeudaUsuario(models.Model):
+    """
+    Deuda en cuotas de cada usuario, derivada de los saldos de sus ventas.
+    Se recalcula al crear una venta en cuotas y al pagar cuotas.
+    """
+    idResumen = models.AutoField(primary_key=True)
+    usuario = models.OneToOneField('usuarios.Usuario', on_delete=models.CASCADE, related_name='resumen_deuda')
+    saldo_pendiente = models.FloatField(default=0.0)
+    cuotas_pendientes = models.IntegerField(default=0)
+    ventas_con_saldo = models.IntegerField(default=0)
+    proxima_fecha_vencimiento = models.DateField(blank=True, null=True)
+    version = models.IntegerField(default=0)  # Aumenta con cada cambio de la deuda
+    fecha_modificacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'resumen_deuda_usuario'
+        verbose_name = 'Resumen de Deuda'
+        verbose_name_plural = 'Resúmenes de Deuda'
+        indexes = [
+            # Ranking de mayores deudores
+            models.Index(fields=['-saldo_pendiente'], name='resumen_deuda_saldo_idx'),
+        ]
+
+    def __str__(self):
+        return f'Deuda de {self.usuario_id}: ${self.saldo_pendiente}'
+
+
+class VersionEstadisticasCuotas(models.Model):
+    """
+    Versión de las estadísticas de cuotas en cache (una sola fila). Se
+    incrementa al confirmarse cada pago o venta en cuotas, desde cualquier
+    proceso (el pago suele aplicarlo el worker de webhooks, no el proceso web).
+    """
+    idVersion = models.AutoField(primary_key=True)
+    version = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'version_estadisticas_cuotas'
+        verbose_name = 'Versión de Estadísticas de Cuotas'
+        verbose_name_plural = 'Versión de Estadísticas de Cuotas'
+
+    def __str__(self):
+        return f'Estadísticas de cuotas v{self.version}'
+
+
+class PagoDuplicado(models.Model):
+    """
+    Cuota cobrada por un pago de Stripe cuando ya estaba pagada por otro
+    (dos links o intents abiertos a la vez). El monto se reembolsa
+    automáticamente; si el reembolso falla queda 'pendiente' para revisión.
+    """
+    ESTADOS = [
+        ('pendiente', 'Reembolso pendiente'),
+        ('reembolsado', 'Reembolsado'),
+    ]
+
+    idPagoDuplicado = models.AutoField(primary_key=True)
+    cuota = models.ForeignKey(Cuota, on_delete=models.PROTECT, related_name='pagos_duplicados')
+    stripe_id = models.CharField(max_length=255)  # Payment Intent o Checkout Session del cobro duplicado
+    stripe_payment_intent_id = models.CharField(max_length=255, blank=True, null=True)  # El que se reembolsa
+    monto = models.FloatField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    stripe_refund_id = models.CharField(max_length=255, blank=True, null=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pago_duplicado'
+        verbose_name = 'Pago Duplicado'
+        verbose_name_plural = 'Pagos Duplicados'
+        ordering = ['-fecha_creacion']
+        constraints = [
+            # Reprocesar el mismo evento no registra dos veces la misma cuota
+            models.UniqueConstraint(fields=['cuota', 'stripe_id'], name='pago_duplicado_uniq'),
+        ]
+
+    def __str__(self):
+        return f'Cuota {self.cuota_id} cobrada de más por {self.stripe_id} ({self.estado})'
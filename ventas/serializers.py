@@ -40,8 +40,18 @@ class DetalleVentaCreateSerializer(serializers.Serializer):
         return value
 
 
+class CotizarCarritoSerializer(serializers.Serializer):
+    """Serializer para cotizar un carrito en todos los planes de cuotas"""
+    detalles = DetalleVentaCreateSerializer(many=True)
+    
+    def validate_detalles(self, value):
+        if not value:
+            raise serializers.ValidationError("Debe incluir al menos un producto")
+        return value
+
+
 class CuotaSerializer(serializers.ModelSerializer):
-    esta_vencida = serializers.BooleanField(read_only=True)
+    esta_vencida = serializers.SerializerMethodField()
     
     class Meta:
         model = Cuota
@@ -53,11 +63,19 @@ class CuotaSerializer(serializers.ModelSerializer):
             'fecha_vencimiento',
             'fecha_pago',
             'esta_vencida',
+            'monto_mora',
+            'mora_hasta',
             'stripe_payment_intent_id',
             'stripe_checkout_session_id',
             'fecha_creacion'
         ]
         read_only_fields = ['idCuota', 'fecha_creacion']
+    
+    def get_esta_vencida(self, obj):
+        # Anotado por Cuota.objects.con_estado()
+        if hasattr(obj, 'vencida'):
+            return obj.vencida
+        return obj.esta_vencida
 
 
 class VentaSerializer(serializers.ModelSerializer):
@@ -77,6 +95,9 @@ class VentaSerializer(serializers.ModelSerializer):
             'interes',
             'total',
             'nrocuotas',
+            'saldo_pendiente',
+            'cuotas_pagadas',
+            'proxima_fecha_vencimiento',
             'stripe_payment_intent_id',
             'stripe_checkout_session_id',
             'fecha_venta',
@@ -85,9 +106,15 @@ class VentaSerializer(serializers.ModelSerializer):
             'cuotas',
             'cantidad_productos'
         ]
-        read_only_fields = ['idVenta', 'subtotal', 'total', 'fecha_venta', 'fecha_modificacion']
+        read_only_fields = [
+            'idVenta', 'subtotal', 'total', 'saldo_pendiente', 'cuotas_pagadas',
+            'proxima_fecha_vencimiento', 'fecha_venta', 'fecha_modificacion'
+        ]
     
     def get_cantidad_productos(self, obj):
+        # Anotado por Venta.objects.con_cantidad_productos()
+        if hasattr(obj, 'cantidad_productos'):
+            return obj.cantidad_productos
         return obj.detalles.count()
 
 
@@ -113,3 +140,34 @@ class CrearVentaSerializer(serializers.Serializer):
         if value not in [1, 3, 6, 12]:
             raise serializers.ValidationError("Solo se permiten 1, 3, 6 o 12 cuotas")
         return value
+
+
+class PagarCuotasSerializer(serializers.Serializer):
+    """Serializer para pagar varias cuotas con un solo pago de Stripe"""
+    cuotas = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    todas = serializers.BooleanField(default=False)  # Todas las cuotas pendientes del usuario
+    venta = serializers.IntegerField(required=False)  # Limita "todas" a una venta
+    modo = serializers.ChoiceField(choices=['payment_intent', 'checkout'], default='payment_intent')
+    
+    def validate(self, data):
+        if not data.get('cuotas') and not data['todas']:
+            raise serializers.ValidationError("Debe indicar las cuotas a pagar o 'todas': true")
+        return data
+
+
+class EstadisticasVentasSerializer(serializers.Serializer):
+    """Parámetros de las estadísticas de ventas"""
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    granularidad = serializers.ChoiceField(choices=['dia', 'semana', 'mes'], default='dia')
+    
+    def validate(self, data):
+        if data.get('desde') and data.get('hasta') and data['desde'] > data['hasta']:
+            raise serializers.ValidationError("'desde' no puede ser posterior a 'hasta'")
+        return data
+
+
+class EstadoCuentaSerializer(serializers.Serializer):
+    """Parámetros de paginación del estado de cuenta"""
+    cursor = serializers.CharField(required=False)
+    limite = serializers.IntegerField(min_value=1, max_value=200, default=50)
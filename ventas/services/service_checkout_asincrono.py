@@ -0,0 +1,221 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ventas.models import MetodoPago, SolicitudCheckout
+from ventas.serializers import CrearVentaSerializer
+from ventas.services.service_venta import VentaService
+from productos.models import Producto
+
+
+class CheckoutAsincronoService:
+    """
+    Creación de checkouts al contado fuera del ciclo de la petición.
+
+    El POST valida el carrito, registra una SolicitudCheckout y responde 202;
+    la llamada a Stripe la hace un pool de hilos acotado por proceso, así una
+    demora de Stripe ocupa como mucho CHECKOUT_ASINCRONO_HILOS hilos en lugar
+    de todos los workers. Si la cola del proceso está llena se responde 503.
+    """
+
+    ESTADOS_FINALES = {'completada', 'fallida'}
+
+    # Segundos entre lecturas mientras un GET espera el resultado
+    INTERVALO_ESPERA = 0.5
+
+    # Segundos sugeridos al cliente (Retry-After) antes de volver a consultar
+    REINTENTAR_EN = 1
+
+    _ejecutor = None
+    _cupos = None
+    _candado = threading.Lock()
+
+    @staticmethod
+    def _pool():
+        """Pool de hilos y cupos de la cola, creados al primer uso en cada proceso"""
+        with CheckoutAsincronoService._candado:
+            if CheckoutAsincronoService._ejecutor is None:
+                CheckoutAsincronoService._ejecutor = ThreadPoolExecutor(
+                    max_workers=settings.CHECKOUT_ASINCRONO_HILOS,
+                    thread_name_prefix='checkout'
+                )
+                CheckoutAsincronoService._cupos = threading.BoundedSemaphore(
+                    settings.CHECKOUT_ASINCRONO_MAX_EN_COLA
+                )
+        return CheckoutAsincronoService._ejecutor, CheckoutAsincronoService._cupos
+
+    @staticmethod
+    def encolar_checkout(data, usuario):
+        """
+        Valida el carrito y encola la creación del checkout al contado.
+        Retorna 202 con la URL para consultar el estado de la solicitud.
+        """
+        try:
+            serializer = CrearVentaSerializer(data=data)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+
+            validated_data = serializer.validated_data
+            if validated_data['nrocuotas'] != 1:
+                return False, {"error": "Este método es solo para pago al contado (1 cuota)"}, status.HTTP_400_BAD_REQUEST
+
+            if not MetodoPago.objects.filter(idMetodoPago=validated_data['metodoPago']).exists():
+                return False, {"error": "Método de pago no encontrado"}, status.HTTP_404_NOT_FOUND
+
+            ids_productos = {detalle['producto'] for detalle in validated_data['detalles']}
+            if Producto.objects.filter(idProducto__in=ids_productos).count() != len(ids_productos):
+                return False, {"error": "Uno o más productos no existen"}, status.HTTP_404_NOT_FOUND
+
+            ejecutor, cupos = CheckoutAsincronoService._pool()
+            if not cupos.acquire(blocking=False):
+                return False, {
+                    "error": "Hay demasiados checkouts en proceso, intente nuevamente en unos segundos"
+                }, status.HTTP_503_SERVICE_UNAVAILABLE
+
+            try:
+                solicitud = SolicitudCheckout.objects.create(
+                    usuario=usuario,
+                    datos={
+                        'metodoPago': validated_data['metodoPago'],
+                        'nrocuotas': validated_data['nrocuotas'],
+                        'detalles': [
+                            {'producto': detalle['producto'], 'cantidad': detalle['cantidad']}
+                            for detalle in validated_data['detalles']
+                        ]
+                    }
+                )
+                transaction.on_commit(
+                    lambda: ejecutor.submit(CheckoutAsincronoService._ejecutar, solicitud.idSolicitud, cupos)
+                )
+            except Exception:
+                cupos.release()
+                raise
+
+            return True, {
+                "mensaje": "Checkout en proceso",
+                "solicitud": solicitud.token,
+                "estado": solicitud.estado,
+                "reintentar_en": CheckoutAsincronoService.REINTENTAR_EN,
+                "url_estado": reverse('ventas:solicitud-checkout-detail', args=[solicitud.token])
+            }, status.HTTP_202_ACCEPTED
+
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    def _ejecutar(id_solicitud, cupos):
+        """Tarea del pool: procesa la solicitud y libera su cupo y su conexión"""
+        try:
+            CheckoutAsincronoService.procesar_solicitud(id_solicitud)
+        finally:
+            cupos.release()
+            connection.close()
+
+    @staticmethod
+    def procesar_solicitud(id_solicitud):
+        """
+        Crea el checkout de una solicitud pendiente y guarda el resultado.
+        El UPDATE condicional a 'procesando' evita que dos hilos o procesos
+        la tomen a la vez. Retorna False si la solicitud ya no estaba pendiente.
+        """
+        tomada = SolicitudCheckout.objects.filter(
+            idSolicitud=id_solicitud, estado='pendiente'
+        ).update(estado='procesando', fecha_modificacion=timezone.now())
+        if not tomada:
+            return False
+
+        solicitud = SolicitudCheckout.objects.select_related('usuario').get(idSolicitud=id_solicitud)
+        try:
+            success, result, status_code = VentaService.crear_checkout_session_contado(
+                solicitud.datos, solicitud.usuario
+            )
+        except Exception as e:
+            success, result, status_code = False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        SolicitudCheckout.objects.filter(idSolicitud=id_solicitud).update(
+            estado='completada' if success else 'fallida',
+            resultado=result,
+            codigo_estado=status_code,
+            fecha_modificacion=timezone.now()
+        )
+        return True
+
+    @staticmethod
+    def obtener_solicitud(token, usuario, esperar=0):
+        """
+        Estado de una solicitud del usuario. Con `esperar` > 0 (segundos,
+        acotado por CHECKOUT_ASINCRONO_ESPERA_MAXIMA, 2 por defecto) espera a
+        que termine antes de responder. La espera es corta a propósito: ocupa
+        un worker, así que si la solicitud sigue en curso el cliente vuelve a
+        consultar según el Retry-After de la respuesta.
+        """
+        try:
+            try:
+                esperar = float(esperar)
+            except (TypeError, ValueError):
+                esperar = None
+            if esperar is None or not math.isfinite(esperar):
+                return False, {"error": "El parámetro esperar debe ser un número de segundos"}, status.HTTP_400_BAD_REQUEST
+            esperar = min(max(esperar, 0), settings.CHECKOUT_ASINCRONO_ESPERA_MAXIMA)
+
+            limite = time.monotonic() + esperar
+            while True:
+                solicitud = SolicitudCheckout.objects.filter(token=token, usuario=usuario).first()
+                if solicitud is None:
+                    return False, {"error": "Solicitud no encontrada"}, status.HTTP_404_NOT_FOUND
+                if solicitud.estado in CheckoutAsincronoService.ESTADOS_FINALES or time.monotonic() >= limite:
+                    break
+                time.sleep(CheckoutAsincronoService.INTERVALO_ESPERA)
+
+            respuesta = {
+                "solicitud": solicitud.token,
+                "estado": solicitud.estado,
+                "fecha_creacion": solicitud.fecha_creacion
+            }
+            if solicitud.estado in CheckoutAsincronoService.ESTADOS_FINALES:
+                respuesta["codigo_estado"] = solicitud.codigo_estado
+                respuesta["resultado"] = solicitud.resultado
+            else:
+                respuesta["reintentar_en"] = CheckoutAsincronoService.REINTENTAR_EN
+            return True, respuesta, status.HTTP_200_OK
+
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    def recuperar_solicitudes(antiguedad=30, limite_procesando=600):
+        """
+        Recupera solicitudes que quedaron sin resultado por un reinicio del proceso:
+        procesa las pendientes con más de `antiguedad` segundos y marca como
+        fallidas las que llevan más de `limite_procesando` segundos procesándose.
+
+        Returns:
+            tuple: (procesadas, interrumpidas)
+        """
+        ahora = timezone.now()
+        interrumpidas = SolicitudCheckout.objects.filter(
+            estado='procesando',
+            fecha_modificacion__lt=ahora - timedelta(seconds=limite_procesando)
+        ).update(
+            estado='fallida',
+            resultado={"error": "La creación del checkout se interrumpió, intente nuevamente"},
+            codigo_estado=status.HTTP_503_SERVICE_UNAVAILABLE,
+            fecha_modificacion=ahora
+        )
+
+        pendientes = SolicitudCheckout.objects.filter(
+            estado='pendiente',
+            fecha_creacion__lt=ahora - timedelta(seconds=antiguedad)
+        ).order_by('fecha_creacion').values_list('idSolicitud', flat=True)
+
+        procesadas = sum(
+            1 for id_solicitud in list(pendientes)
+            if CheckoutAsincronoService.procesar_solicitud(id_solicitud)
+        )
+        return procesadas, interrumpidas
@@ -0,0 +1,243 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+import stripe
+from ventas.models import Cuota, CheckoutPendiente
+from ventas.services.service_cuota import CuotaService
+from ventas.services.service_venta import VentaService
+from productos.services.services_inventario import InventarioService
+from integraciones import obtener_stripe, IntegracionNoDisponible
+from integraciones.resiliencia import LimiteTasa
+
+
+class ConciliacionService:
+    """
+    Conciliación con Stripe para pagos cuyo webhook nunca llegó.
+
+    Recorre por páginas (keyset por ID) los registros locales con IDs de
+    Stripe que siguen sin liquidar, consulta su estado en Stripe en paralelo
+    con un límite de llamadas por segundo y aplica las correcciones de cada
+    página en bloque con las mismas actualizaciones condicionales que usa el
+    webhook, así conciliar dos veces (o a la vez que el webhook) no duplica nada.
+
+    Correcciones:
+    - Cuota pendiente cuyo Payment Intent está 'succeeded' o cuya Checkout
+      Session está pagada: se marcan pagadas las cuotas del metadata del pago
+      (como en el webhook) y se reembolsan las que ya estaban pagadas.
+    - Checkout al contado (pendiente o expirado localmente) cuya sesión está
+      pagada: se crea la venta.
+    - Checkout al contado pendiente cuya sesión expiró: se marca expirado y
+      se libera la reserva de stock.
+    """
+
+    def __init__(self, cliente=None, hilos=8, por_segundo=20, lote=200, dias=30, aplicar=True):
+        self.cliente = cliente or obtener_stripe()
+        self.hilos = hilos
+        self.limite = LimiteTasa(por_segundo)
+        self.lote = lote
+        self.desde = timezone.now() - timedelta(days=dias) if dias else None
+        self.aplicar = aplicar
+        self.cambios = []
+        self.resumen = {
+            'consultados': 0,
+            'cuotas_pagadas': 0,
+            'ventas_creadas': 0,
+            'checkouts_expirados': 0,
+            'no_encontrados': 0,
+            'errores': 0,
+        }
+        self._candado = threading.Lock()
+
+    def _contar(self, nombre, cantidad=1):
+        with self._candado:
+            self.resumen[nombre] += cantidad
+
+    # ==================== CONSULTAS A STRIPE ====================
+
+    def _consultar(self, funcion, id_stripe):
+        """Estado de un objeto de Stripe; None si no existe o no se pudo consultar"""
+        self.limite.esperar()
+        try:
+            return funcion(id_stripe)
+        except stripe.InvalidRequestError as e:
+            if e.http_status == 404:
+                self._contar('no_encontrados')
+                return None
+            raise
+
+    def _consultar_todos(self, pedidos):
+        """
+        Consulta en paralelo una lista de (funcion, id_stripe).
+        Retorna {id_stripe: objeto} solo con los que respondieron.
+        """
+        def consultar(pedido):
+            try:
+                return pedido[1], self._consultar(*pedido)
+            except IntegracionNoDisponible:
+                raise
+            except Exception as e:
+                self._contar('errores')
+                print(f"❌ Error consultando {pedido[1]} en Stripe: {str(e)}")
+                return pedido[1], None
+
+        with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+            respuestas = dict(pool.map(consultar, pedidos))
+        self.resumen['consultados'] += len(pedidos)
+        return {id_stripe: objeto for id_stripe, objeto in respuestas.items() if objeto is not None}
+
+    # ==================== CUOTAS ====================
+
+    def paginas_cuotas(self):
+        """Cuotas pendientes con Payment Intent o Checkout Session, de a `lote`"""
+        pendientes = Cuota.objects.filter(pagada=False).filter(
+            Q(stripe_payment_intent_id__isnull=False) | Q(stripe_checkout_session_id__isnull=False)
+        )
+        if self.desde:
+            pendientes = pendientes.filter(fecha_modificacion__gte=self.desde)
+
+        ultimo = 0
+        while True:
+            pagina = list(
+                pendientes.filter(idCuota__gt=ultimo).order_by('idCuota').values(
+                    'idCuota', 'venta_id', 'stripe_payment_intent_id', 'stripe_checkout_session_id'
+                )[:self.lote]
+            )
+            if not pagina:
+                return
+            yield pagina
+            ultimo = pagina[-1]['idCuota']
+
+    def conciliar_cuotas(self, pagina):
+        # Las cuotas pagadas juntas comparten el objeto de Stripe: se consulta una sola vez
+        pedidos = {}
+        for cuota in pagina:
+            if cuota['stripe_payment_intent_id']:
+                pedidos[cuota['stripe_payment_intent_id']] = self.cliente.obtener_payment_intent
+            if cuota['stripe_checkout_session_id']:
+                pedidos[cuota['stripe_checkout_session_id']] = self.cliente.obtener_checkout_session
+        objetos = self._consultar_todos([(funcion, id_stripe) for id_stripe, funcion in pedidos.items()])
+
+        # Pagos cobrados en Stripe, con los IDs que quedan guardados en sus cuotas
+        pagos = {}
+        for cuota in pagina:
+            intent = objetos.get(cuota['stripe_payment_intent_id'])
+            sesion = objetos.get(cuota['stripe_checkout_session_id'])
+            if intent is not None and intent.status == 'succeeded':
+                pagos[intent.id] = (intent, {'stripe_payment_intent_id': intent.id}, 'succeeded')
+            elif sesion is not None and sesion.payment_status == 'paid':
+                pagos[sesion.id] = (sesion, {
+                    'stripe_payment_intent_id': sesion.get('payment_intent'),
+                    'stripe_checkout_session_id': sesion.id
+                }, 'paid')
+
+        # Cada pago liquida las cuotas de su metadata, igual que el webhook: el ID
+        # guardado en la cuota solo sirve para encontrarlo, no para decidir qué pagó
+        ids_por_pago = {
+            id_stripe: CuotaService.ids_cuotas_pagadas(objeto.get('metadata') or {})
+            for id_stripe, (objeto, _, _) in pagos.items()
+        }
+        pendientes = dict(Cuota.objects.filter(
+            idCuota__in=[id_cuota for ids_cuotas in ids_por_pago.values() for id_cuota in ids_cuotas],
+            pagada=False
+        ).values_list('idCuota', 'venta_id'))
+
+        for id_stripe, (objeto, stripe_ids, estado) in pagos.items():
+            ids_cuotas = ids_por_pago[id_stripe]
+            if not ids_cuotas:
+                self.resumen['errores'] += 1
+                print(f"⚠️ {id_stripe} está {estado} pero no indica cuotas en el metadata")
+                continue
+            por_liquidar = [int(id_cuota) for id_cuota in ids_cuotas if int(id_cuota) in pendientes]
+            for id_cuota in por_liquidar:
+                self.cambios.append(
+                    f"Cuota {id_cuota} (venta {pendientes[id_cuota]}): pendiente -> pagada ({id_stripe} {estado})"
+                )
+            if self.aplicar:
+                # Un UPDATE condicional por pago
+                self.resumen['cuotas_pagadas'] += CuotaService.liquidar_cuotas(ids_cuotas, **stripe_ids)
+                CuotaService.reembolsar_duplicados(
+                    ids_cuotas, stripe_ids['stripe_payment_intent_id'], stripe_ids.get('stripe_checkout_session_id')
+                )
+            else:
+                self.resumen['cuotas_pagadas'] += len(por_liquidar)
+
+    # ==================== CHECKOUTS AL CONTADO ====================
+
+    def paginas_checkouts(self):
+        """Checkouts al contado sin venta (pendientes o expirados localmente), de a `lote`"""
+        sin_venta = CheckoutPendiente.objects.filter(estado__in=['pendiente', 'expirado'])
+        if self.desde:
+            sin_venta = sin_venta.filter(fecha_creacion__gte=self.desde)
+
+        ultimo = 0
+        while True:
+            pagina = list(
+                sin_venta.filter(idCheckout__gt=ultimo).order_by('idCheckout').values(
+                    'idCheckout', 'stripe_checkout_session_id', 'referencia', 'estado', 'total'
+                )[:self.lote]
+            )
+            if not pagina:
+                return
+            yield pagina
+            ultimo = pagina[-1]['idCheckout']
+
+    def conciliar_checkouts(self, pagina):
+        objetos = self._consultar_todos([
+            (self.cliente.obtener_checkout_session, checkout['stripe_checkout_session_id'])
+            for checkout in pagina
+        ])
+
+        expirados = []
+        for checkout in pagina:
+            sesion = objetos.get(checkout['stripe_checkout_session_id'])
+            if sesion is None:
+                continue
+
+            if sesion.payment_status == 'paid':
+                self.cambios.append(
+                    f"Checkout {sesion.id}: {checkout['estado']} -> venta creada (total {checkout['total']})"
+                )
+                if not self.aplicar:
+                    self.resumen['ventas_creadas'] += 1
+                    continue
+                # La venta se arma desde el CheckoutPendiente, igual que en el webhook
+                success, venta = VentaService.crear_venta_desde_webhook({'id': sesion.id})
+                if not success:
+                    self.resumen['errores'] += 1
+                elif venta is not None:
+                    self.resumen['ventas_creadas'] += 1
+
+            elif sesion.status == 'expired' and checkout['estado'] == 'pendiente':
+                self.cambios.append(f"Checkout {sesion.id}: pendiente -> expirado (reserva liberada)")
+                expirados.append(checkout)
+
+        if expirados and self.aplicar:
+            self.resumen['checkouts_expirados'] += CheckoutPendiente.objects.filter(
+                idCheckout__in=[checkout['idCheckout'] for checkout in expirados],
+                estado='pendiente'
+            ).update(estado='expirado', fecha_modificacion=timezone.now())
+            InventarioService.liberar_reservas([checkout['referencia'] for checkout in expirados])
+        elif expirados:
+            self.resumen['checkouts_expirados'] += len(expirados)
+
+    # ==================== EJECUCIÓN ====================
+
+    def ejecutar(self, al_terminar_pagina=None):
+        """
+        Concilia cuotas y checkouts página por página.
+        `al_terminar_pagina(tipo, pagina)` se llama después de cada página.
+
+        Returns:
+            dict: resumen con los contadores de la ejecución
+        """
+        for tipo, paginas, conciliar in (
+            ('cuotas', self.paginas_cuotas, self.conciliar_cuotas),
+            ('checkouts', self.paginas_checkouts, self.conciliar_checkouts),
+        ):
+            for pagina in paginas():
+                conciliar(pagina)
+                if al_terminar_pagina:
+                    al_terminar_pagina(tipo, pagina)
+        return self.resumen
@@ -1,22 +1,50 @@
 from django.conf import settings
-from ventas.models import Cuota
-from ventas.serializers import CuotaSerializer
+from django.core.cache import cache
+from ventas.models import Cuota, VersionEstadisticasCuotas, PagoDuplicado
+from ventas.serializers import CuotaSerializer, PagarCuotasSerializer
+from ventas.services.service_deuda import DeudaService
 from rest_framework import status
+from integraciones import obtener_stripe, IntegracionNoDisponible
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import Sum, Count, Q, F
+from django.db.models.functions import TruncMonth
+from datetime import timedelta
+from collections import Counter
 import stripe
+import hashlib
+import os
+import threading
 
-# Configurar Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+
+class PagoEnCursoError(Exception):
+    """Una cuota ya tiene un pago cobrado o en proceso que el webhook todavía no aplicó"""
 
 
 class CuotaService:
     """Servicio para manejar cuotas y pagos con Stripe"""
     
+    # Estados en los que un Payment Intent todavía puede pagarse
+    ESTADOS_INTENT_REUTILIZABLES = {'requires_payment_method', 'requires_confirmation', 'requires_action'}
+    
+    # Segundos que se guarda en cache el Payment Intent de una cuota
+    TIEMPO_CACHE_INTENT = 15 * 60
+    
+    # Una sesión de Checkout a punto de vencer no se reutiliza
+    MARGEN_SESION = 5 * 60
+    
+    # Fila única de version_estadisticas_cuotas
+    ID_VERSION_ESTADISTICAS = 1
+    
+    # Llamadas a Stripe realizadas y evitadas, en memoria de este proceso
+    _llamadas_stripe = Counter()
+    _candado_llamadas = threading.Lock()
+    
     @staticmethod
     def listar_cuotas_venta(id_venta):
         """Lista todas las cuotas de una venta"""
         try:
-            cuotas = Cuota.objects.filter(venta__idVenta=id_venta).order_by('numero_cuota')
+            cuotas = Cuota.objects.con_estado().filter(venta__idVenta=id_venta).order_by('numero_cuota')
             serializer = CuotaSerializer(cuotas, many=True)
             return True, serializer.data, status.HTTP_200_OK
         except Exception as e:
@@ -26,8 +54,8 @@ class CuotaService:
     def listar_cuotas_usuario(usuario):
         """Lista todas las cuotas de un usuario"""
         try:
-            cuotas = Cuota.objects.filter(
-                venta__usuario=usuario
+            cuotas = Cuota.objects.con_estado().filter(
+                usuario=usuario
             ).select_related('venta').order_by('fecha_vencimiento')
             serializer = CuotaSerializer(cuotas, many=True)
             return True, serializer.data, status.HTTP_200_OK
@@ -38,7 +66,7 @@ class CuotaService:
     def listar_todas_cuotas():
         """Lista todas las cuotas del sistema (solo para administrador)"""
         try:
-            cuotas = Cuota.objects.all().select_related(
+            cuotas = Cuota.objects.con_estado().select_related(
                 'venta__usuario',
                 'venta__metodoPago'
             ).order_by('fecha_vencimiento')
@@ -51,7 +79,7 @@ class CuotaService:
     def listar_cuotas_pendientes():
         """Lista todas las cuotas pendientes del sistema (solo para administrador)"""
         try:
-            cuotas = Cuota.objects.filter(
+            cuotas = Cuota.objects.con_estado().filter(
                 pagada=False
             ).select_related('venta__usuario', 'venta__metodoPago').order_by('fecha_vencimiento')
             serializer = CuotaSerializer(cuotas, many=True)
@@ -64,7 +92,7 @@ class CuotaService:
         """Lista todas las cuotas vencidas del sistema (solo para administrador)"""
         try:
             from django.utils import timezone
-            cuotas = Cuota.objects.filter(
+            cuotas = Cuota.objects.con_estado().filter(
                 pagada=False,
                 fecha_vencimiento__lt=timezone.now().date()
             ).select_related('venta__usuario', 'venta__metodoPago').order_by('fecha_vencimiento')
@@ -75,45 +103,127 @@ class CuotaService:
     
     @staticmethod
     def obtener_estadisticas_cuotas():
-        """Obtiene estadísticas de cuotas (solo para administrador)"""
+        """
+        Obtiene estadísticas de cuotas (solo para administrador).
+        
+        Los contadores, montos y la antigüedad de la deuda vencida salen de una
+        sola pasada de agregación condicional; la proyección de cobros es un
+        GROUP BY por mes sobre las cuotas pendientes (índice parcial). El
+        resultado se guarda en cache hasta el próximo pago o venta en cuotas.
+        """
         try:
-            from django.db.models import Sum, Count
-            from django.utils import timezone
+            hoy = timezone.now().date()
+            clave = f'estadisticas_cuotas:{CuotaService._version_estadisticas()}:{hoy}'
+            estadisticas = cache.get(clave)
+            if estadisticas is not None:
+                return True, estadisticas, status.HTTP_200_OK
             
-            total_cuotas = Cuota.objects.count()
-            cuotas_pagadas = Cuota.objects.filter(pagada=True).count()
-            cuotas_pendientes = Cuota.objects.filter(pagada=False).count()
-            cuotas_vencidas = Cuota.objects.filter(
-                pagada=False,
-                fecha_vencimiento__lt=timezone.now().date()
-            ).count()
+            pendiente = Q(pagada=False)
+            vencida = pendiente & Q(fecha_vencimiento__lt=hoy)
+            total = F('monto') + F('monto_mora')  # Lo que se cobra: cuota + mora
             
-            monto_total_pendiente = Cuota.objects.filter(pagada=False).aggregate(
-                Sum('monto')
-            )['monto__sum'] or 0
+            # Tramos de días de atraso: (etiqueta, vencida desde, vencida hasta)
+            tramos = [
+                ('0-30', hoy - timedelta(days=30), hoy - timedelta(days=1)),
+                ('31-60', hoy - timedelta(days=60), hoy - timedelta(days=31)),
+                ('61-90', hoy - timedelta(days=90), hoy - timedelta(days=61)),
+                ('90+', None, hoy - timedelta(days=91)),
+            ]
+            agregados = {
+                'total_cuotas': Count('idCuota'),
+                'cuotas_pagadas': Count('idCuota', filter=Q(pagada=True)),
+                'cuotas_pendientes': Count('idCuota', filter=pendiente),
+                'cuotas_vencidas': Count('idCuota', filter=vencida),
+                'monto_total_pendiente': Sum(total, filter=pendiente),
+                'monto_total_pagado': Sum(total, filter=Q(pagada=True)),
+                'monto_total_vencido': Sum(total, filter=vencida),
+                'mora_pendiente': Sum('monto_mora', filter=pendiente),
+            }
+            for indice, (_, desde, hasta) in enumerate(tramos):
+                filtro = pendiente & Q(fecha_vencimiento__lte=hasta)
+                if desde:
+                    filtro &= Q(fecha_vencimiento__gte=desde)
+                agregados[f'tramo_{indice}_cantidad'] = Count('idCuota', filter=filtro)
+                agregados[f'tramo_{indice}_monto'] = Sum(total, filter=filtro)
             
-            monto_total_pagado = Cuota.objects.filter(pagada=True).aggregate(
-                Sum('monto')
-            )['monto__sum'] or 0
+            resultado = Cuota.objects.aggregate(**agregados)
             
-            return True, {
-                "total_cuotas": total_cuotas,
-                "cuotas_pagadas": cuotas_pagadas,
-                "cuotas_pendientes": cuotas_pendientes,
-                "cuotas_vencidas": cuotas_vencidas,
-                "monto_total_pendiente": round(monto_total_pendiente, 2),
-                "monto_total_pagado": round(monto_total_pagado, 2)
-            }, status.HTTP_200_OK
+            antiguedad = [
+                {
+                    "rango_dias": etiqueta,
+                    "cantidad": resultado.pop(f'tramo_{indice}_cantidad'),
+                    "monto": round(resultado.pop(f'tramo_{indice}_monto') or 0, 2)
+                }
+                for indice, (etiqueta, _, _) in enumerate(tramos)
+            ]
+            
+            # Cobros esperados por mes de vencimiento (cuotas aún no vencidas)
+            proyeccion = Cuota.objects.filter(
+                pagada=False,
+                fecha_vencimiento__gte=hoy
+            ).annotate(
+                mes=TruncMonth('fecha_vencimiento')
+            ).values('mes').annotate(
+                cantidad=Count('idCuota'),
+                monto=Sum(total)
+            ).order_by('mes')
+            
+            estadisticas = {
+                "total_cuotas": resultado['total_cuotas'],
+                "cuotas_pagadas": resultado['cuotas_pagadas'],
+                "cuotas_pendientes": resultado['cuotas_pendientes'],
+                "cuotas_vencidas": resultado['cuotas_vencidas'],
+                "monto_total_pendiente": round(resultado['monto_total_pendiente'] or 0, 2),
+                "monto_total_pagado": round(resultado['monto_total_pagado'] or 0, 2),
+                "monto_total_vencido": round(resultado['monto_total_vencido'] or 0, 2),
+                "mora_pendiente": round(resultado['mora_pendiente'] or 0, 2),
+                "antiguedad_vencidas": antiguedad,
+                "proyeccion_cobros": [
+                    {
+                        "mes": fila['mes'].strftime('%Y-%m'),
+                        "cantidad": fila['cantidad'],
+                        "monto": round(fila['monto'], 2)
+                    }
+                    for fila in proyeccion
+                ],
+                "fecha_calculo": hoy
+            }
+            cache.set(clave, estadisticas, 24 * 60 * 60)
+            return True, estadisticas, status.HTTP_200_OK
             
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def _version_estadisticas():
+        """
+        Versión vigente de las estadísticas (lectura por clave primaria). Vive
+        en la base y no en el cache, que puede ser local de cada proceso.
+        """
+        return VersionEstadisticasCuotas.objects.filter(
+            idVersion=CuotaService.ID_VERSION_ESTADISTICAS
+        ).values_list('version', flat=True).first() or 0
+    
+    @staticmethod
+    def invalidar_estadisticas():
+        """
+        Descarta las estadísticas de cuotas en cache (nueva versión de la clave).
+        Se ejecuta al confirmar la transacción que paga o crea cuotas.
+        """
+        def incrementar():
+            actualizadas = VersionEstadisticasCuotas.objects.filter(
+                idVersion=CuotaService.ID_VERSION_ESTADISTICAS
+            ).update(version=F('version') + 1)
+            if not actualizadas:
+                VersionEstadisticasCuotas.objects.get_or_create(idVersion=CuotaService.ID_VERSION_ESTADISTICAS)
+        transaction.on_commit(incrementar)
+    
     @staticmethod
     def listar_cuotas_pendientes_usuario(usuario):
         """Lista cuotas pendientes de pago de un usuario"""
         try:
-            cuotas = Cuota.objects.filter(
-                venta__usuario=usuario,
+            cuotas = Cuota.objects.con_estado().filter(
+                usuario=usuario,
                 pagada=False
             ).select_related('venta').order_by('fecha_vencimiento')
             serializer = CuotaSerializer(cuotas, many=True)
@@ -125,7 +235,7 @@ class CuotaService:
     def obtener_cuota(id_cuota):
         """Obtiene una cuota por ID"""
         try:
-            cuota = Cuota.objects.select_related('venta__usuario').get(idCuota=id_cuota)
+            cuota = Cuota.objects.con_estado().get(idCuota=id_cuota)
             serializer = CuotaSerializer(cuota)
             return True, serializer.data, status.HTTP_200_OK
         except Cuota.DoesNotExist:
@@ -133,38 +243,155 @@ class CuotaService:
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def _centavos(cuota):
+        """Lo que se cobra por la cuota (monto + mora acumulada), en centavos"""
+        return int(round((cuota.monto + cuota.monto_mora) * 100))
+    
+    @staticmethod
+    def _clave_cache(tipo, id_cuota):
+        return f'cuota:{id_cuota}:{tipo}'
+    
+    @staticmethod
+    def _contar_llamada(tipo, evitada):
+        """Cuenta (en este proceso, sin I/O) las llamadas a Stripe hechas y las evitadas por la reutilización"""
+        with CuotaService._candado_llamadas:
+            CuotaService._llamadas_stripe[(tipo, evitada)] += 1
+    
+    @staticmethod
+    def _anular_pagos_abiertos(cuotas, conservar):
+        """
+        Cancela los Payment Intents y expira las Checkout Sessions que las
+        cuotas todavía tienen abiertos, salvo los que cumplen `conservar`,
+        antes de cobrarlas con otro objeto: así ningún link o intent anterior
+        puede pagar dos veces las mismas cuotas.
+        Retorna {id: objeto} con los conservados.
+        
+        Raises:
+            PagoEnCursoError: si alguno ya se cobró o se está cobrando
+        """
+        cliente = obtener_stripe()
+        pedidos = {}
+        for cuota in cuotas:
+            if cuota.stripe_payment_intent_id:
+                pedidos[cuota.stripe_payment_intent_id] = ('payment_intent', cliente.obtener_payment_intent)
+            if cuota.stripe_checkout_session_id:
+                pedidos[cuota.stripe_checkout_session_id] = ('checkout_session', cliente.obtener_checkout_session)
+        
+        conservados = {}
+        for id_stripe, (tipo, obtener) in pedidos.items():
+            try:
+                objeto = obtener(id_stripe)
+            except stripe.InvalidRequestError as e:
+                if e.http_status == 404:
+                    continue
+                raise
+            CuotaService._contar_llamada(tipo, evitada=False)
+            
+            if tipo == 'payment_intent':
+                abierto = objeto.status in CuotaService.ESTADOS_INTENT_REUTILIZABLES
+                cobrado = objeto.status in ('processing', 'succeeded')
+            else:
+                abierto = objeto.status == 'open'
+                cobrado = objeto.status == 'complete'
+            if cobrado:
+                raise PagoEnCursoError(
+                    "Hay un pago de estas cuotas en proceso; espere a que se confirme"
+                )
+            if not abierto:
+                continue
+            if conservar(objeto):
+                conservados[id_stripe] = objeto
+            elif tipo == 'payment_intent':
+                cliente.cancelar_payment_intent(id_stripe)
+            else:
+                cliente.expirar_checkout_session(id_stripe)
+        
+        # Los intents y sesiones cacheados pueden haberse anulado
+        cache.delete_many([
+            CuotaService._clave_cache(tipo, cuota.idCuota)
+            for cuota in cuotas
+            for tipo in ('payment_intent', 'checkout_session')
+        ])
+        return conservados
+    
     @staticmethod
     def crear_payment_intent_cuota(cuota):
         """
         Crea un Payment Intent para pagar una cuota DENTRO de Flutter.
         Retorna el client_secret para usar con flutter_stripe.
+        
+        Si la cuota ya tiene un Payment Intent abierto por el mismo monto se
+        reutiliza (desde cache, sin llamar a Stripe, o consultándolo); si no,
+        se anulan sus pagos abiertos (intent por otro monto, link web o pago
+        de varias cuotas) y se crea uno nuevo, así no puede pagarse dos veces.
         """
         try:
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(cuota.monto * 100),  # Convertir a centavos
-                currency='usd',
-                payment_method_types=['card'],
-                metadata={
-                    'cuota_id': str(cuota.idCuota),
-                    'venta_id': str(cuota.venta.idVenta),
-                    'usuario_id': str(cuota.venta.usuario.idUsuario),
-                    'numero_cuota': str(cuota.numero_cuota)
-                },
-                description=f'Cuota {cuota.numero_cuota}/{cuota.venta.nrocuotas} - Venta {cuota.venta.idVenta}'
-            )
+            monto = CuotaService._centavos(cuota)
+            clave = CuotaService._clave_cache('payment_intent', cuota.idCuota)
             
-            # Guardar payment_intent_id
-            cuota.stripe_payment_intent_id = payment_intent.id
-            cuota.save()
+            intent = cache.get(clave)
+            reutilizado = bool(
+                intent and
+                intent['id'] == cuota.stripe_payment_intent_id and
+                intent['amount'] == monto
+            )
+            if reutilizado:
+                CuotaService._contar_llamada('payment_intent', evitada=True)
+            else:
+                # Se reutiliza el intent propio por el mismo monto; cualquier otro
+                # pago abierto de la cuota (link web, pago de varias cuotas) se anula
+                conservados = CuotaService._anular_pagos_abiertos([cuota], conservar=lambda objeto: (
+                    objeto.object == 'payment_intent' and
+                    objeto.metadata.get('cuota_id') == str(cuota.idCuota) and
+                    objeto.amount == monto
+                ))
+                intent = conservados.get(cuota.stripe_payment_intent_id)
+                reutilizado = intent is not None
+                
+                if intent is None:
+                    intent = obtener_stripe().crear_payment_intent(
+                        amount=monto,
+                        currency='usd',
+                        payment_method_types=['card'],
+                        metadata={
+                            'cuota_id': str(cuota.idCuota),
+                            'venta_id': str(cuota.venta.idVenta),
+                            'usuario_id': str(cuota.usuario_id),
+                            'numero_cuota': str(cuota.numero_cuota)
+                        },
+                        description=f'Cuota {cuota.numero_cuota}/{cuota.venta.nrocuotas} - Venta {cuota.venta.idVenta}',
+                        # Dos toques simultáneos desde la app reciben el mismo intent
+                        idempotency_key=f'cuota-{cuota.idCuota}-{cuota.stripe_payment_intent_id or "inicial"}-{monto}'
+                    )
+                    CuotaService._contar_llamada('payment_intent', evitada=False)
+                    
+                    # Guardar payment_intent_id
+                    cuota.stripe_payment_intent_id = intent.id
+                    cuota.save(update_fields=['stripe_payment_intent_id', 'fecha_modificacion'])
+                    DeudaService.incrementar_version([cuota.usuario_id])
+                
+                intent = {
+                    'id': intent.id,
+                    'client_secret': intent.client_secret,
+                    'amount': intent.amount,
+                    'status': intent.status
+                }
+                cache.set(clave, intent, CuotaService.TIEMPO_CACHE_INTENT)
             
             return True, {
-                'client_secret': payment_intent.client_secret,
-                'payment_intent_id': payment_intent.id,
-                'monto': cuota.monto,
+                'client_secret': intent['client_secret'],
+                'payment_intent_id': intent['id'],
+                'monto': round(monto / 100, 2),
+                'reutilizado': reutilizado,
                 'cuota': CuotaSerializer(cuota).data
             }, status.HTTP_200_OK
             
-        except stripe.error.StripeError as e:
+        except PagoEnCursoError as e:
+            return False, {"error": str(e)}, status.HTTP_409_CONFLICT
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
+        except stripe.StripeError as e:
             return False, {"error": f"Error de Stripe: {str(e)}"}, status.HTTP_400_BAD_REQUEST
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -174,58 +401,352 @@ class CuotaService:
         """
         Genera un link de pago (Hosted Checkout) para pagar una cuota en NAVEGADOR.
         El usuario sale de la app y paga en una página de Stripe.
+        
+        Mientras la sesión anterior siga abierta, por el mismo monto y sin estar
+        por vencer, se devuelve el mismo link en lugar de crear otra sesión.
         """
         try:
-            checkout_session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': f'Cuota {cuota.numero_cuota} de {cuota.venta.nrocuotas}',
-                            'description': f'Venta #{cuota.venta.idVenta} - Vencimiento: {cuota.fecha_vencimiento}'
-                        },
-                        'unit_amount': int(cuota.monto * 100),  # Centavos
-                    },
-                    'quantity': 1,
-                }],
-                mode='payment',
-                success_url=f'{settings.FRONTEND_URL}/pago-exitoso?session_id={{CHECKOUT_SESSION_ID}}',
-                cancel_url=f'{settings.FRONTEND_URL}/pago-cancelado',
-                metadata={
-                    'cuota_id': str(cuota.idCuota),
-                    'venta_id': str(cuota.venta.idVenta),
-                    'usuario_id': str(cuota.venta.usuario.idUsuario),
-                    'numero_cuota': str(cuota.numero_cuota)
-                }
-            )
+            monto = CuotaService._centavos(cuota)
+            clave = CuotaService._clave_cache('checkout_session', cuota.idCuota)
+            vigente_hasta = int(timezone.now().timestamp()) + CuotaService.MARGEN_SESION
             
-            # Guardar checkout_session_id
-            cuota.stripe_checkout_session_id = checkout_session.id
-            cuota.save()
+            sesion = cache.get(clave)
+            reutilizado = bool(
+                sesion and
+                sesion['id'] == cuota.stripe_checkout_session_id and
+                sesion['amount_total'] == monto and
+                sesion['expires_at'] > vigente_hasta
+            )
+            if reutilizado:
+                CuotaService._contar_llamada('checkout_session', evitada=True)
+            else:
+                conservados = CuotaService._anular_pagos_abiertos([cuota], conservar=lambda objeto: (
+                    objeto.object == 'checkout.session' and
+                    objeto.metadata.get('cuota_id') == str(cuota.idCuota) and
+                    objeto.amount_total == monto and
+                    objeto.expires_at > vigente_hasta
+                ))
+                sesion = conservados.get(cuota.stripe_checkout_session_id)
+                reutilizado = sesion is not None
+                
+                if sesion is None:
+                    sesion = obtener_stripe().crear_checkout_session(
+                        payment_method_types=['card'],
+                        line_items=[{
+                            'price_data': {
+                                'currency': 'usd',
+                                'product_data': {
+                                    'name': f'Cuota {cuota.numero_cuota} de {cuota.venta.nrocuotas}',
+                                    'description': f'Venta #{cuota.venta.idVenta} - Vencimiento: {cuota.fecha_vencimiento}'
+                                },
+                                'unit_amount': monto,
+                            },
+                            'quantity': 1,
+                        }],
+                        mode='payment',
+                        success_url=f'{settings.FRONTEND_URL}/pago-exitoso?session_id={{CHECKOUT_SESSION_ID}}',
+                        cancel_url=f'{settings.FRONTEND_URL}/pago-cancelado',
+                        metadata={
+                            'cuota_id': str(cuota.idCuota),
+                            'venta_id': str(cuota.venta.idVenta),
+                            'usuario_id': str(cuota.usuario_id),
+                            'numero_cuota': str(cuota.numero_cuota)
+                        }
+                    )
+                    CuotaService._contar_llamada('checkout_session', evitada=False)
+                    
+                    # Guardar checkout_session_id
+                    cuota.stripe_checkout_session_id = sesion.id
+                    cuota.save(update_fields=['stripe_checkout_session_id', 'fecha_modificacion'])
+                    DeudaService.incrementar_version([cuota.usuario_id])
+                
+                sesion = {
+                    'id': sesion.id,
+                    'url': sesion.url,
+                    'amount_total': sesion.amount_total,
+                    'expires_at': sesion.expires_at
+                }
+                # La entrada vence junto con la sesión (menos el margen)
+                cache.set(clave, sesion, max(sesion['expires_at'] - vigente_hasta, 1))
             
             return True, {
-                'url': checkout_session.url,
-                'session_id': checkout_session.id,
-                'monto': cuota.monto,
+                'url': sesion['url'],
+                'session_id': sesion['id'],
+                'monto': round(monto / 100, 2),
+                'reutilizado': reutilizado,
                 'cuota': CuotaSerializer(cuota).data
             }, status.HTTP_200_OK
             
-        except stripe.error.StripeError as e:
+        except PagoEnCursoError as e:
+            return False, {"error": str(e)}, status.HTTP_409_CONFLICT
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
+        except stripe.StripeError as e:
             return False, {"error": f"Error de Stripe: {str(e)}"}, status.HTTP_400_BAD_REQUEST
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def crear_pago_cuotas(data, usuario):
+        """
+        Crea un único Payment Intent (Flutter) o Checkout Session (Web) por la
+        suma de varias cuotas pendientes del usuario, o de todas las que le quedan.
+        Antes anula los intents y links que esas cuotas tengan abiertos.
+        
+        Los IDs viajan en metadata['cuota_ids'] y el webhook las liquida todas
+        con un solo UPDATE condicional. El ID del objeto de Stripe se guarda en
+        cada cuota para que la conciliación las encuentre si el webhook se pierde.
+        """
+        try:
+            serializer = PagarCuotasSerializer(data=data)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+            
+            validated_data = serializer.validated_data
+            
+            cuotas = Cuota.objects.filter(usuario=usuario, pagada=False)
+            if validated_data['todas']:
+                if 'venta' in validated_data:
+                    cuotas = cuotas.filter(venta__idVenta=validated_data['venta'])
+            else:
+                cuotas = cuotas.filter(idCuota__in=validated_data['cuotas'])
+            cuotas = list(cuotas.order_by('fecha_vencimiento', 'idCuota'))
+            
+            if not validated_data['todas'] and len(cuotas) != len(set(validated_data['cuotas'])):
+                return False, {
+                    "error": "Una o más cuotas no existen, no le pertenecen o ya están pagadas"
+                }, status.HTTP_400_BAD_REQUEST
+            if not cuotas:
+                return False, {"error": "No hay cuotas pendientes para pagar"}, status.HTTP_400_BAD_REQUEST
+            
+            # Stripe limita cada valor del metadata a 500 caracteres
+            cuota_ids = ','.join(str(cuota.idCuota) for cuota in cuotas)
+            if len(cuota_ids) > 500:
+                return False, {"error": "Demasiadas cuotas para un solo pago"}, status.HTTP_400_BAD_REQUEST
+            
+            monto = sum(CuotaService._centavos(cuota) for cuota in cuotas)
+            metadata = {
+                'cuota_ids': cuota_ids,
+                'usuario_id': str(usuario.idUsuario)
+            }
+            descripcion = f'Pago de {len(cuotas)} cuotas'
+            
+            # Repetir la misma solicitud devuelve el mismo objeto de Stripe
+            idempotency_key = 'cuotas-' + hashlib.sha256(
+                f"{validated_data['modo']}-{cuota_ids}-{monto}".encode()
+            ).hexdigest()
+            
+            # Anular los pagos individuales (o combinados de otras cuotas) aún
+            # abiertos; el combinado de estas mismas cuotas se conserva porque
+            # la idempotency_key lo vuelve a devolver
+            CuotaService._anular_pagos_abiertos(cuotas, conservar=lambda objeto: (
+                objeto.metadata.get('cuota_ids') == cuota_ids and
+                (objeto.amount if objeto.object == 'payment_intent' else objeto.amount_total) == monto
+            ))
+            
+            if validated_data['modo'] == 'payment_intent':
+                payment_intent = obtener_stripe().crear_payment_intent(
+                    amount=monto,
+                    currency='usd',
+                    payment_method_types=['card'],
+                    metadata=metadata,
+                    description=descripcion,
+                    idempotency_key=idempotency_key
+                )
+                resultado = {
+                    'client_secret': payment_intent.client_secret,
+                    'payment_intent_id': payment_intent.id
+                }
+                campos = {'stripe_payment_intent_id': payment_intent.id}
+            else:
+                checkout_session = obtener_stripe().crear_checkout_session(
+                    payment_method_types=['card'],
+                    line_items=[{
+                        'price_data': {
+                            'currency': 'usd',
+                            'product_data': {
+                                'name': descripcion,
+                                'description': ', '.join(
+                                    f'Cuota {cuota.numero_cuota} (Venta #{cuota.venta_id})' for cuota in cuotas
+                                )[:500]
+                            },
+                            'unit_amount': monto,
+                        },
+                        'quantity': 1,
+                    }],
+                    mode='payment',
+                    success_url=f'{settings.FRONTEND_URL}/pago-exitoso?session_id={{CHECKOUT_SESSION_ID}}',
+                    cancel_url=f'{settings.FRONTEND_URL}/pago-cancelado',
+                    metadata=metadata,
+                    idempotency_key=idempotency_key
+                )
+                resultado = {
+                    'url': checkout_session.url,
+                    'session_id': checkout_session.id
+                }
+                campos = {'stripe_checkout_session_id': checkout_session.id}
+            
+            # Guardar el ID en todas las cuotas (un UPDATE) para que la conciliación las encuentre
+            Cuota.objects.filter(
+                idCuota__in=[cuota.idCuota for cuota in cuotas], pagada=False
+            ).update(fecha_modificacion=timezone.now(), **campos)
+            DeudaService.incrementar_version([usuario.idUsuario])
+            for cuota in cuotas:
+                for campo, valor in campos.items():
+                    setattr(cuota, campo, valor)
+            
+            resultado.update({
+                'monto': round(monto / 100, 2),
+                'cantidad_cuotas': len(cuotas),
+                'cuotas': CuotaSerializer(cuotas, many=True).data
+            })
+            return True, resultado, status.HTTP_200_OK
+            
+        except PagoEnCursoError as e:
+            return False, {"error": str(e)}, status.HTTP_409_CONFLICT
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
+        except stripe.StripeError as e:
+            return False, {"error": f"Error de Stripe: {str(e)}"}, status.HTTP_400_BAD_REQUEST
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    
+    @staticmethod
+    def obtener_metricas_stripe():
+        """
+        Llamadas a Stripe realizadas y evitadas por la reutilización de
+        Payment Intents y sesiones de Checkout (solo para administrador).
+        Son los contadores del proceso que atiende la petición, desde que arrancó.
+        """
+        try:
+            with CuotaService._candado_llamadas:
+                llamadas = Counter(CuotaService._llamadas_stripe)
+            metricas = {'proceso': os.getpid()}
+            for tipo in ('payment_intent', 'checkout_session'):
+                realizadas = llamadas[(tipo, False)]
+                evitadas = llamadas[(tipo, True)]
+                metricas[tipo] = {
+                    "llamadas_realizadas": realizadas,
+                    "llamadas_evitadas": evitadas,
+                    "tasa_reutilizacion": round(evitadas / (realizadas + evitadas), 4) if realizadas + evitadas else 0.0
+                }
+            return True, metricas, status.HTTP_200_OK
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    
+    @staticmethod
+    def liquidar_cuotas(ids_cuotas, **stripe_ids):
+        """
+        Marca como pagadas las cuotas indicadas con un único UPDATE condicional
+        (solo las que siguen pendientes), por lo que es idempotente: procesar
+        dos veces el mismo pago no cambia nada. Actualiza también el saldo de
+        las ventas y el resumen de deuda de sus usuarios.
+        
+        Los IDs de Stripe de la cuota quedan siendo los del pago que la liquidó
+        (o vacíos si se marcó a mano), lo que permite reconocer un cobro
+        duplicado (ver reembolsar_duplicados).
+        
+        Args:
+            ids_cuotas (list): IDs de las cuotas a liquidar
+            **stripe_ids: stripe_payment_intent_id y/o stripe_checkout_session_id del pago
+        
+        Returns:
+            int: cantidad de cuotas que pasaron a pagadas
+        """
+        with transaction.atomic():
+            liquidadas = Cuota.objects.filter(idCuota__in=ids_cuotas, pagada=False).update(
+                pagada=True,
+                fecha_pago=timezone.now().date(),
+                fecha_modificacion=timezone.now(),
+                stripe_payment_intent_id=stripe_ids.get('stripe_payment_intent_id'),
+                stripe_checkout_session_id=stripe_ids.get('stripe_checkout_session_id')
+            )
+            if liquidadas:
+                # Saldos de las ventas y de sus usuarios, en la misma transacción
+                DeudaService.actualizar_por_cuotas(ids_cuotas)
+                CuotaService.invalidar_estadisticas()
+        
+        # Los intents y sesiones guardados en cache ya no deben reutilizarse
+        cache.delete_many([
+            CuotaService._clave_cache(tipo, id_cuota)
+            for id_cuota in ids_cuotas
+            for tipo in ('payment_intent', 'checkout_session')
+        ])
+        return liquidadas
+    
+    @staticmethod
+    def ids_cuotas_pagadas(metadata):
+        """IDs de cuota del metadata de un pago: 'cuota_ids' (pago de varias) o 'cuota_id' (una)"""
+        if metadata.get('cuota_ids'):
+            return metadata['cuota_ids'].split(',')
+        if metadata.get('cuota_id'):
+            return [metadata['cuota_id']]
+        return []
+    
+    @staticmethod
+    def reembolsar_duplicados(ids_cuotas, stripe_payment_intent_id, stripe_checkout_session_id=None):
+        """
+        Después de liquidar un pago de Stripe, registra en pago_duplicado las
+        cuotas que ya estaban pagadas por otro pago y reembolsa su monto del
+        Payment Intent cobrado. Idempotente: reprocesar el mismo pago no
+        registra ni reembolsa dos veces. Si el reembolso falla los registros
+        quedan 'pendiente' para revisión del administrador.
+        Retorna la cantidad de cuotas cobradas de más.
+        """
+        stripe_id = stripe_checkout_session_id or stripe_payment_intent_id
+        de_este_pago = Q(stripe_checkout_session_id=stripe_checkout_session_id) if stripe_checkout_session_id \
+            else Q(stripe_payment_intent_id=stripe_payment_intent_id)
+        duplicadas = list(
+            Cuota.objects.filter(idCuota__in=ids_cuotas, pagada=True).exclude(de_este_pago).values_list(
+                'idCuota', F('monto') + F('monto_mora')
+            )
+        )
+        if not duplicadas:
+            return 0
+        
+        PagoDuplicado.objects.bulk_create([
+            PagoDuplicado(
+                cuota_id=id_cuota,
+                stripe_id=stripe_id,
+                stripe_payment_intent_id=stripe_payment_intent_id,
+                monto=monto
+            )
+            for id_cuota, monto in duplicadas
+        ], ignore_conflicts=True)
+        pendientes = list(PagoDuplicado.objects.filter(stripe_id=stripe_id, estado='pendiente').order_by('cuota_id'))
+        if not pendientes:
+            return len(duplicadas)
+        
+        ids_pendientes = ','.join(str(pago.cuota_id) for pago in pendientes)
+        print(f"⚠️ Cuota(s) {ids_pendientes} ya estaban pagadas y se cobraron de nuevo con {stripe_id}")
+        try:
+            if not stripe_payment_intent_id:
+                raise ValueError("el pago no tiene Payment Intent")
+            reembolso = obtener_stripe().crear_reembolso(
+                payment_intent=stripe_payment_intent_id,
+                amount=sum(int(round(pago.monto * 100)) for pago in pendientes),
+                reason='duplicate',
+                metadata={'cuota_ids': ids_pendientes},
+                idempotency_key=f'reembolso-{stripe_id}-{ids_pendientes}'
+            )
+        except Exception as e:
+            print(f"❌ No se pudo reembolsar el cobro duplicado de {stripe_id}, queda para revisión: {str(e)}")
+            return len(duplicadas)
+        
+        PagoDuplicado.objects.filter(
+            idPagoDuplicado__in=[pago.idPagoDuplicado for pago in pendientes], estado='pendiente'
+        ).update(estado='reembolsado', stripe_refund_id=reembolso.id, fecha_modificacion=timezone.now())
+        print(f"💸 Cobro duplicado de {stripe_id} reembolsado ({reembolso.id})")
+        return len(duplicadas)
+    
     @staticmethod
     def marcar_cuota_pagada(cuota):
         """Marca una cuota como pagada"""
         try:
-            if cuota.pagada:
+            if not CuotaService.liquidar_cuotas([cuota.idCuota]):
                 return False, {"error": "La cuota ya está pagada"}, status.HTTP_400_BAD_REQUEST
             
-            cuota.pagada = True
-            cuota.fecha_pago = timezone.now().date()
-            cuota.save()
+            cuota.refresh_from_db()
             
             return True, {
                 "mensaje": "Cuota marcada como pagada",
@@ -0,0 +1,185 @@
+from django.db.models import Sum, Count, F, OuterRef, Subquery, Value, FloatField, IntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import status
+from ventas.models import Venta, Cuota, ResumenDeudaUsuario
+
+
+class DeudaService:
+    """
+    Saldos desnormalizados de deuda en cuotas.
+
+    Cada venta guarda su saldo pendiente (cuotas + mora), cuotas pagadas y próximo vencimiento,
+    y cada usuario una fila de ResumenDeudaUsuario con el total de sus ventas.
+    Ambos se recalculan con UPDATE ... SET campo = (subconsulta) dentro de la
+    transacción que paga o crea cuotas, así la lectura de la deuda es una sola
+    fila indexada en lugar de traer todas las ventas con sus cuotas.
+    """
+
+    @staticmethod
+    def recalcular_ventas(ids_ventas):
+        """
+        Recalcula el estado de pago de las ventas a partir de sus cuotas.
+        Debe llamarse dentro de una transacción.
+        """
+        ids_ventas = sorted(set(ids_ventas))
+        if not ids_ventas:
+            return 0
+
+        # Bloquear las ventas (en orden, para evitar deadlocks) antes de leer
+        # sus cuotas: un pago simultáneo de otra cuota de la misma venta espera
+        # aquí y su UPDATE ve ya confirmado el nuestro
+        list(Venta.objects.select_for_update().filter(
+            idVenta__in=ids_ventas
+        ).order_by('idVenta').values_list('idVenta', flat=True))
+
+        pendientes = Cuota.objects.filter(venta=OuterRef('pk'), pagada=False)
+        pagadas = Cuota.objects.filter(venta=OuterRef('pk'), pagada=True)
+
+        return Venta.objects.filter(idVenta__in=ids_ventas).update(
+            saldo_pendiente=Coalesce(
+                Subquery(pendientes.values('venta').annotate(
+                    total=Sum(F('monto') + F('monto_mora'))
+                ).values('total')),
+                Value(0.0), output_field=FloatField()
+            ),
+            cuotas_pagadas=Coalesce(
+                Subquery(pagadas.values('venta').annotate(cantidad=Count('idCuota')).values('cantidad')),
+                Value(0), output_field=IntegerField()
+            ),
+            proxima_fecha_vencimiento=Subquery(
+                pendientes.order_by('fecha_vencimiento').values('fecha_vencimiento')[:1]
+            ),
+            fecha_modificacion=timezone.now()
+        )
+
+    @staticmethod
+    def recalcular_usuarios(ids_usuarios):
+        """
+        Recalcula el resumen de deuda de los usuarios a partir de los saldos
+        de sus ventas. Debe llamarse dentro de una transacción, después de
+        recalcular_ventas.
+        """
+        ids_usuarios = sorted(set(ids_usuarios))
+        if not ids_usuarios:
+            return 0
+
+        ResumenDeudaUsuario.objects.bulk_create(
+            [ResumenDeudaUsuario(usuario_id=id_usuario) for id_usuario in ids_usuarios],
+            ignore_conflicts=True
+        )
+        list(ResumenDeudaUsuario.objects.select_for_update().filter(
+            usuario_id__in=ids_usuarios
+        ).order_by('usuario_id').values_list('idResumen', flat=True))
+
+        con_saldo = Venta.objects.filter(usuario=OuterRef('usuario'), saldo_pendiente__gt=0).values('usuario')
+
+        return ResumenDeudaUsuario.objects.filter(usuario_id__in=ids_usuarios).update(
+            saldo_pendiente=Coalesce(
+                Subquery(con_saldo.annotate(total=Sum('saldo_pendiente')).values('total')),
+                Value(0.0), output_field=FloatField()
+            ),
+            cuotas_pendientes=Coalesce(
+                Subquery(con_saldo.annotate(
+                    cantidad=Sum(F('nrocuotas') - F('cuotas_pagadas'))
+                ).values('cantidad')),
+                Value(0), output_field=IntegerField()
+            ),
+            ventas_con_saldo=Coalesce(
+                Subquery(con_saldo.annotate(cantidad=Count('idVenta')).values('cantidad')),
+                Value(0), output_field=IntegerField()
+            ),
+            proxima_fecha_vencimiento=Subquery(
+                Venta.objects.filter(
+                    usuario=OuterRef('usuario'), proxima_fecha_vencimiento__isnull=False
+                ).order_by('proxima_fecha_vencimiento').values('proxima_fecha_vencimiento')[:1]
+            ),
+            version=F('version') + 1,
+            fecha_modificacion=timezone.now()
+        )
+
+    @staticmethod
+    def incrementar_version(ids_usuarios):
+        """
+        Marca como modificadas las ventas y cuotas de los usuarios sin
+        recalcular su deuda (venta al contado, datos de pago de una cuota).
+        La versión es el validador del GET condicional de sus listados.
+        """
+        ids_usuarios = sorted(set(ids_usuarios))
+        ResumenDeudaUsuario.objects.bulk_create(
+            [ResumenDeudaUsuario(usuario_id=id_usuario) for id_usuario in ids_usuarios],
+            ignore_conflicts=True
+        )
+        return ResumenDeudaUsuario.objects.filter(usuario_id__in=ids_usuarios).update(
+            version=F('version') + 1,
+            fecha_modificacion=timezone.now()
+        )
+
+    @staticmethod
+    def validador_usuario(request, *args, **kwargs):
+        """
+        Validador del GET condicional de los listados privados (mis ventas,
+        mis cuotas, deuda, estado de cuenta): la versión del usuario, que
+        cambia con cada venta, pago o mora, y la fecha de hoy, porque una
+        cuota pasa a vencida sin que se modifique ninguna fila.
+        """
+        version = ResumenDeudaUsuario.objects.filter(
+            usuario_id=request.user.idUsuario
+        ).values_list('version', flat=True).first()
+        return request.user.idUsuario, version or 0, timezone.now().date()
+
+    @staticmethod
+    def actualizar_por_cuotas(ids_cuotas):
+        """Recalcula las ventas y usuarios dueños de las cuotas indicadas"""
+        ventas = list(Venta.objects.filter(
+            cuotas__idCuota__in=ids_cuotas
+        ).values_list('idVenta', 'usuario_id').order_by().distinct())
+        DeudaService.recalcular_ventas([id_venta for id_venta, _ in ventas])
+        DeudaService.recalcular_usuarios([id_usuario for _, id_usuario in ventas])
+
+    @staticmethod
+    def obtener_resumen_usuario(usuario):
+        """Deuda en cuotas del usuario (una sola fila)"""
+        try:
+            resumen = ResumenDeudaUsuario.objects.filter(usuario=usuario).first()
+            return True, DeudaService._serializar(resumen), status.HTTP_200_OK
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    def listar_mayores_deudores(limite=20):
+        """Usuarios con mayor saldo pendiente (solo para administrador)"""
+        try:
+            limite = max(1, min(int(limite), 100))
+            resumenes = ResumenDeudaUsuario.objects.filter(
+                saldo_pendiente__gt=0
+            ).select_related('usuario').order_by('-saldo_pendiente')[:limite]
+            return True, [
+                {
+                    "usuario": resumen.usuario_id,
+                    "username": resumen.usuario.username,
+                    "email": resumen.usuario.email,
+                    **DeudaService._serializar(resumen)
+                }
+                for resumen in resumenes
+            ], status.HTTP_200_OK
+        except ValueError:
+            return False, {"error": "El límite debe ser un número entero"}, status.HTTP_400_BAD_REQUEST
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    def _serializar(resumen):
+        if resumen is None:
+            return {
+                "saldo_pendiente": 0,
+                "cuotas_pendientes": 0,
+                "ventas_con_saldo": 0,
+                "proxima_fecha_vencimiento": None
+            }
+        return {
+            "saldo_pendiente": round(resumen.saldo_pendiente, 2),
+            "cuotas_pendientes": resumen.cuotas_pendientes,
+            "ventas_con_saldo": resumen.ventas_con_saldo,
+            "proxima_fecha_vencimiento": resumen.proxima_fecha_vencimiento
+        }
@@ -0,0 +1,177 @@
+from datetime import date
+from django.core import signing
+from django.db import connection
+from rest_framework import status
+from ventas.models import Venta, Cuota
+from ventas.serializers import EstadoCuentaSerializer
+
+
+class EstadoCuentaService:
+    """
+    Estado de cuenta del cliente: ventas (cargos) y pagos en un solo libro
+    cronológico con saldo acumulado.
+
+    La paginación es por keyset sobre (fecha, orden, id). Cada rama del libro
+    (ventas, pagos al contado, pagos de cuotas) aplica el keyset y su propio
+    LIMIT sobre un índice en ese mismo orden (venta_usuario_dia_idx y
+    cuota_usuario_pago_idx), así la unión tiene a lo sumo 3 * limite filas. El
+    saldo se calcula con SUM(...) OVER solo sobre esas filas, a partir del
+    saldo al final de la página anterior que viaja firmado en el cursor: el
+    costo de una página no depende de la antigüedad del cliente.
+
+    Una venta en cuotas carga la suma de sus cuotas (lo que efectivamente se
+    cobra, con los montos redondeados) y el pago de cada cuota carga su mora y
+    abona cuota + mora, así el saldo vuelve exactamente a 0 cuando se pagan todas.
+    """
+
+    SALT_CURSOR = 'ventas.estado_cuenta'
+
+    # Cota para "después de cualquier id" en el keyset de una rama
+    ID_MAXIMO = 2 ** 31 - 1
+
+    # orden: en un mismo día primero la venta, después su pago al contado y luego las cuotas.
+    # (DATE en UTC, igual que el índice venta_usuario_dia_idx; TIME_ZONE = 'UTC')
+    SQL_MOVIMIENTOS = f'''
+        SELECT m.fecha, m.orden, m.id, m.tipo, m.venta_id, m.numero_cuota, v.nrocuotas,
+               CASE WHEN m.tipo = 'venta' AND v.nrocuotas > 1 THEN (
+                   SELECT SUM(cv.monto) FROM {Cuota._meta.db_table} cv WHERE cv.venta_id = v."idVenta"
+               ) ELSE m.cargo END AS cargo,
+               m.abono
+        FROM (
+            (SELECT (v.fecha_venta AT TIME ZONE 'UTC')::date AS fecha, 0 AS orden, v."idVenta" AS id,
+                    'venta' AS tipo, v."idVenta" AS venta_id, NULL::integer AS numero_cuota,
+                    v.total AS cargo, 0.0::float AS abono
+             FROM {Venta._meta.db_table} v
+             WHERE v.usuario_id = %(usuario)s
+               AND ((v.fecha_venta AT TIME ZONE 'UTC')::date, v."idVenta") > (%(fecha)s, %(desde_venta)s)
+             ORDER BY 1, 3
+             LIMIT %(limite)s)
+            UNION ALL
+            (SELECT (v.fecha_venta AT TIME ZONE 'UTC')::date, 1, v."idVenta",
+                    'pago_contado', v."idVenta", NULL,
+                    0.0, v.total
+             FROM {Venta._meta.db_table} v
+             WHERE v.usuario_id = %(usuario)s AND v.nrocuotas = 1
+               AND ((v.fecha_venta AT TIME ZONE 'UTC')::date, v."idVenta") > (%(fecha)s, %(desde_contado)s)
+             ORDER BY 1, 3
+             LIMIT %(limite)s)
+            UNION ALL
+            (SELECT c.fecha_pago, 2, c."idCuota",
+                    'pago_cuota', c.venta_id, c.numero_cuota,
+                    c.monto_mora, c.monto + c.monto_mora
+             FROM {Cuota._meta.db_table} c
+             WHERE c.usuario_id = %(usuario)s AND c.pagada AND c.fecha_pago IS NOT NULL
+               AND (c.fecha_pago, c."idCuota") > (%(fecha)s, %(desde_cuota)s)
+             ORDER BY 1, 3
+             LIMIT %(limite)s)
+        ) m
+        JOIN {Venta._meta.db_table} v ON v."idVenta" = m.venta_id
+        ORDER BY m.fecha, m.orden, m.id
+        LIMIT %(limite)s
+    '''
+
+    # El saldo corre solo sobre las filas de la página
+    SQL_PAGINA = f'''
+        SELECT pagina.*,
+               %(saldo)s + SUM(pagina.cargo - pagina.abono) OVER (
+                   ORDER BY pagina.fecha, pagina.orden, pagina.id ROWS UNBOUNDED PRECEDING
+               ) AS saldo
+        FROM ({SQL_MOVIMIENTOS}) pagina
+        ORDER BY pagina.fecha, pagina.orden, pagina.id
+    '''
+
+    @staticmethod
+    def _desde_id(orden_rama, orden, id_movimiento):
+        """Keyset de una rama: último id ya listado de esa rama en el día del cursor"""
+        if orden_rama > orden:
+            return 0
+        if orden_rama == orden:
+            return id_movimiento
+        return EstadoCuentaService.ID_MAXIMO
+
+    @staticmethod
+    def obtener_estado_cuenta(usuario, params):
+        """
+        Página del estado de cuenta del usuario, de la más antigua a la más nueva.
+
+        Params:
+            cursor (opcional): 'siguiente_cursor' de la página anterior
+            limite (opcional): movimientos por página (1-200, defecto 50)
+        """
+        try:
+            serializer = EstadoCuentaSerializer(data=params)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+
+            validated_data = serializer.validated_data
+            limite = validated_data['limite']
+
+            # Inicio del libro: antes de cualquier movimiento y con saldo 0
+            fecha, orden, id_movimiento, saldo = date.min, -1, 0, 0.0
+            if validated_data.get('cursor'):
+                try:
+                    cursor = signing.loads(validated_data['cursor'], salt=EstadoCuentaService.SALT_CURSOR)
+                except signing.BadSignature:
+                    return False, {"error": "Cursor inválido"}, status.HTTP_400_BAD_REQUEST
+                if cursor['u'] != usuario.idUsuario:
+                    return False, {"error": "Cursor inválido"}, status.HTTP_400_BAD_REQUEST
+                fecha = date.fromisoformat(cursor['f'])
+                orden, id_movimiento, saldo = cursor['o'], cursor['i'], cursor['s']
+
+            with connection.cursor() as cursor_db:
+                cursor_db.execute(EstadoCuentaService.SQL_PAGINA, {
+                    'saldo': saldo,
+                    'usuario': usuario.idUsuario,
+                    'fecha': fecha,
+                    'desde_venta': EstadoCuentaService._desde_id(0, orden, id_movimiento),
+                    'desde_contado': EstadoCuentaService._desde_id(1, orden, id_movimiento),
+                    'desde_cuota': EstadoCuentaService._desde_id(2, orden, id_movimiento),
+                    'limite': limite + 1  # Una fila extra para saber si hay otra página
+                })
+                columnas = [columna[0] for columna in cursor_db.description]
+                filas = [dict(zip(columnas, fila)) for fila in cursor_db.fetchall()]
+
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+
+            movimientos = [
+                {
+                    "fecha": fila['fecha'] if isinstance(fila['fecha'], date) else date.fromisoformat(fila['fecha']),
+                    "tipo": fila['tipo'],
+                    "descripcion": EstadoCuentaService._describir(fila),
+                    "venta": fila['venta_id'],
+                    "cargo": round(fila['cargo'], 2),
+                    "abono": round(fila['abono'], 2),
+                    "saldo": round(fila['saldo'], 2)
+                }
+                for fila in filas
+            ]
+
+            siguiente_cursor = None
+            if hay_mas:
+                ultima = filas[-1]
+                siguiente_cursor = signing.dumps({
+                    'u': usuario.idUsuario,
+                    'f': str(movimientos[-1]['fecha']),
+                    'o': ultima['orden'],
+                    'i': ultima['id'],
+                    's': ultima['saldo']
+                }, salt=EstadoCuentaService.SALT_CURSOR)
+
+            return True, {
+                "movimientos": movimientos,
+                "saldo_final_pagina": movimientos[-1]['saldo'] if movimientos else round(saldo, 2),
+                "siguiente_cursor": siguiente_cursor
+            }, status.HTTP_200_OK
+
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    def _describir(fila):
+        if fila['tipo'] == 'venta':
+            plan = 'al contado' if fila['nrocuotas'] == 1 else f"en {fila['nrocuotas']} cuotas"
+            return f"Venta #{fila['venta_id']} {plan}"
+        if fila['tipo'] == 'pago_contado':
+            return f"Pago al contado de la venta #{fila['venta_id']}"
+        return f"Pago de la cuota {fila['numero_cuota']}/{fila['nrocuotas']} de la venta #{fila['venta_id']}"
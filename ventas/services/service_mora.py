@@ -0,0 +1,113 @@
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q, Min, Max
+from django.utils import timezone
+from ventas.models import Cuota, EjecucionMora
+from ventas.services.service_cuota import CuotaService
+from ventas.services.service_deuda import DeudaService
+
+
+class MoraService:
+    """
+    Cálculo de mora de cuotas vencidas con UPDATE por tramos de IDs.
+
+    Cada cuota guarda hasta qué día tiene la mora calculada (mora_hasta), y
+    cada UPDATE solo toca las cuotas que están por detrás de la fecha de
+    corte, así que repetir o retomar una ejecución no duplica mora:
+
+        monto_mora += monto * tasa * (corte - COALESCE(mora_hasta, fecha_vencimiento))
+
+    La mora forma parte de lo que el cliente debe: se suma al saldo de la
+    venta y del usuario y al monto que se cobra por la cuota.
+    """
+
+    # Un tramo de cuotas: el UPDATE devuelve (RETURNING) lo que sumó a cada una
+    # y los totales salen de esas mismas filas, sin volver a leer la tabla
+    SQL_TRAMO = f'''
+        WITH atrasadas AS (
+            SELECT "idCuota",
+                   monto * %(tasa)s * (%(corte)s::date - COALESCE(mora_hasta, fecha_vencimiento)) AS incremento
+            FROM {Cuota._meta.db_table}
+            WHERE "idCuota" >= %(desde)s AND "idCuota" < %(hasta)s
+              AND NOT pagada AND fecha_vencimiento < %(corte)s
+              AND (mora_hasta IS NULL OR mora_hasta < %(corte)s)
+            ORDER BY "idCuota"
+            FOR UPDATE
+        ), tramo AS (
+            UPDATE {Cuota._meta.db_table} c
+            SET monto_mora = c.monto_mora + a.incremento,
+                mora_hasta = %(corte)s,
+                fecha_modificacion = %(ahora)s
+            FROM atrasadas a
+            WHERE c."idCuota" = a."idCuota"
+            RETURNING c.venta_id, c.usuario_id, a.incremento
+        )
+        SELECT COUNT(*), COALESCE(SUM(incremento), 0),
+               COALESCE(ARRAY_AGG(DISTINCT venta_id), '{{}}'), COALESCE(ARRAY_AGG(DISTINCT usuario_id), '{{}}')
+        FROM tramo
+    '''
+
+    @staticmethod
+    def aplicar_mora(fecha_corte=None, tasa_diaria=None, lote=10000):
+        """
+        Acumula la mora de todas las cuotas pendientes vencidas hasta `fecha_corte`
+        (hoy por defecto), recalcula la deuda de sus ventas y usuarios y
+        registra la ejecución en EjecucionMora.
+
+        Returns:
+            tuple: (ejecucion: EjecucionMora acumulada de la fecha de corte,
+                    afectadas: cuotas actualizadas en esta llamada,
+                    duracion: segundos de esta llamada)
+        """
+        inicio = time.perf_counter()
+        fecha_corte = fecha_corte or timezone.now().date()
+        tasa_diaria = settings.CUOTA_TASA_MORA_DIARIA if tasa_diaria is None else tasa_diaria
+
+        ejecucion, _ = EjecucionMora.objects.get_or_create(
+            fecha_corte=fecha_corte,
+            defaults={'tasa_diaria': tasa_diaria}
+        )
+
+        atrasadas = Cuota.objects.filter(
+            Q(mora_hasta__isnull=True) | Q(mora_hasta__lt=fecha_corte),
+            pagada=False,
+            fecha_vencimiento__lt=fecha_corte
+        )
+
+        # Rango de IDs a recorrer (una consulta sobre el índice de pendientes)
+        rango = atrasadas.aggregate(desde=Min('idCuota'), hasta=Max('idCuota'))
+        total_afectadas = 0
+
+        if rango['desde'] is not None:
+            for desde in range(rango['desde'], rango['hasta'] + 1, lote):
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute(MoraService.SQL_TRAMO, {
+                            'tasa': tasa_diaria,
+                            'corte': fecha_corte,
+                            'desde': desde,
+                            'hasta': desde + lote,
+                            'ahora': timezone.now()
+                        })
+                        afectadas, monto, ids_ventas, ids_usuarios = cursor.fetchone()
+                    total_afectadas += afectadas
+                    if afectadas:
+                        # Saldos de ventas y usuarios (y la versión de sus listados)
+                        DeudaService.recalcular_ventas(ids_ventas)
+                        DeudaService.recalcular_usuarios(ids_usuarios)
+                        EjecucionMora.objects.filter(idEjecucion=ejecucion.idEjecucion).update(
+                            cuotas_afectadas=F('cuotas_afectadas') + afectadas,
+                            monto_generado=F('monto_generado') + monto
+                        )
+
+        if total_afectadas:
+            CuotaService.invalidar_estadisticas()
+
+        duracion = time.perf_counter() - inicio
+        EjecucionMora.objects.filter(idEjecucion=ejecucion.idEjecucion).update(
+            duracion_segundos=F('duracion_segundos') + duracion,
+            fecha_fin=timezone.now()
+        )
+        ejecucion.refresh_from_db()
+        return ejecucion, total_afectadas, duracion
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from ventas.models import Cuota, MarcaProceso
+from notificaciones.services import NotificacionService
+from notificaciones.firebase_config import initialize_firebase, send_push_notification_multicast
+
+
+class RecordatorioCuotaService:
+    """
+    Recordatorios de cuotas por vencer y recién vencidas.
+
+    Cada tipo de recordatorio recorre las cuotas pendientes en orden
+    (fecha_vencimiento, idCuota) a partir de su marca de agua (MarcaProceso),
+    usando el índice parcial de cuotas pendientes. La marca avanza en la misma
+    transacción que crea las notificaciones, así una ejecución interrumpida se
+    retoma donde quedó y ninguna cuota se notifica dos veces.
+    """
+
+    TIPOS = {
+        'proximas': {
+            'titulo': 'Recordatorio de pago',
+            'mensaje': 'Tienes {cantidad} cuota(s) por ${monto:.2f} que vencen pronto: {detalle}',
+            'push': 'Tienes cuotas que vencen pronto. Revisa tus notificaciones.',
+        },
+        'vencidas': {
+            'titulo': 'Cuota vencida',
+            'mensaje': 'Tienes {cantidad} cuota(s) vencida(s) por ${monto:.2f}: {detalle}',
+            'push': 'Tienes cuotas vencidas. Revisa tus notificaciones.',
+        },
+    }
+
+    @staticmethod
+    def procesar_proximas(dias=3, lote=500):
+        """Notifica las cuotas que vencen dentro de `dias` días (o antes, si no se avisaron)"""
+        hoy = timezone.now().date()
+        return RecordatorioCuotaService._procesar('proximas', hoy + timedelta(days=dias), lote)
+
+    @staticmethod
+    def procesar_vencidas(lote=500):
+        """Notifica las cuotas que vencieron desde la última ejecución"""
+        hoy = timezone.now().date()
+        return RecordatorioCuotaService._procesar('vencidas', hoy - timedelta(days=1), lote)
+
+    @staticmethod
+    def _procesar(tipo, hasta, lote):
+        """
+        Procesa por lotes las cuotas pendientes con vencimiento posterior a la
+        marca de agua y hasta `hasta` (inclusive).
+        """
+        resumen = {'cuotas': 0, 'notificaciones': 0, 'push_enviados': 0, 'push_fallidos': 0}
+
+        push_disponible = initialize_firebase()
+
+        # La primera ejecución solo toma el último día del rango
+        MarcaProceso.objects.get_or_create(
+            nombre=f'recordatorio_cuotas_{tipo}',
+            defaults={'fecha': hasta - timedelta(days=1)}
+        )
+
+        while True:
+            with transaction.atomic():
+                # El bloqueo de la marca serializa ejecuciones simultáneas
+                marca = MarcaProceso.objects.select_for_update().get(nombre=f'recordatorio_cuotas_{tipo}')
+
+                siguiente = Q(fecha_vencimiento__gt=marca.fecha)
+                if marca.ultimo_id is not None:
+                    siguiente |= Q(fecha_vencimiento=marca.fecha, idCuota__gt=marca.ultimo_id)
+
+                cuotas = list(Cuota.objects.filter(
+                    siguiente,
+                    pagada=False,
+                    fecha_vencimiento__lte=hasta
+                ).order_by('fecha_vencimiento', 'idCuota').values(
+                    'idCuota', 'numero_cuota', 'monto', 'fecha_vencimiento', 'venta_id',
+                    'usuario_id', 'usuario__activo', 'usuario__fcmToken'
+                )[:lote])
+
+                tokens = RecordatorioCuotaService._notificar(tipo, cuotas, resumen)
+
+                # Avanzar la marca: al último registro si el lote vino lleno,
+                # o al final del rango si ya no quedan cuotas
+                if len(cuotas) == lote:
+                    marca.fecha = cuotas[-1]['fecha_vencimiento']
+                    marca.ultimo_id = cuotas[-1]['idCuota']
+                elif marca.fecha < hasta or marca.ultimo_id is not None:
+                    marca.fecha = max(marca.fecha, hasta)
+                    marca.ultimo_id = None
+                marca.save()
+
+            # Un solo envío multicast por lote, después del COMMIT
+            if tokens and push_disponible:
+                enviados, fallidos, _ = send_push_notification_multicast(
+                    fcm_tokens=tokens,
+                    title=RecordatorioCuotaService.TIPOS[tipo]['titulo'],
+                    body=RecordatorioCuotaService.TIPOS[tipo]['push'],
+                    data={'tipo': f'recordatorio_cuotas_{tipo}'}
+                )
+                resumen['push_enviados'] += enviados
+                resumen['push_fallidos'] += fallidos
+
+            if len(cuotas) < lote:
+                return resumen
+
+    @staticmethod
+    def _notificar(tipo, cuotas, resumen):
+        """
+        Crea una notificación por usuario con todas sus cuotas del lote.
+        Retorna los tokens FCM de los usuarios notificados.
+        """
+        por_usuario = defaultdict(list)
+        tokens = {}
+        for cuota in cuotas:
+            if not cuota['usuario__activo']:
+                continue
+            por_usuario[cuota['usuario_id']].append(cuota)
+            if cuota['usuario__fcmToken']:
+                tokens[cuota['usuario_id']] = cuota['usuario__fcmToken']
+
+        plantilla = RecordatorioCuotaService.TIPOS[tipo]
+        NotificacionService.crear_notificaciones_individuales([
+            (
+                id_usuario,
+                plantilla['titulo'],
+                plantilla['mensaje'].format(
+                    cantidad=len(cuotas_usuario),
+                    monto=sum(cuota['monto'] for cuota in cuotas_usuario),
+                    detalle=', '.join(
+                        f"cuota {cuota['numero_cuota']} de la venta #{cuota['venta_id']} "
+                        f"(vence {cuota['fecha_vencimiento']:%d/%m/%Y})"
+                        for cuota in cuotas_usuario
+                    )
+                )
+            )
+            for id_usuario, cuotas_usuario in por_usuario.items()
+        ])
+
+        resumen['cuotas'] += len(cuotas)
+        resumen['notificaciones'] += len(por_usuario)
+        return list(tokens.values())
@@ -0,0 +1,214 @@
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Sum, Count, Q, DateField
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+from rest_framework import status
+from si2Backend.db import upsert_incremental
+from ventas.models import Venta, DetalleVenta, ResumenVentaDiario
+from ventas.serializers import EstadisticasVentasSerializer
+from productos.models import Producto
+
+
+class ResumenVentaService:
+    """
+    Rollups diarios de ventas (tabla resumen_venta_diario).
+
+    Cada venta suma su aporte con un upsert incremental al crearse, así las
+    estadísticas se leen de pocas filas por día en lugar de recorrer todo el
+    historial de ventas.
+    """
+
+    GRANULARIDADES = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+    @staticmethod
+    def registrar_venta(venta, detalles):
+        """
+        Suma una venta recién creada a los rollups de su día.
+        Debe llamarse dentro de la transacción que crea la venta.
+        """
+        base = {
+            'fecha': timezone.localdate(venta.fecha_venta),
+            'metodoPago': venta.metodoPago_id,
+            'nrocuotas': venta.nrocuotas,
+        }
+
+        # Categoría de cada producto vendido en una sola consulta
+        categorias = dict(Producto.objects.filter(
+            idProducto__in={detalle.producto_id for detalle in detalles}
+        ).values_list('idProducto', 'categoria_id'))
+
+        por_categoria = {}
+        for detalle in detalles:
+            fila = por_categoria.setdefault(categorias[detalle.producto_id], {
+                **base,
+                'categoria': categorias[detalle.producto_id],
+                'cantidad_ventas': 1,
+                'unidades': 0,
+                'monto_total': 0.0,
+            })
+            fila['unidades'] += detalle.cantidad
+            fila['monto_total'] += detalle.subtotal
+
+        incrementos = ['cantidad_ventas', 'unidades', 'monto_total']
+        upsert_incremental(
+            ResumenVentaDiario,
+            [{**base, 'cantidad_ventas': 1, 'unidades': 0, 'monto_total': venta.total}],
+            claves=['fecha', 'metodoPago', 'nrocuotas'],
+            incrementos=incrementos,
+            condicion='"categoria_id" IS NULL'
+        )
+        upsert_incremental(
+            ResumenVentaDiario,
+            list(por_categoria.values()),
+            claves=['fecha', 'metodoPago', 'nrocuotas', 'categoria'],
+            incrementos=incrementos,
+            condicion='"categoria_id" IS NOT NULL'
+        )
+
+    @staticmethod
+    def obtener_estadisticas(params):
+        """
+        Estadísticas de ventas leídas de los rollups (solo para administrador).
+
+        Params:
+            desde, hasta (YYYY-MM-DD, opcionales): rango de fechas inclusivo
+            granularidad: 'dia' (defecto), 'semana' o 'mes' para la serie temporal
+        """
+        try:
+            serializer = EstadisticasVentasSerializer(data=params)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+
+            validated_data = serializer.validated_data
+            resumenes = ResumenVentaDiario.objects.all()
+            if validated_data.get('desde'):
+                resumenes = resumenes.filter(fecha__gte=validated_data['desde'])
+            if validated_data.get('hasta'):
+                resumenes = resumenes.filter(fecha__lte=validated_data['hasta'])
+
+            por_venta = resumenes.filter(categoria__isnull=True)
+            totales = por_venta.aggregate(
+                total_ventas=Sum('cantidad_ventas'),
+                monto_total=Sum('monto_total'),
+                ventas_contado=Sum('cantidad_ventas', filter=Q(nrocuotas=1)),
+                ventas_en_cuotas=Sum('cantidad_ventas', filter=Q(nrocuotas__gt=1)),
+            )
+            total_ventas = totales['total_ventas'] or 0
+            monto_total = totales['monto_total'] or 0
+
+            # Ventas por método de pago
+            ventas_por_metodo = por_venta.values(
+                'metodoPago__nombre'
+            ).annotate(
+                cantidad=Sum('cantidad_ventas'),
+                total_recaudado=Sum('monto_total')
+            ).order_by('-cantidad')
+
+            # Ventas por categoría de producto
+            ventas_por_categoria = resumenes.filter(categoria__isnull=False).values(
+                'categoria__nombre'
+            ).annotate(
+                cantidad_ventas=Sum('cantidad_ventas'),
+                unidades=Sum('unidades'),
+                monto_total=Sum('monto_total')
+            ).order_by('-monto_total')
+
+            # Serie temporal según la granularidad pedida
+            serie = por_venta.annotate(
+                periodo=Trunc(
+                    'fecha',
+                    ResumenVentaService.GRANULARIDADES[validated_data['granularidad']],
+                    output_field=DateField()
+                )
+            ).values('periodo').annotate(
+                cantidad=Sum('cantidad_ventas'),
+                monto_total=Sum('monto_total')
+            ).order_by('periodo')
+
+            return True, {
+                "desde": validated_data.get('desde'),
+                "hasta": validated_data.get('hasta'),
+                "granularidad": validated_data['granularidad'],
+                "total_ventas": total_ventas,
+                "monto_total": round(monto_total, 2),
+                "promedio_por_venta": round(monto_total / total_ventas, 2) if total_ventas else 0,
+                "ventas_por_metodo": list(ventas_por_metodo),
+                "ventas_contado": totales['ventas_contado'] or 0,
+                "ventas_en_cuotas": totales['ventas_en_cuotas'] or 0,
+                "ventas_por_categoria": list(ventas_por_categoria),
+                "serie": list(serie)
+            }, status.HTTP_200_OK
+
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @staticmethod
+    @transaction.atomic
+    def reconstruir(desde, hasta):
+        """
+        Recalcula desde cero los rollups de los días [desde, hasta] a partir de
+        las ventas guardadas (dos GROUP BY y un INSERT por lotes).
+        Retorna la cantidad de filas de resumen generadas.
+        """
+        ResumenVentaDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta).delete()
+
+        # Límites como instantes para que el filtro use el índice de fecha_venta
+        inicio = timezone.make_aware(datetime.combine(desde, time.min))
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+        ventas = Venta.objects.filter(
+            fecha_venta__gte=inicio, fecha_venta__lt=fin
+        ).annotate(fecha=TruncDate('fecha_venta')).values('fecha', 'metodoPago', 'nrocuotas').annotate(
+            cantidad_ventas=Count('idVenta'),
+            monto_total=Sum('total')
+        ).order_by()
+
+        detalles = DetalleVenta.objects.filter(
+            venta__fecha_venta__gte=inicio, venta__fecha_venta__lt=fin
+        ).annotate(fecha=TruncDate('venta__fecha_venta')).values('fecha', 'venta__metodoPago', 'venta__nrocuotas', 'producto__categoria').annotate(
+            cantidad_ventas=Count('venta', distinct=True),
+            unidades=Sum('cantidad'),
+            monto_total=Sum('subtotal')
+        ).order_by()
+
+        resumenes = [
+            ResumenVentaDiario(
+                fecha=fila['fecha'],
+                metodoPago_id=fila['metodoPago'],
+                nrocuotas=fila['nrocuotas'],
+                cantidad_ventas=fila['cantidad_ventas'],
+                monto_total=fila['monto_total']
+            )
+            for fila in ventas
+        ] + [
+            ResumenVentaDiario(
+                fecha=fila['fecha'],
+                metodoPago_id=fila['venta__metodoPago'],
+                nrocuotas=fila['venta__nrocuotas'],
+                categoria_id=fila['producto__categoria'],
+                cantidad_ventas=fila['cantidad_ventas'],
+                unidades=fila['unidades'],
+                monto_total=fila['monto_total']
+            )
+            for fila in detalles
+        ]
+        ResumenVentaDiario.objects.bulk_create(resumenes, batch_size=1000)
+        return len(resumenes)
+
+    @staticmethod
+    def rango_historico():
+        """Primer y último día con ventas, o (None, None) si no hay ventas"""
+        primera = Venta.objects.order_by('fecha_venta').values_list('fecha_venta', flat=True).first()
+        ultima = Venta.objects.order_by('-fecha_venta').values_list('fecha_venta', flat=True).first()
+        if primera is None:
+            return None, None
+        return timezone.localdate(primera), timezone.localdate(ultima)
+
+    @staticmethod
+    def tramos(desde, hasta, por_lote):
+        """Parte el rango [desde, hasta] en tramos de `por_lote` días"""
+        while desde <= hasta:
+            fin = min(desde + timedelta(days=por_lote - 1), hasta)
+            yield desde, fin
+            desde = fin + timedelta(days=1)
@@ -1,15 +1,23 @@
 from django.db import transaction
 from django.conf import settings
-from ventas.models import Venta, DetalleVenta, Cuota, MetodoPago
+from django.core.cache import cache
+from ventas.models import Venta, DetalleVenta, Cuota, MetodoPago, CheckoutPendiente
 from productos.models import Producto
-from ventas.serializers import VentaSerializer, CrearVentaSerializer
+from productos.services.services_inventario import InventarioService, StockInsuficienteError
+from ventas.services.service_resumen import ResumenVentaService
+from catalogo.service_ranking import RankingProductoService
+from catalogo.service_cache import CacheCatalogoService
+from ventas.services.service_cuota import CuotaService
+from ventas.services.service_deuda import DeudaService
+from ventas.serializers import VentaSerializer, CrearVentaSerializer, CotizarCarritoSerializer
 from rest_framework import status
+from integraciones import obtener_stripe, IntegracionNoDisponible
 from datetime import timedelta
 from django.utils import timezone
 import stripe
-
-# Configurar Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+import uuid
+import hashlib
+import json
 
 
 class VentaService:
@@ -23,60 +31,71 @@ class VentaService:
         12: 0.12,  # 12 cuotas: 12% anual
     }
     
+    # Tiempo extra que la reserva de stock sobrevive al checkout de Stripe,
+    # para que el webhook de un pago hecho al último momento aún la encuentre
+    MARGEN_RESERVA = timedelta(minutes=5)
+    
+    # Segundos que se guarda en cache la cotización de un carrito
+    TIEMPO_CACHE_COTIZACION = 60
+    
+    @staticmethod
+    def calcular_plan(subtotal, nrocuotas):
+        """
+        Interés, total y monto por cuota de un plan.
+        El interés es la tasa anual proporcional a los meses del plan.
+        """
+        tasa_interes = VentaService.TASAS_INTERES.get(nrocuotas, 0.0)
+        interes_calculado = subtotal * tasa_interes * (nrocuotas / 12)
+        total = subtotal + interes_calculado
+        return {
+            'tasa_interes': tasa_interes,
+            'interes': interes_calculado,
+            'total': total,
+            'monto_cuota': total / nrocuotas
+        }
+    
     @staticmethod
     def listar_ventas():
         """Lista todas las ventas (solo para administrador)"""
         try:
-            ventas = Venta.objects.all().select_related('usuario', 'metodoPago').prefetch_related(
-                'detalles__producto',
-                'cuotas'
-            )
+            ventas = Venta.objects.con_cantidad_productos().con_cuotas().select_related(
+                'usuario', 'metodoPago'
+            ).prefetch_related('detalles__producto')
             serializer = VentaSerializer(ventas, many=True)
             return True, serializer.data, status.HTTP_200_OK
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
     @staticmethod
-    def obtener_estadisticas_ventas():
-        """Obtiene estadísticas generales de ventas (solo para administrador)"""
-        try:
-            from django.db.models import Sum, Count, Avg
-            
-            total_ventas = Venta.objects.count()
-            monto_total = Venta.objects.aggregate(Sum('total'))['total__sum'] or 0
-            promedio_venta = Venta.objects.aggregate(Avg('total'))['total__avg'] or 0
-            
-            # Ventas por método de pago
-            ventas_por_metodo = Venta.objects.values(
-                'metodoPago__nombre'
-            ).annotate(
-                cantidad=Count('idVenta'),
-                total_recaudado=Sum('total')
-            ).order_by('-cantidad')
-            
-            # Ventas al contado vs cuotas
-            ventas_contado = Venta.objects.filter(nrocuotas=1).count()
-            ventas_cuotas = Venta.objects.filter(nrocuotas__gt=1).count()
-            
-            return True, {
-                "total_ventas": total_ventas,
-                "monto_total": round(monto_total, 2),
-                "promedio_por_venta": round(promedio_venta, 2),
-                "ventas_por_metodo": list(ventas_por_metodo),
-                "ventas_contado": ventas_contado,
-                "ventas_en_cuotas": ventas_cuotas
-            }, status.HTTP_200_OK
-            
-        except Exception as e:
-            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    def obtener_estadisticas_ventas(params=None):
+        """
+        Obtiene estadísticas generales de ventas (solo para administrador).
+        Se calculan sobre los rollups diarios, no sobre la tabla de ventas.
+        """
+        return ResumenVentaService.obtener_estadisticas(params or {})
+    
+    @staticmethod
+    def _despues_de_crear_venta(venta, detalles):
+        """
+        Efectos derivados de una venta nueva (rollups, resúmenes, contadores).
+        Se ejecuta dentro de la transacción que crea la venta, desde todos los
+        caminos que crean ventas.
+        """
+        ResumenVentaService.registrar_venta(venta, detalles)
+        RankingProductoService.registrar_venta(venta, detalles)
+        if venta.nrocuotas > 1:
+            DeudaService.recalcular_usuarios([venta.usuario_id])
+            CuotaService.invalidar_estadisticas()
+        else:
+            DeudaService.incrementar_version([venta.usuario_id])
     
     @staticmethod
     def listar_ventas_usuario(usuario):
         """Lista todas las ventas de un usuario"""
         try:
-            ventas = Venta.objects.filter(usuario=usuario).select_related(
-                'metodoPago'
-            ).prefetch_related('detalles__producto', 'cuotas')
+            ventas = Venta.objects.con_cantidad_productos().con_cuotas().filter(
+                usuario=usuario
+            ).select_related('metodoPago').prefetch_related('detalles__producto')
             serializer = VentaSerializer(ventas, many=True)
             return True, serializer.data, status.HTTP_200_OK
         except Exception as e:
@@ -86,10 +105,9 @@ class VentaService:
     def obtener_venta(id_venta):
         """Obtiene una venta por ID"""
         try:
-            venta = Venta.objects.select_related('usuario', 'metodoPago').prefetch_related(
-                'detalles__producto__categoria',
-                'cuotas'
-            ).get(idVenta=id_venta)
+            venta = Venta.objects.con_cantidad_productos().con_cuotas().select_related(
+                'usuario', 'metodoPago'
+            ).prefetch_related('detalles__producto__categoria').get(idVenta=id_venta)
             
             serializer = VentaSerializer(venta)
             return True, serializer.data, status.HTTP_200_OK
@@ -98,12 +116,99 @@ class VentaService:
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+    @staticmethod
+    def cotizar_carrito(data):
+        """
+        Cotiza un carrito para TODOS los planes de cuotas en una sola llamada:
+        subtotal, interés, total y monto por cuota de cada opción, más el stock
+        disponible de cada producto. No crea nada.
+        
+        Los productos se leen con una sola consulta y la cuenta de los planes se
+        hace sobre esa lectura. El resultado se guarda en cache por la versión
+        del catálogo y un hash del carrito (producto y cantidad): cualquier
+        cambio de precio, stock o reservas sube la versión, así una cotización
+        nunca muestra un stock disponible anterior al último cambio.
+        """
+        try:
+            serializer = CotizarCarritoSerializer(data=data)
+            if not serializer.is_valid():
+                return False, serializer.errors, status.HTTP_400_BAD_REQUEST
+            
+            # Cantidad total pedida por producto (un producto puede repetirse en el carrito)
+            cantidades = {}
+            for detalle_data in serializer.validated_data['detalles']:
+                cantidades[detalle_data['producto']] = (
+                    cantidades.get(detalle_data['producto'], 0) + detalle_data['cantidad']
+                )
+            clave = f'cotizacion:v{CacheCatalogoService.version()}:' + hashlib.sha256(
+                json.dumps(sorted(cantidades.items())).encode()
+            ).hexdigest()
+            
+            cotizacion = cache.get(clave)
+            if cotizacion is not None:
+                return True, cotizacion, status.HTTP_200_OK
+            
+            productos = Producto.objects.only(
+                'idProducto', 'nombre', 'precio', 'stock', 'stock_reservado'
+            ).in_bulk(list(cantidades.keys()))
+            if len(productos) != len(cantidades):
+                raise Producto.DoesNotExist()
+            
+            subtotal = 0
+            lineas = []
+            for id_producto, cantidad in cantidades.items():
+                producto = productos[id_producto]
+                disponible = max(producto.stock - producto.stock_reservado, 0)
+                subtotal += producto.precio * cantidad
+                lineas.append({
+                    'producto': id_producto,
+                    'nombre': producto.nombre,
+                    'cantidad': cantidad,
+                    'precio': producto.precio,
+                    'subtotal': round(producto.precio * cantidad, 2),
+                    'stock_disponible': disponible,
+                    'stock_suficiente': disponible >= cantidad
+                })
+            
+            planes = []
+            for nrocuotas, etiqueta in Venta.OPCIONES_CUOTAS:
+                plan = VentaService.calcular_plan(subtotal, nrocuotas)
+                planes.append({
+                    'nrocuotas': nrocuotas,
+                    'etiqueta': etiqueta,
+                    'tasa_interes': plan['tasa_interes'],
+                    'interes': round(plan['interes'], 2),
+                    'total': round(plan['total'], 2),
+                    'monto_cuota': round(plan['monto_cuota'], 2)
+                })
+            
+            cotizacion = {
+                'productos': lineas,
+                'subtotal': round(subtotal, 2),
+                'stock_suficiente': all(linea['stock_suficiente'] for linea in lineas),
+                'planes': planes
+            }
+            cache.set(clave, cotizacion, VentaService.TIEMPO_CACHE_COTIZACION)
+            return True, cotizacion, status.HTTP_200_OK
+            
+        except Producto.DoesNotExist:
+            return False, {"error": "Uno o más productos no existen"}, status.HTTP_404_NOT_FOUND
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
+    
     @staticmethod
     def crear_checkout_session_contado(data, usuario):
         """
         Genera un Stripe Checkout Session para PAGO AL CONTADO (1 cuota).
         La venta se crea DESPUÉS de que Stripe confirme el pago via webhook.
         SOLO se usa cuando nrocuotas == 1.
+        
+        El stock se reserva (con vencimiento) antes de llamar a Stripe, así dos
+        compradores no pueden pagar las mismas últimas unidades. La reserva se
+        confirma en el webhook o se libera si el checkout expira.
+        
+        El carrito validado (líneas y precios) se guarda en CheckoutPendiente y
+        no en el metadata de Stripe, que está limitado a 500 caracteres.
         """
         try:
             # Validar datos de entrada
@@ -121,19 +226,20 @@ class VentaService:
             # Obtener método de pago
             metodo_pago = MetodoPago.objects.get(idMetodoPago=validated_data['metodoPago'])
             
-            # Calcular subtotal y validar stock
+            # Leer todos los productos en una sola consulta
+            productos = Producto.objects.in_bulk(
+                [detalle_data['producto'] for detalle_data in validated_data['detalles']]
+            )
+            
+            # Calcular subtotal y armar las líneas
             subtotal = 0
             line_items = []
-            productos_metadata = []
+            lineas = []
             
             for detalle_data in validated_data['detalles']:
-                producto = Producto.objects.get(idProducto=detalle_data['producto'])
-                
-                # Verificar stock
-                if producto.stock < detalle_data['cantidad']:
-                    return False, {
-                        "error": f"Stock insuficiente para {producto.nombre}. Disponible: {producto.stock}"
-                    }, status.HTTP_400_BAD_REQUEST
+                producto = productos.get(detalle_data['producto'])
+                if producto is None:
+                    raise Producto.DoesNotExist()
                 
                 subtotal_producto = producto.precio * detalle_data['cantidad']
                 subtotal += subtotal_producto
@@ -151,8 +257,8 @@ class VentaService:
                     'quantity': detalle_data['cantidad'],
                 })
                 
-                # Guardar info del producto para metadata
-                productos_metadata.append({
+                # Línea validada que se guarda en el checkout pendiente
+                lineas.append({
                     'producto_id': producto.idProducto,
                     'cantidad': detalle_data['cantidad'],
                     'precio': float(producto.precio)
@@ -160,24 +266,45 @@ class VentaService:
             
             total = subtotal  # Sin interés para pago al contado
             
+            # Reservar el stock hasta que el checkout expire (no se retienen bloqueos)
+            referencia = uuid.uuid4().hex
+            expira_checkout = timezone.now() + timedelta(minutes=settings.RESERVA_STOCK_MINUTOS)
+            InventarioService.reservar_stock(
+                [(linea['producto_id'], linea['cantidad']) for linea in lineas],
+                referencia,
+                expira_checkout + VentaService.MARGEN_RESERVA
+            )
+            
             # Crear Stripe Checkout Session
-            import json
-            checkout_session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=line_items,
-                mode='payment',
-                success_url=f"{settings.FRONTEND_URL}/ventas/exito?session_id={{CHECKOUT_SESSION_ID}}",
-                cancel_url=f"{settings.FRONTEND_URL}/ventas/cancelado",
-                metadata={
-                    'tipo': 'venta_contado',
-                    'usuario_id': usuario.idUsuario,
-                    'metodo_pago_id': metodo_pago.idMetodoPago,
-                    'nrocuotas': 1,
-                    'subtotal': str(subtotal),
-                    'interes': '0.0',
-                    'total': str(total),
-                    'productos': json.dumps(productos_metadata)
-                }
+            try:
+                checkout_session = obtener_stripe().crear_checkout_session(
+                    idempotency_key=f'venta-contado-{referencia}',
+                    payment_method_types=['card'],
+                    line_items=line_items,
+                    mode='payment',
+                    client_reference_id=referencia,
+                    expires_at=int(expira_checkout.timestamp()),
+                    success_url=f"{settings.FRONTEND_URL}/ventas/exito?session_id={{CHECKOUT_SESSION_ID}}",
+                    cancel_url=f"{settings.FRONTEND_URL}/ventas/cancelado",
+                    metadata={
+                        'tipo': 'venta_contado',
+                        'usuario_id': usuario.idUsuario
+                    }
+                )
+            except Exception:
+                InventarioService.liberar_reserva(referencia)
+                raise
+            
+            # Guardar el carrito validado; el webhook arma la venta a partir de él
+            CheckoutPendiente.objects.create(
+                stripe_checkout_session_id=checkout_session.id,
+                referencia=referencia,
+                usuario=usuario,
+                metodoPago=metodo_pago,
+                subtotal=subtotal,
+                total=total,
+                lineas=lineas,
+                expira=expira_checkout + VentaService.MARGEN_RESERVA
             )
             
             return True, {
@@ -188,6 +315,7 @@ class VentaService:
                 "subtotal": round(subtotal, 2),
                 "interes": 0.0,
                 "nrocuotas": 1,
+                "reserva_expira": expira_checkout,
                 "nota": "Complete el pago para confirmar su compra"
             }, status.HTTP_200_OK
             
@@ -195,18 +323,29 @@ class VentaService:
             return False, {"error": "Método de pago no encontrado"}, status.HTTP_404_NOT_FOUND
         except Producto.DoesNotExist:
             return False, {"error": "Uno o más productos no existen"}, status.HTTP_404_NOT_FOUND
-        except stripe.error.StripeError as e:
+        except StockInsuficienteError as e:
+            return False, {"error": str(e)}, status.HTTP_400_BAD_REQUEST
+        except IntegracionNoDisponible as e:
+            return False, {"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE
+        except stripe.StripeError as e:
             return False, {"error": f"Error de Stripe: {str(e)}"}, status.HTTP_500_INTERNAL_SERVER_ERROR
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
     @staticmethod
-    @transaction.atomic
     def crear_venta_con_cuotas(data, usuario):
         """
         Crea una venta CON CUOTAS (3, 6 o 12 cuotas) INMEDIATAMENTE.
         La venta se registra en la BD sin esperar pago de Stripe.
         Las cuotas se pagan posteriormente de forma individual.
+        
+        Los productos se leen una sola vez dentro de la transacción con
+        SELECT ... FOR UPDATE en orden de idProducto (el mismo orden que los
+        UPDATE de stock, así dos ventas no se bloquean en cruz): precios, stock
+        y totales salen de esa foto, que nadie puede cambiar hasta el COMMIT.
+        Después van bulk_create de detalles y cuotas y un único UPDATE
+        condicional de stock (InventarioService). La serialización de la
+        respuesta se hace fuera de la transacción.
         """
         try:
             # Validar datos de entrada
@@ -224,82 +363,96 @@ class VentaService:
             # Obtener método de pago
             metodo_pago = MetodoPago.objects.get(idMetodoPago=validated_data['metodoPago'])
             
-            # Calcular subtotal de los productos
-            subtotal = 0
-            productos_validados = []
-            
+            # Cantidad total pedida por producto (un producto puede repetirse en el carrito)
+            cantidades = {}
             for detalle_data in validated_data['detalles']:
-                producto = Producto.objects.select_for_update().get(
-                    idProducto=detalle_data['producto']
+                cantidades[detalle_data['producto']] = (
+                    cantidades.get(detalle_data['producto'], 0) + detalle_data['cantidad']
                 )
+            
+            with transaction.atomic():
+                # Leer y bloquear todos los productos en una sola consulta
+                productos = {
+                    producto.idProducto: producto
+                    for producto in Producto.objects.select_for_update().filter(
+                        idProducto__in=list(cantidades.keys())
+                    ).order_by('idProducto')
+                }
+                if len(productos) != len(cantidades):
+                    raise Producto.DoesNotExist()
                 
-                # Verificar stock
-                if producto.stock < detalle_data['cantidad']:
-                    return False, {
-                        "error": f"Stock insuficiente para {producto.nombre}. Disponible: {producto.stock}"
-                    }, status.HTTP_400_BAD_REQUEST
+                for id_producto, cantidad in cantidades.items():
+                    producto = productos[id_producto]
+                    if producto.stock - producto.stock_reservado < cantidad:
+                        raise StockInsuficienteError(producto, cantidad)
                 
-                subtotal_producto = producto.precio * detalle_data['cantidad']
-                subtotal += subtotal_producto
+                # Calcular subtotal de los productos
+                subtotal = 0
+                detalles = []
                 
-                productos_validados.append({
-                    'producto': producto,
-                    'cantidad': detalle_data['cantidad'],
-                    'precio': producto.precio,
-                    'subtotal': subtotal_producto
-                })
-            
-            # Calcular interés según número de cuotas
-            tasa_interes = VentaService.TASAS_INTERES.get(nrocuotas, 0.0)
-            interes_calculado = subtotal * tasa_interes * (nrocuotas / 12)
-            total = subtotal + interes_calculado
-            
-            # Crear la venta
-            venta = Venta.objects.create(
-                usuario=usuario,
-                metodoPago=metodo_pago,
-                subtotal=subtotal,
-                interes=tasa_interes,
-                total=total,
-                nrocuotas=nrocuotas
-            )
-            
-            # Crear detalles de venta y actualizar stock
-            for producto_data in productos_validados:
-                DetalleVenta.objects.create(
-                    venta=venta,
-                    producto=producto_data['producto'],
-                    cantidad=producto_data['cantidad'],
-                    precio=producto_data['precio'],
-                    subtotal=producto_data['subtotal']
-                )
+                for detalle_data in validated_data['detalles']:
+                    producto = productos[detalle_data['producto']]
+                    subtotal_producto = producto.precio * detalle_data['cantidad']
+                    subtotal += subtotal_producto
+                    
+                    detalles.append(DetalleVenta(
+                        producto=producto,
+                        cantidad=detalle_data['cantidad'],
+                        precio=producto.precio,
+                        subtotal=subtotal_producto
+                    ))
                 
-                # Actualizar stock del producto
-                producto_data['producto'].stock -= producto_data['cantidad']
-                producto_data['producto'].save()
-            
-            # Generar cuotas
-            monto_cuota = total / nrocuotas
-            fecha_vencimiento = timezone.now().date()
-            
-            for i in range(1, nrocuotas + 1):
-                # Vencimiento cada 30 días
-                fecha_vencimiento = fecha_vencimiento + timedelta(days=30)
+                # Calcular interés según número de cuotas
+                plan = VentaService.calcular_plan(subtotal, nrocuotas)
+                tasa_interes = plan['tasa_interes']
+                total = plan['total']
+                monto_cuota = plan['monto_cuota']
+                hoy = timezone.now().date()
                 
-                Cuota.objects.create(
-                    venta=venta,
-                    numero_cuota=i,
-                    monto=round(monto_cuota, 2),
-                    fecha_vencimiento=fecha_vencimiento,
-                    pagada=False
+                # Crear la venta con su saldo inicial (todas las cuotas pendientes)
+                venta = Venta.objects.create(
+                    usuario=usuario,
+                    metodoPago=metodo_pago,
+                    subtotal=subtotal,
+                    interes=tasa_interes,
+                    total=total,
+                    nrocuotas=nrocuotas,
+                    saldo_pendiente=round(monto_cuota, 2) * nrocuotas,
+                    proxima_fecha_vencimiento=hoy + timedelta(days=30)
                 )
+                
+                # Crear detalles de venta en un solo INSERT
+                for detalle in detalles:
+                    detalle.venta = venta
+                DetalleVenta.objects.bulk_create(detalles)
+                
+                # Generar cuotas (vencimiento cada 30 días) en un solo INSERT
+                Cuota.objects.bulk_create([
+                    Cuota(
+                        venta=venta,
+                        usuario=usuario,
+                        numero_cuota=i,
+                        monto=round(monto_cuota, 2),
+                        fecha_vencimiento=hoy + timedelta(days=30 * i),
+                        pagada=False
+                    )
+                    for i in range(1, nrocuotas + 1)
+                ])
+                
+                # Descontar stock de todos los productos con un solo UPDATE condicional
+                InventarioService.descontar_stock(cantidades)
+                
+                VentaService._despues_de_crear_venta(venta, detalles)
             
-            # Retornar venta creada
+            # Retornar venta creada (fuera de la transacción)
+            venta = Venta.objects.con_cantidad_productos().con_cuotas().select_related(
+                'metodoPago'
+            ).prefetch_related('detalles__producto').get(idVenta=venta.idVenta)
             venta_serializada = VentaSerializer(venta)
             return True, {
                 "mensaje": "Venta con cuotas creada exitosamente",
                 "venta": venta_serializada.data,
-                "productos_comprados": len(productos_validados),
+                "productos_comprados": len(detalles),
                 "cuotas_generadas": nrocuotas,
                 "monto_por_cuota": round(monto_cuota, 2),
                 "nota": "Ahora puede pagar cada cuota individualmente usando los endpoints de pago"
@@ -309,68 +462,71 @@ class VentaService:
             return False, {"error": "Método de pago no encontrado"}, status.HTTP_404_NOT_FOUND
         except Producto.DoesNotExist:
             return False, {"error": "Uno o más productos no existen"}, status.HTTP_404_NOT_FOUND
+        except StockInsuficienteError as e:
+            return False, {"error": str(e)}, status.HTTP_400_BAD_REQUEST
         except Exception as e:
             return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
     
     @staticmethod
-    @transaction.atomic
     def crear_venta_desde_webhook(session_data):
         """
         Crea la venta AL CONTADO después de que Stripe confirme el pago exitoso.
         Llamado desde el webhook de Stripe.
         SOLO para ventas de 1 cuota (pago al contado).
+        
+        La venta se arma desde el CheckoutPendiente guardado al crear la sesión
+        (una sola lectura, sin volver a consultar los productos). Si el checkout
+        todavía no está guardado retorna False y el worker reintenta el evento.
+        Si ya no hay stock (la reserva expiró y se vendió) no se reintenta: el
+        pago se reembolsa y retorna (True, None).
         """
         try:
-            metadata = session_data['metadata']
-            
-            # Extraer datos del metadata
-            usuario_id = int(metadata['usuario_id'])
-            metodo_pago_id = int(metadata['metodo_pago_id'])
-            nrocuotas = int(metadata['nrocuotas'])  # Debe ser 1
-            subtotal = float(metadata['subtotal'])
-            interes_calculado = float(metadata['interes'])  # Debe ser 0.0
-            total = float(metadata['total'])
-            
-            import json
-            productos_data = json.loads(metadata['productos'])
-            
-            # Obtener usuario y método de pago
-            from usuarios.models import Usuario
-            usuario = Usuario.objects.get(idUsuario=usuario_id)
-            metodo_pago = MetodoPago.objects.get(idMetodoPago=metodo_pago_id)
-            
-            # Crear la venta al contado
-            venta = Venta.objects.create(
-                usuario=usuario,
-                metodoPago=metodo_pago,
-                subtotal=subtotal,
-                interes=0.0,  # Sin interés para pago al contado
-                total=total,
-                nrocuotas=1,
-                stripe_checkout_session_id=session_data['id']
-            )
-            
-            # Crear detalles de venta y actualizar stock
-            for producto_info in productos_data:
-                producto = Producto.objects.select_for_update().get(
-                    idProducto=producto_info['producto_id']
+            with transaction.atomic():
+                checkout = CheckoutPendiente.objects.select_for_update().get(
+                    stripe_checkout_session_id=session_data['id']
                 )
                 
-                cantidad = producto_info['cantidad']
-                precio = producto_info['precio']
-                subtotal_producto = precio * cantidad
+                # Ya procesado por otro worker: no duplicar la venta
+                if checkout.estado == 'completado':
+                    return True, Venta.objects.get(stripe_checkout_session_id=session_data['id'])
+                if checkout.estado in ('pagado_sin_stock', 'reembolsado'):
+                    return True, None
                 
-                DetalleVenta.objects.create(
-                    venta=venta,
-                    producto=producto,
-                    cantidad=cantidad,
-                    precio=precio,
-                    subtotal=subtotal_producto
+                # Crear la venta al contado
+                venta = Venta.objects.create(
+                    usuario_id=checkout.usuario_id,
+                    metodoPago_id=checkout.metodoPago_id,
+                    subtotal=checkout.subtotal,
+                    interes=0.0,  # Sin interés para pago al contado
+                    total=checkout.total,
+                    nrocuotas=1,
+                    stripe_checkout_session_id=checkout.stripe_checkout_session_id
                 )
                 
-                # Actualizar stock
-                producto.stock -= cantidad
-                producto.save()
+                # Crear detalles de venta en un solo INSERT
+                detalles = DetalleVenta.objects.bulk_create([
+                    DetalleVenta(
+                        venta=venta,
+                        producto_id=linea['producto_id'],
+                        cantidad=linea['cantidad'],
+                        precio=linea['precio'],
+                        subtotal=linea['precio'] * linea['cantidad']
+                    )
+                    for linea in checkout.lineas
+                ])
+                
+                # Consumir la reserva hecha al crear el checkout; si ya expiró y
+                # fue liberada, descontar con un UPDATE condicional (todo o nada)
+                if not InventarioService.confirmar_reserva(checkout.referencia):
+                    InventarioService.descontar_stock(
+                        (linea['producto_id'], linea['cantidad'])
+                        for linea in checkout.lineas
+                    )
+                
+                checkout.estado = 'completado'
+                checkout.save(update_fields=['estado', 'fecha_modificacion'])
+                
+                VentaService._despues_de_crear_venta(venta, detalles)
             
             # NO generar cuotas para pago al contado
             # La venta queda completamente pagada
@@ -378,6 +534,82 @@ class VentaService:
             print(f"✅ Venta al contado {venta.idVenta} creada y pagada exitosamente desde webhook")
             return True, venta
             
+        except CheckoutPendiente.DoesNotExist:
+            print(f"⏳ Checkout {session_data['id']} aún no registrado, se reintentará")
+            return False, None
+        except StockInsuficienteError as e:
+            # Reintentar no devuelve el stock: reembolsar en lugar de agotar los intentos
+            print(f"⚠️ Checkout {session_data['id']} pagado sin stock suficiente: {str(e)}")
+            return VentaService._reembolsar_checkout_sin_stock(session_data), None
         except Exception as e:
             print(f"❌ Error creando venta al contado desde webhook: {str(e)}")
             return False, None
+    
+    @staticmethod
+    def _reembolsar_checkout_sin_stock(session_data):
+        """
+        Marca el checkout como 'pagado_sin_stock', libera lo que quede de su
+        reserva y reembolsa el pago completo. Si Stripe no responde el checkout
+        queda en 'pagado_sin_stock' para que el administrador lo resuelva.
+        Retorna False solo si no se pudo guardar el estado (el evento se reintenta).
+        """
+        try:
+            with transaction.atomic():
+                checkout = CheckoutPendiente.objects.select_for_update().get(
+                    stripe_checkout_session_id=session_data['id']
+                )
+                if checkout.estado in ('completado', 'reembolsado'):
+                    return True
+                checkout.estado = 'pagado_sin_stock'
+                checkout.save(update_fields=['estado', 'fecha_modificacion'])
+                InventarioService.liberar_reserva(checkout.referencia)
+        except Exception as e:
+            print(f"❌ Error registrando el checkout {session_data['id']} sin stock: {str(e)}")
+            return False
+        
+        try:
+            payment_intent = session_data.get('payment_intent') or \
+                obtener_stripe().obtener_checkout_session(session_data['id']).payment_intent
+            if not payment_intent:
+                raise ValueError("la sesión no tiene Payment Intent")
+            reembolso = obtener_stripe().crear_reembolso(
+                payment_intent=payment_intent,
+                reason='requested_by_customer',
+                metadata={'checkout_id': str(checkout.idCheckout), 'motivo': 'sin_stock'},
+                # Repetir el evento no reembolsa dos veces
+                idempotency_key=f'reembolso-{checkout.stripe_checkout_session_id}'
+            )
+        except Exception as e:
+            print(f"❌ No se pudo reembolsar el checkout {checkout.stripe_checkout_session_id}, queda para revisión: {str(e)}")
+            return True
+        
+        CheckoutPendiente.objects.filter(
+            idCheckout=checkout.idCheckout, estado='pagado_sin_stock'
+        ).update(estado='reembolsado', fecha_modificacion=timezone.now())
+        print(f"💸 Checkout {checkout.stripe_checkout_session_id} reembolsado ({reembolso.id})")
+        return True
+    
+    @staticmethod
+    def expirar_checkouts_pendientes(lote=500):
+        """
+        Marca como expirados los checkouts pendientes vencidos y libera sus
+        reservas de stock, de a `lote` por transacción.
+        Retorna la cantidad de checkouts expirados.
+        """
+        total = 0
+        while True:
+            with transaction.atomic():
+                checkouts = list(
+                    CheckoutPendiente.objects.select_for_update(skip_locked=True).filter(
+                        estado='pendiente',
+                        expira__lte=timezone.now()
+                    ).order_by('expira').values_list('idCheckout', 'referencia')[:lote]
+                )
+                if checkouts:
+                    CheckoutPendiente.objects.filter(
+                        idCheckout__in=[id_checkout for id_checkout, _ in checkouts]
+                    ).update(estado='expirado', fecha_modificacion=timezone.now())
+                    InventarioService.liberar_reservas([referencia for _, referencia in checkouts])
+            total += len(checkouts)
+            if len(checkouts) < lote:
+                return total
@@ -0,0 +1,257 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Min, Q, F, Case, When
+from django.utils import timezone
+from rest_framework import status
+from ventas.models import EventoStripe, Venta, CheckoutPendiente, PagoDuplicado
+from ventas.services.service_venta import VentaService
+from ventas.services.service_cuota import CuotaService
+from productos.services.services_inventario import InventarioService
+
+
+class WebhookService:
+    """
+    Bandeja de entrada de eventos de Stripe.
+
+    El webhook HTTP solo verifica la firma y guarda el evento (deduplicado por
+    su ID de Stripe); los workers (comando procesar_eventos_stripe) reclaman
+    los eventos pendientes por lotes y aplican la lógica de negocio con
+    actualizaciones idempotentes.
+    """
+
+    # Reintentos antes de dejar un evento en estado 'error' para revisión manual
+    MAX_INTENTOS = 5
+
+    # Espera antes de reintentar un evento con error: se duplica en cada intento
+    # (30 s, 1 min, 2 min, 4 min...) hasta ESPERA_MAXIMA
+    ESPERA_BASE = timedelta(seconds=30)
+    ESPERA_MAXIMA = timedelta(hours=1)
+
+    # Un evento 'procesando' más antiguo que esto se considera abandonado (worker caído)
+    TIEMPO_RECLAMO = timedelta(minutes=5)
+
+    @staticmethod
+    def espera_reintento(intentos):
+        """Cuánto esperar antes de reintentar un evento que ya falló `intentos` veces"""
+        return min(WebhookService.ESPERA_BASE * 2 ** (intentos - 1), WebhookService.ESPERA_MAXIMA)
+
+    @staticmethod
+    def registrar_evento(event_id, tipo, payload):
+        """
+        Guarda un evento en la bandeja con un único INSERT ... ON CONFLICT DO NOTHING,
+        de modo que los reintentos de Stripe de un mismo evento se ignoran.
+        """
+        EventoStripe.objects.bulk_create(
+            [EventoStripe(stripe_event_id=event_id, tipo=tipo, payload=payload)],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def registrar_eventos(eventos):
+        """Guarda varios eventos de Stripe (dicts completos) en un solo INSERT ... ON CONFLICT DO NOTHING"""
+        EventoStripe.objects.bulk_create(
+            [
+                EventoStripe(stripe_event_id=evento['id'], tipo=evento['type'], payload=evento)
+                for evento in eventos
+            ],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def reclamar_eventos_por_id(event_ids, reaplicar=False):
+        """
+        Toma para procesar los eventos indicados que no estén ya aplicados
+        (con `reaplicar`, también los procesados). Los que otro worker tiene
+        bloqueados o en proceso se saltan.
+        """
+        estados = ['pendiente', 'error'] + (['procesado'] if reaplicar else [])
+        with transaction.atomic():
+            eventos = list(
+                EventoStripe.objects.select_for_update(skip_locked=True).filter(
+                    stripe_event_id__in=event_ids,
+                    estado__in=estados
+                )
+            )
+            if eventos:
+                EventoStripe.objects.filter(idEvento__in=[e.idEvento for e in eventos]).update(
+                    estado='procesando',
+                    fecha_reclamo=timezone.now()
+                )
+        return eventos
+
+    @staticmethod
+    def reclamar_eventos(lote=50):
+        """
+        Toma hasta `lote` eventos pendientes, con error cuya espera ya pasó o
+        abandonados para procesarlos. Usa SKIP LOCKED para que varios workers
+        no tomen el mismo evento.
+
+        Un evento abandonado cuenta como intento fallido (el worker se cayó
+        procesándolo); al llegar a MAX_INTENTOS queda en 'error' y no se
+        vuelve a tomar.
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            eventos = list(
+                EventoStripe.objects.select_for_update(skip_locked=True).filter(
+                    Q(estado='pendiente') |
+                    Q(estado='error', intentos__lt=WebhookService.MAX_INTENTOS) & (
+                        Q(proximo_intento__isnull=True) | Q(proximo_intento__lte=ahora)
+                    ) |
+                    Q(estado='procesando', fecha_reclamo__lt=ahora - WebhookService.TIEMPO_RECLAMO)
+                ).order_by('fecha_recepcion')[:lote]
+            )
+            
+            agotados = [
+                e.idEvento for e in eventos
+                if e.estado == 'procesando' and e.intentos + 1 >= WebhookService.MAX_INTENTOS
+            ]
+            if agotados:
+                EventoStripe.objects.filter(idEvento__in=agotados).update(
+                    estado='error',
+                    intentos=F('intentos') + 1,
+                    error='Abandonado por el worker en cada intento',
+                    proximo_intento=None
+                )
+                print(f"⚠️ {len(agotados)} evento(s) abandonados {WebhookService.MAX_INTENTOS} veces, quedan en error")
+            
+            eventos = [e for e in eventos if e.idEvento not in agotados]
+            if eventos:
+                # Un solo UPDATE; el estado del CASE es el anterior al reclamo
+                EventoStripe.objects.filter(idEvento__in=[e.idEvento for e in eventos]).update(
+                    estado='procesando',
+                    fecha_reclamo=ahora,
+                    intentos=Case(When(estado='procesando', then=F('intentos') + 1), default=F('intentos'))
+                )
+                for evento in eventos:
+                    if evento.estado == 'procesando':
+                        evento.intentos += 1
+        return eventos
+
+    @staticmethod
+    def procesar_evento(evento):
+        """
+        Aplica un evento y registra el resultado en la bandeja.
+        Retorna True si se procesó correctamente.
+        """
+        try:
+            WebhookService.aplicar_evento(evento.tipo, evento.payload['data']['object'])
+        except Exception as e:
+            EventoStripe.objects.filter(idEvento=evento.idEvento).update(
+                estado='error',
+                intentos=evento.intentos + 1,
+                error=str(e),
+                proximo_intento=timezone.now() + WebhookService.espera_reintento(evento.intentos + 1)
+            )
+            print(f"❌ Error procesando evento {evento.stripe_event_id}: {str(e)}")
+            return False
+
+        EventoStripe.objects.filter(idEvento=evento.idEvento).update(
+            estado='procesado',
+            intentos=evento.intentos + 1,
+            error=None,
+            proximo_intento=None,
+            fecha_procesado=timezone.now()
+        )
+        return True
+
+    @staticmethod
+    def aplicar_evento(tipo, objeto):
+        """
+        Lógica de negocio de cada tipo de evento. Todas las operaciones son
+        idempotentes: aplicar dos veces el mismo evento no duplica efectos.
+        Lanza una excepción si el evento no pudo aplicarse (se reintentará).
+        """
+        metadata = objeto.get('metadata') or {}
+
+        # ==================== PAYMENT INTENT (FLUTTER) ====================
+        if tipo == 'payment_intent.succeeded':
+            ids_cuotas = CuotaService.ids_cuotas_pagadas(metadata)
+            if ids_cuotas:
+                liquidadas = CuotaService.liquidar_cuotas(ids_cuotas, stripe_payment_intent_id=objeto['id'])
+                WebhookService._informar_liquidacion(ids_cuotas, liquidadas, 'Payment Intent')
+                CuotaService.reembolsar_duplicados(ids_cuotas, objeto['id'])
+
+        # ==================== CHECKOUT SESSION (WEB) ====================
+        elif tipo == 'checkout.session.completed':
+            # Si es VENTA AL CONTADO (1 cuota), crear la venta
+            if metadata.get('tipo') == 'venta_contado':
+                if Venta.objects.filter(stripe_checkout_session_id=objeto['id']).exists():
+                    return
+                success, venta = VentaService.crear_venta_desde_webhook(objeto)
+                if not success:
+                    raise RuntimeError(f"No se pudo crear la venta del checkout {objeto['id']}")
+
+            # Si es pago de una o VARIAS CUOTAS, marcarlas como pagadas
+            else:
+                ids_cuotas = CuotaService.ids_cuotas_pagadas(metadata)
+                if ids_cuotas:
+                    liquidadas = CuotaService.liquidar_cuotas(
+                        ids_cuotas,
+                        stripe_payment_intent_id=objeto.get('payment_intent'),
+                        stripe_checkout_session_id=objeto['id']
+                    )
+                    WebhookService._informar_liquidacion(ids_cuotas, liquidadas, 'Checkout Session')
+                    CuotaService.reembolsar_duplicados(ids_cuotas, objeto.get('payment_intent'), objeto['id'])
+
+        # ==================== CHECKOUT SESSION EXPIRADA ====================
+        elif tipo == 'checkout.session.expired':
+            CheckoutPendiente.objects.filter(
+                stripe_checkout_session_id=objeto['id'],
+                estado='pendiente'
+            ).update(estado='expirado', fecha_modificacion=timezone.now())
+            
+            referencia = objeto.get('client_reference_id')
+            if referencia:
+                liberadas = InventarioService.liberar_reserva(referencia)
+                print(f"♻️ Checkout {objeto['id']} expirado: {liberadas} reservas liberadas")
+
+        # ==================== PAYMENT INTENT FAILED ====================
+        elif tipo == 'payment_intent.payment_failed':
+            ids_cuotas = CuotaService.ids_cuotas_pagadas(metadata)
+            if ids_cuotas:
+                print(f"❌ Pago fallido para cuota(s) {', '.join(ids_cuotas)}")
+                # Aquí podrías enviar una notificación al usuario
+
+    @staticmethod
+    def _informar_liquidacion(ids_cuotas, liquidadas, origen):
+        if liquidadas:
+            print(f"✅ {liquidadas} cuota(s) pagada(s) exitosamente ({origen}): {', '.join(ids_cuotas)}")
+
+    @staticmethod
+    def obtener_estadisticas():
+        """Lag y throughput de la bandeja de eventos (solo para administrador)"""
+        try:
+            ahora = timezone.now()
+
+            # Ambas consultas recorren solo filas abiertas o recientes (índices
+            # por estado y por fecha_procesado), no el historial completo
+            resumen = EventoStripe.objects.filter(
+                estado__in=['pendiente', 'procesando', 'error']
+            ).aggregate(
+                pendientes=Count('idEvento', filter=Q(estado__in=['pendiente', 'procesando'])),
+                con_error=Count('idEvento', filter=Q(estado='error')),
+                mas_antiguo_pendiente=Min(
+                    'fecha_recepcion', filter=Q(estado__in=['pendiente', 'procesando'])
+                ),
+            )
+            resumen.update(EventoStripe.objects.filter(
+                fecha_procesado__gte=ahora - timedelta(hours=1)
+            ).aggregate(
+                procesados_ultimo_minuto=Count(
+                    'idEvento', filter=Q(fecha_procesado__gte=ahora - timedelta(minutes=1))
+                ),
+                procesados_ultima_hora=Count('idEvento'),
+            ))
+
+            mas_antiguo = resumen.pop('mas_antiguo_pendiente')
+            resumen['lag_segundos'] = round((ahora - mas_antiguo).total_seconds(), 1) if mas_antiguo else 0.0
+            resumen['throughput_por_segundo'] = round(resumen['procesados_ultimo_minuto'] / 60, 2)
+            # Pagos al contado sin stock cuyo reembolso automático falló
+            resumen['checkouts_sin_stock'] = CheckoutPendiente.objects.filter(estado='pagado_sin_stock').count()
+            # Cuotas cobradas dos veces cuyo reembolso automático falló
+            resumen['pagos_duplicados_pendientes'] = PagoDuplicado.objects.filter(estado='pendiente').count()
+
+            return True, resumen, status.HTTP_200_OK
+        except Exception as e:
+            return False, {"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1,3 +1,231 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from integraciones import obtener_stripe, proveedores
+from productos.models import Categoria, Producto, ReservaStock
+from usuarios.models import Rol, Usuario
+from ventas.models import Venta, DetalleVenta, Cuota, MetodoPago, CheckoutPendiente, EventoStripe, PagoDuplicado
+from ventas.services.service_conciliacion import ConciliacionService
+from ventas.services.service_cuota import CuotaService
+from ventas.services.service_mora import MoraService
+from ventas.services.service_venta import VentaService
+from ventas.services.service_webhook import WebhookService
 
-# Create your tests here.
+
+@override_settings(INTEGRACIONES_FALSAS=['stripe'])
+class VentasTestCase(TestCase):
+    """Usuario, dos productos y Stripe local (StripeFalso) para cada prueba"""
+
+    def setUp(self):
+        proveedores.reiniciar()
+        self.addCleanup(proveedores.reiniciar)
+
+        rol, _ = Rol.objects.get_or_create(nombre='Cliente')
+        self.usuario = Usuario.objects.create(username='cliente', email='cliente@test.com', password='!', rol=rol)
+        categoria = Categoria.objects.create(nombre='Cámaras')
+        self.camara = Producto.objects.create(nombre='Cámara', precio=100, stock=5, categoria=categoria)
+        self.lente = Producto.objects.create(nombre='Lente', precio=50, stock=2, categoria=categoria)
+        self.metodo_pago = MetodoPago.objects.first()
+
+    def datos_venta(self, nrocuotas, *lineas):
+        return {
+            'metodoPago': self.metodo_pago.idMetodoPago,
+            'nrocuotas': nrocuotas,
+            'detalles': [{'producto': producto.idProducto, 'cantidad': cantidad} for producto, cantidad in lineas]
+        }
+
+    def crear_checkout(self, *lineas):
+        success, data, _ = VentaService.crear_checkout_session_contado(self.datos_venta(1, *lineas), self.usuario)
+        self.assertTrue(success, data)
+        return data['session_id']
+
+    def evento_pagado(self, session_id, event_id):
+        """checkout.session.completed tal como lo envía Stripe"""
+        sesion = dict(obtener_stripe().objetos[session_id], status='complete', payment_status='paid')
+        return {'id': event_id, 'type': 'checkout.session.completed', 'data': {'object': sesion}}
+
+    def stock(self, producto):
+        producto.refresh_from_db()
+        return producto.stock, producto.stock_reservado
+
+
+class CrearVentaTests(VentasTestCase):
+
+    def test_faltante_parcial_no_crea_la_venta_ni_descuenta_stock(self):
+        success, data, status_code = VentaService.crear_venta_con_cuotas(
+            self.datos_venta(3, (self.camara, 2), (self.lente, 3)), self.usuario
+        )
+
+        self.assertFalse(success)
+        self.assertEqual(status_code, 400)
+        self.assertIn('Lente', data['error'])
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertFalse(Cuota.objects.exists())
+        self.assertEqual(self.stock(self.camara), (5, 0))
+        self.assertEqual(self.stock(self.lente), (2, 0))
+
+
+class WebhookTests(VentasTestCase):
+
+    def test_mismo_evento_dos_veces_crea_una_sola_venta(self):
+        session_id = self.crear_checkout((self.camara, 2), (self.lente, 1))
+        evento = self.evento_pagado(session_id, 'evt_pagado')
+
+        # Stripe reintenta el envío: la bandeja lo guarda una sola vez
+        WebhookService.registrar_eventos([evento])
+        WebhookService.registrar_eventos([evento])
+        self.assertEqual(EventoStripe.objects.count(), 1)
+
+        for evento_guardado in WebhookService.reclamar_eventos():
+            self.assertTrue(WebhookService.procesar_evento(evento_guardado))
+        # Reaplicarlo (reproceso manual) tampoco duplica la venta ni el descuento
+        for evento_guardado in WebhookService.reclamar_eventos_por_id(['evt_pagado'], reaplicar=True):
+            self.assertTrue(WebhookService.procesar_evento(evento_guardado))
+
+        venta = Venta.objects.get(stripe_checkout_session_id=session_id)
+        self.assertEqual(venta.total, 250)
+        self.assertEqual(venta.detalles.count(), 2)
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertEqual(self.stock(self.camara), (3, 0))
+        self.assertEqual(self.stock(self.lente), (1, 0))
+        self.assertFalse(ReservaStock.objects.exists())
+        self.assertEqual(CheckoutPendiente.objects.get().estado, 'completado')
+
+    def test_checkout_expirado_libera_la_reserva(self):
+        session_id = self.crear_checkout((self.lente, 2))
+        self.assertEqual(self.stock(self.lente), (2, 2))
+
+        CheckoutPendiente.objects.update(expira=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(VentaService.expirar_checkouts_pendientes(), 1)
+
+        self.assertEqual(self.stock(self.lente), (2, 0))
+        self.assertFalse(ReservaStock.objects.exists())
+        self.assertEqual(CheckoutPendiente.objects.get(stripe_checkout_session_id=session_id).estado, 'expirado')
+
+
+class PagoCuotasTests(VentasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        success, data, _ = VentaService.crear_venta_con_cuotas(self.datos_venta(3, (self.camara, 3)), self.usuario)
+        self.assertTrue(success, data)
+        self.cuotas = list(Cuota.objects.order_by('numero_cuota'))
+
+    def evento_intent_pagado(self, intent_id, event_id):
+        intent = dict(obtener_stripe().objetos[intent_id], status='succeeded')
+        return {'id': event_id, 'type': 'payment_intent.succeeded', 'data': {'object': intent}}
+
+    def aplicar(self, *eventos):
+        WebhookService.registrar_eventos(list(eventos))
+        for evento_guardado in WebhookService.reclamar_eventos():
+            self.assertTrue(WebhookService.procesar_evento(evento_guardado))
+
+    def test_pago_combinado_cancela_el_intent_abierto_de_la_cuota(self):
+        success, data, _ = CuotaService.crear_payment_intent_cuota(self.cuotas[0])
+        self.assertTrue(success, data)
+        intent_cuota = data['payment_intent_id']
+
+        success, data, _ = CuotaService.crear_pago_cuotas({'todas': True}, self.usuario)
+        self.assertTrue(success, data)
+
+        self.assertEqual(obtener_stripe().objetos[intent_cuota]['status'], 'canceled')
+        self.assertNotEqual(data['payment_intent_id'], intent_cuota)
+
+    def test_cuota_cobrada_dos_veces_se_reembolsa(self):
+        success, data, _ = CuotaService.crear_payment_intent_cuota(self.cuotas[0])
+        intent_cuota = data['payment_intent_id']
+        self.aplicar(self.evento_intent_pagado(intent_cuota, 'evt_cuota'))
+
+        # Un pago combinado que incluye la cuota ya pagada llega a cobrarse igual
+        intent_total = obtener_stripe().crear_payment_intent(
+            amount=sum(int(c.monto * 100) for c in self.cuotas), currency='usd', metadata={'cuota_ids': ','.join(str(c.idCuota) for c in self.cuotas)}
+        ).id
+        evento = self.evento_intent_pagado(intent_total, 'evt_total')
+        self.aplicar(evento)
+        for evento_guardado in WebhookService.reclamar_eventos_por_id(['evt_total'], reaplicar=True):
+            self.assertTrue(WebhookService.procesar_evento(evento_guardado))
+
+        self.assertFalse(Cuota.objects.filter(pagada=False).exists())
+        duplicado = PagoDuplicado.objects.get()
+        self.assertEqual((duplicado.cuota_id, duplicado.stripe_id), (self.cuotas[0].idCuota, intent_total))
+        self.assertEqual(duplicado.estado, 'reembolsado')
+        reembolso = obtener_stripe().objetos[duplicado.stripe_refund_id]
+        self.assertEqual((reembolso['payment_intent'], reembolso['amount']), (intent_total, int(round(self.cuotas[0].monto * 100))))
+
+
+    def test_la_mora_se_cobra_con_la_cuota(self):
+        primera = self.cuotas[0]
+        Cuota.objects.filter(idCuota=primera.idCuota).update(fecha_vencimiento=timezone.localdate() - timedelta(days=10))
+
+        ejecucion, afectadas, _ = MoraService.aplicar_mora(tasa_diaria=0.01)
+        # Repetirla el mismo día no suma mora de nuevo
+        MoraService.aplicar_mora(tasa_diaria=0.01)
+
+        primera.refresh_from_db()
+        self.assertEqual(afectadas, 1)
+        self.assertAlmostEqual(primera.monto_mora, primera.monto * 0.1)
+        self.assertAlmostEqual(ejecucion.monto_generado, primera.monto_mora)
+        venta = primera.venta
+        venta.refresh_from_db()
+        self.assertAlmostEqual(venta.saldo_pendiente, sum(c.monto for c in self.cuotas) + primera.monto_mora)
+
+        success, data, _ = CuotaService.crear_payment_intent_cuota(primera)
+        self.assertTrue(success, data)
+        self.assertEqual(
+            obtener_stripe().objetos[data['payment_intent_id']]['amount'],
+            int(round((primera.monto + primera.monto_mora) * 100))
+        )
+
+
+class ConciliacionTests(VentasTestCase):
+
+    def test_dry_run_no_modifica_la_base(self):
+        venta = Venta.objects.create(
+            usuario=self.usuario, metodoPago=self.metodo_pago, subtotal=300, total=300,
+            nrocuotas=3, saldo_pendiente=300
+        )
+        cuota = Cuota.objects.create(
+            venta=venta, usuario=self.usuario, numero_cuota=1, monto=100,
+            fecha_vencimiento=timezone.localdate() + timedelta(days=30),
+            stripe_payment_intent_id='pi_sin_webhook'
+        )
+        session_id = self.crear_checkout((self.camara, 1))
+
+        salida = StringIO()
+        call_command(
+            'conciliar_stripe', '--dry-run', '--falso', '--falso-pagados', '1', '--falso-latencia', '0',
+            stdout=salida
+        )
+
+        # Informa lo que haría...
+        self.assertIn(f'[dry-run] Cuota {cuota.idCuota}', salida.getvalue())
+        self.assertIn(f'[dry-run] Checkout {session_id}', salida.getvalue())
+        # ...sin escribir nada
+        cuota.refresh_from_db()
+        self.assertFalse(cuota.pagada)
+        self.assertEqual(Venta.objects.count(), 1)
+        self.assertEqual(CheckoutPendiente.objects.get().estado, 'pendiente')
+        self.assertEqual(self.stock(self.camara), (5, 1))
+
+    def test_liquida_las_cuotas_del_metadata_del_pago(self):
+        success, data, _ = VentaService.crear_venta_con_cuotas(self.datos_venta(3, (self.camara, 3)), self.usuario)
+        primera, segunda, tercera = Cuota.objects.order_by('numero_cuota')
+        intent = obtener_stripe().crear_payment_intent(
+            amount=20000, currency='usd', metadata={'cuota_ids': f'{primera.idCuota},{segunda.idCuota}'}
+        )
+        obtener_stripe().objetos[intent.id]['status'] = 'succeeded'
+        # La segunda cuota ya apunta a otro intent: solo la primera lleva al pago
+        Cuota.objects.filter(idCuota=primera.idCuota).update(stripe_payment_intent_id=intent.id)
+        Cuota.objects.filter(idCuota=segunda.idCuota).update(stripe_payment_intent_id='pi_reemplazado')
+
+        resumen = ConciliacionService(hilos=1).ejecutar()
+
+        self.assertEqual(resumen['cuotas_pagadas'], 2)
+        self.assertEqual(
+            set(Cuota.objects.filter(pagada=True).values_list('idCuota', 'stripe_payment_intent_id')),
+            {(primera.idCuota, intent.id), (segunda.idCuota, intent.id)}
+        )
+        self.assertFalse(Cuota.objects.get(idCuota=tercera.idCuota).pagada)
@@ -6,8 +6,12 @@ from .views import (
     
     # Cliente - Ventas
     VentaListCreateView,
+    CotizarCarritoView,
+    SolicitudCheckoutDetailView,
     VentaDetailView,
     MisVentasView,
+    MiEstadoCuentaView,
+    MiDeudaView,
     
     # Cliente - Cuotas
     CuotasVentaListView,
@@ -18,6 +22,7 @@ from .views import (
     # Cliente - Pagos Stripe
     CuotaCrearPaymentIntentView,
     CuotaGenerarLinkPagoView,
+    CuotasPagarVariasView,
     
     # Admin - Ventas
     AdminVentasListView,
@@ -30,6 +35,15 @@ from .views import (
     AdminCuotasVencidasView,
     AdminCuotaDetailView,
     AdminEstadisticasCuotasView,
+    AdminMayoresDeudoresView,
+    
+    AdminEstadisticasStripeView,
+    
+    # Admin - Webhooks
+    AdminEstadisticasWebhooksView,
+    
+    # Admin - Integraciones
+    AdminEstadisticasIntegracionesView,
     
     # Webhook
     stripe_webhook,
@@ -50,9 +64,21 @@ urlpatterns = [
     # POST /api/ventas/ - Crear nueva venta (Cliente)
     path('', VentaListCreateView.as_view(), name='venta-list-create'),
     
+    # POST /api/ventas/cotizar/ - Cotizar carrito en todos los planes de cuotas (Público)
+    path('cotizar/', CotizarCarritoView.as_view(), name='cotizar-carrito'),
+    
+    # GET /api/ventas/solicitudes-checkout/{token}/ - Estado de un checkout asíncrono (Cliente)
+    path('solicitudes-checkout/<uuid:token>/', SolicitudCheckoutDetailView.as_view(), name='solicitud-checkout-detail'),
+    
     # GET /api/ventas/mis-ventas/ - Listar mis ventas (Cliente)
     path('mis-ventas/', MisVentasView.as_view(), name='mis-ventas'),
     
+    # GET /api/ventas/mi-estado-cuenta/ - Estado de cuenta con saldo acumulado, paginado (Cliente)
+    path('mi-estado-cuenta/', MiEstadoCuentaView.as_view(), name='mi-estado-cuenta'),
+    
+    # GET /api/ventas/mi-deuda/ - Resumen de mi deuda en cuotas (Cliente)
+    path('mi-deuda/', MiDeudaView.as_view(), name='mi-deuda'),
+    
     # GET /api/ventas/{id}/ - Obtener detalle de mi venta (Cliente)
     path('<int:id_venta>/', VentaDetailView.as_view(), name='venta-detail'),
     
@@ -82,6 +108,9 @@ urlpatterns = [
          CuotaGenerarLinkPagoView.as_view(), 
          name='cuota-generar-link-pago'),
     
+    # POST /api/ventas/cuotas/pagar-varias/ - Pagar varias cuotas con un solo pago (Cliente)
+    path('cuotas/pagar-varias/', CuotasPagarVariasView.as_view(), name='cuotas-pagar-varias'),
+    
     
     # ==================== ADMIN - VENTAS ====================
     # GET /api/ventas/admin/ventas/ - Listar todas las ventas del sistema (Admin)
@@ -110,6 +139,21 @@ urlpatterns = [
     # GET /api/ventas/admin/estadisticas/cuotas/ - Estadísticas de cuotas (Admin)
     path('admin/estadisticas/cuotas/', AdminEstadisticasCuotasView.as_view(), name='admin-estadisticas-cuotas'),
     
+    # GET /api/ventas/admin/deudores/ - Usuarios con mayor saldo pendiente (Admin)
+    path('admin/deudores/', AdminMayoresDeudoresView.as_view(), name='admin-mayores-deudores'),
+    
+    # GET /api/ventas/admin/estadisticas/stripe/ - Llamadas a Stripe evitadas por reutilización (Admin)
+    path('admin/estadisticas/stripe/', AdminEstadisticasStripeView.as_view(), name='admin-estadisticas-stripe'),
+    
+    
+    # ==================== ADMIN - WEBHOOKS ====================
+    # GET /api/ventas/admin/estadisticas/webhooks/ - Lag y throughput de eventos de Stripe (Admin)
+    path('admin/estadisticas/webhooks/', AdminEstadisticasWebhooksView.as_view(), name='admin-estadisticas-webhooks'),
+    
+    # ==================== ADMIN - INTEGRACIONES ====================
+    # GET /api/ventas/admin/estadisticas/integraciones/ - Latencia, errores y circuito por proveedor (Admin)
+    path('admin/estadisticas/integraciones/', AdminEstadisticasIntegracionesView.as_view(), name='admin-estadisticas-integraciones'),
+    
     
     # ==================== WEBHOOK ====================
     # POST /api/ventas/webhook/stripe/ - Webhook de Stripe (sin autenticación)
@@ -4,12 +4,18 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from django.conf import settings
-from django.utils import timezone
 from .services.service_metodo_pago import MetodoPagoService
 from .services.service_venta import VentaService
 from .services.service_cuota import CuotaService
+from .services.service_webhook import WebhookService
+from .services.service_estado_cuenta import EstadoCuentaService
+from .services.service_deuda import DeudaService
+from .services.service_checkout_asincrono import CheckoutAsincronoService
 from .models import Cuota
 from .permissions import IsAdminUser, IsClienteUser
+from integraciones import obtener_stripe
+from si2Backend.condicional import get_condicional
+from integraciones.proveedores import metricas as metricas_integraciones
 import stripe
 import json
 
@@ -40,6 +46,7 @@ class MetodoPagoDetailView(APIView):
 
 # ==================== VENTAS ====================
 
+@get_condicional(DeudaService.validador_usuario)
 class VentaListCreateView(APIView):
     """
     GET /api/ventas/ - Lista todas las ventas (solo las del usuario autenticado)
@@ -47,6 +54,8 @@ class VentaListCreateView(APIView):
     
     Flujos:
     - nrocuotas = 1: Genera Stripe Checkout → pago inmediato → venta creada por webhook
+      Con "asincrono": true responde 202 y el checkout se crea en segundo plano;
+      la URL de pago se obtiene con GET /api/ventas/solicitudes-checkout/{token}/
     - nrocuotas > 1: Crea venta inmediatamente con cuotas → pagar cuotas individualmente después
     """
     permission_classes = [IsAuthenticated]
@@ -61,6 +70,16 @@ class VentaListCreateView(APIView):
         
         # PAGO AL CONTADO (1 cuota) - Usar Stripe Checkout
         if nrocuotas == 1:
+            if request.data.get('asincrono') in (True, 'true', '1', 1):
+                success, result, status_code = CheckoutAsincronoService.encolar_checkout(
+                    request.data, request.user
+                )
+                headers = {
+                    'Location': result['url_estado'],
+                    'Retry-After': str(result['reintentar_en'])
+                } if success else None
+                return Response(result, status=status_code, headers=headers)
+            
             success, result, status_code = VentaService.crear_checkout_session_contado(
                 request.data, request.user
             )
@@ -74,6 +93,17 @@ class VentaListCreateView(APIView):
             return Response(result, status=status_code)
 
 
+class CotizarCarritoView(APIView):
+    """
+    POST /api/ventas/cotizar/ - Cotizar un carrito en todos los planes de cuotas (sin crear la venta)
+    """
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        success, result, status_code = VentaService.cotizar_carrito(request.data)
+        return Response(result, status=status_code)
+
+
 class VentaDetailView(APIView):
     """
     GET /api/ventas/{id}/ - Obtiene una venta con sus detalles y cuotas
@@ -85,6 +115,7 @@ class VentaDetailView(APIView):
         return Response(result, status=status_code)
 
 
+@get_condicional(DeudaService.validador_usuario)
 class MisVentasView(APIView):
     """
     GET /api/ventas/mis-ventas/ - Lista todas las ventas del usuario autenticado
@@ -96,6 +127,46 @@ class MisVentasView(APIView):
         return Response(result, status=status_code)
 
 
+class SolicitudCheckoutDetailView(APIView):
+    """
+    GET /api/ventas/solicitudes-checkout/{token}/?esperar=2 - Estado de un checkout asíncrono
+    (con esperar, aguarda hasta ese número de segundos, como máximo 2, a que termine;
+    mientras siga en curso responde con Retry-After)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, token):
+        success, result, status_code = CheckoutAsincronoService.obtener_solicitud(
+            token, request.user, request.query_params.get('esperar', 0)
+        )
+        headers = {'Retry-After': str(result['reintentar_en'])} if 'reintentar_en' in result else None
+        return Response(result, status=status_code, headers=headers)
+
+
+@get_condicional(DeudaService.validador_usuario)
+class MiEstadoCuentaView(APIView):
+    """
+    GET /api/ventas/mi-estado-cuenta/?cursor=&limite= - Ventas y pagos del usuario con saldo acumulado
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        success, result, status_code = EstadoCuentaService.obtener_estado_cuenta(request.user, request.query_params)
+        return Response(result, status=status_code)
+
+
+@get_condicional(DeudaService.validador_usuario)
+class MiDeudaView(APIView):
+    """
+    GET /api/ventas/mi-deuda/ - Saldo pendiente, cuotas pendientes y próximo vencimiento del usuario
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        success, result, status_code = DeudaService.obtener_resumen_usuario(request.user)
+        return Response(result, status=status_code)
+
+
 # ==================== CUOTAS ====================
 
 class CuotasVentaListView(APIView):
@@ -109,6 +180,7 @@ class CuotasVentaListView(APIView):
         return Response(result, status=status_code)
 
 
+@get_condicional(DeudaService.validador_usuario)
 class MisCuotasView(APIView):
     """
     GET /api/ventas/mis-cuotas/ - Lista todas las cuotas del usuario
@@ -120,6 +192,7 @@ class MisCuotasView(APIView):
         return Response(result, status=status_code)
 
 
+@get_condicional(DeudaService.validador_usuario)
 class MisCuotasPendientesView(APIView):
     """
     GET /api/ventas/mis-cuotas/pendientes/ - Lista cuotas pendientes del usuario
@@ -153,10 +226,10 @@ class CuotaCrearPaymentIntentView(APIView):
     
     def post(self, request, id_cuota):
         try:
-            cuota = Cuota.objects.select_related('venta__usuario').get(idCuota=id_cuota)
+            cuota = Cuota.objects.select_related('venta').get(idCuota=id_cuota)
             
             # Verificar que la cuota pertenece al usuario
-            if cuota.venta.usuario.idUsuario != request.user.idUsuario:
+            if cuota.usuario_id != request.user.idUsuario:
                 return Response({'error': 'No autorizado'}, status=403)
             
             # Verificar que no esté pagada
@@ -182,10 +255,10 @@ class CuotaGenerarLinkPagoView(APIView):
     
     def post(self, request, id_cuota):
         try:
-            cuota = Cuota.objects.select_related('venta__usuario').get(idCuota=id_cuota)
+            cuota = Cuota.objects.select_related('venta').get(idCuota=id_cuota)
             
             # Verificar que la cuota pertenece al usuario
-            if cuota.venta.usuario.idUsuario != request.user.idUsuario:
+            if cuota.usuario_id != request.user.idUsuario:
                 return Response({'error': 'No autorizado'}, status=403)
             
             # Verificar que no esté pagada
@@ -202,6 +275,18 @@ class CuotaGenerarLinkPagoView(APIView):
             return Response({'error': str(e)}, status=500)
 
 
+class CuotasPagarVariasView(APIView):
+    """
+    POST /api/ventas/cuotas/pagar-varias/
+    Crea un solo Payment Intent o link de pago por varias cuotas pendientes (o todas)
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        success, result, status_code = CuotaService.crear_pago_cuotas(request.data, request.user)
+        return Response(result, status=status_code)
+
+
 # ==================== WEBHOOK STRIPE ====================
 
 @csrf_exempt
@@ -209,97 +294,37 @@ def stripe_webhook(request):
     """
     POST /api/ventas/webhook/stripe/
     Webhook de Stripe para confirmar pagos automáticamente.
-    Maneja eventos de:
+    
+    Solo verifica la firma y guarda el evento en la bandeja (deduplicado por
+    ID de evento), y responde 200 de inmediato. Los eventos se procesan de
+    forma asíncrona con: python manage.py procesar_eventos_stripe
+    
+    Eventos manejados:
     - payment_intent.succeeded (pago dentro de Flutter)
     - checkout.session.completed (pago con link externo Web)
+    - checkout.session.expired (libera el stock reservado del checkout)
+    - payment_intent.payment_failed
     """
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
     
-    # Configurar Stripe
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-    
     try:
         # Verificar firma del webhook
-        event = stripe.Webhook.construct_event(
+        obtener_stripe().construir_evento(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
+        evento = json.loads(payload)
     except ValueError:
         # Payload inválido
         return HttpResponse(status=400)
-    except stripe.error.SignatureVerificationError:
+    except stripe.SignatureVerificationError:
         # Firma inválida
         return HttpResponse(status=400)
     except Exception as e:
         return HttpResponse(status=400)
     
-    # Manejar el evento
-    event_type = event['type']
-    
-    # ==================== PAYMENT INTENT (FLUTTER) ====================
-    if event_type == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        
-        # Obtener metadata
-        cuota_id = payment_intent['metadata'].get('cuota_id')
-        
-        if cuota_id:
-            try:
-                cuota = Cuota.objects.get(idCuota=cuota_id)
-                
-                # Marcar cuota como pagada
-                if not cuota.pagada:
-                    cuota.pagada = True
-                    cuota.fecha_pago = timezone.now().date()
-                    cuota.stripe_payment_intent_id = payment_intent['id']
-                    cuota.save()
-                    
-                    print(f"✅ Cuota {cuota_id} pagada exitosamente (Payment Intent)")
-            except Cuota.DoesNotExist:
-                print(f"❌ Cuota {cuota_id} no encontrada")
-    
-    # ==================== CHECKOUT SESSION (WEB) ====================
-    elif event_type == 'checkout.session.completed':
-        checkout_session = event['data']['object']
-        
-        # Obtener metadata
-        tipo = checkout_session['metadata'].get('tipo')
-        
-        # Si es VENTA AL CONTADO (1 cuota), crear la venta
-        if tipo == 'venta_contado':
-            success, venta = VentaService.crear_venta_desde_webhook(checkout_session)
-            if success:
-                print(f"✅ Venta al contado creada desde webhook: ID {venta.idVenta}")
-            else:
-                print(f"❌ Error creando venta al contado desde webhook")
-        
-        # Si es pago de CUOTA INDIVIDUAL, marcar como pagada
-        else:
-            cuota_id = checkout_session['metadata'].get('cuota_id')
-            
-            if cuota_id:
-                try:
-                    cuota = Cuota.objects.get(idCuota=cuota_id)
-                    
-                    # Marcar cuota como pagada
-                    if not cuota.pagada:
-                        cuota.pagada = True
-                        cuota.fecha_pago = timezone.now().date()
-                        cuota.stripe_checkout_session_id = checkout_session['id']
-                        cuota.save()
-                        
-                        print(f"✅ Cuota {cuota_id} pagada exitosamente (Checkout Session)")
-                except Cuota.DoesNotExist:
-                    print(f"❌ Cuota {cuota_id} no encontrada")
-    
-    # ==================== PAYMENT INTENT FAILED ====================
-    elif event_type == 'payment_intent.payment_failed':
-        payment_intent = event['data']['object']
-        cuota_id = payment_intent['metadata'].get('cuota_id')
-        
-        if cuota_id:
-            print(f"❌ Pago fallido para cuota {cuota_id}")
-            # Aquí podrías enviar una notificación al usuario
+    # Guardar el evento en la bandeja; los reintentos de Stripe se ignoran
+    WebhookService.registrar_evento(evento['id'], evento['type'], evento)
     
     # Retornar 200 a Stripe
     return HttpResponse(status=200)
@@ -331,12 +356,12 @@ class AdminVentaDetailView(APIView):
 
 class AdminEstadisticasVentasView(APIView):
     """
-    GET /api/ventas/admin/ventas/estadisticas/ - Obtiene estadísticas de ventas
+    GET /api/ventas/admin/ventas/estadisticas/?desde=&hasta=&granularidad=dia|semana|mes - Obtiene estadísticas de ventas
     """
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        success, result, status_code = VentaService.obtener_estadisticas_ventas()
+        success, result, status_code = VentaService.obtener_estadisticas_ventas(request.query_params)
         return Response(result, status=status_code)
 
 
@@ -395,3 +420,52 @@ class AdminEstadisticasCuotasView(APIView):
     def get(self, request):
         success, result, status_code = CuotaService.obtener_estadisticas_cuotas()
         return Response(result, status=status_code)
+
+
+class AdminMayoresDeudoresView(APIView):
+    """
+    GET /api/ventas/admin/deudores/?limite=20 - Usuarios con mayor saldo pendiente
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        success, result, status_code = DeudaService.listar_mayores_deudores(request.query_params.get('limite', 20))
+        return Response(result, status=status_code)
+
+
+class AdminEstadisticasStripeView(APIView):
+    """
+    GET /api/ventas/admin/estadisticas/stripe/ - Llamadas a Stripe realizadas y evitadas por reutilización
+    (contadores del proceso que atiende la petición)
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        success, result, status_code = CuotaService.obtener_metricas_stripe()
+        return Response(result, status=status_code)
+
+
+# ==================== ADMIN - WEBHOOKS ====================
+
+class AdminEstadisticasWebhooksView(APIView):
+    """
+    GET /api/ventas/admin/estadisticas/webhooks/ - Lag y throughput de la bandeja de eventos de Stripe
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        success, result, status_code = WebhookService.obtener_estadisticas()
+        return Response(result, status=status_code)
+
+
+# ==================== ADMIN - INTEGRACIONES ====================
+
+class AdminEstadisticasIntegracionesView(APIView):
+    """
+    GET /api/ventas/admin/estadisticas/integraciones/ - Latencia, errores y estado del circuito de Stripe, Firebase y Cloudinary
+    (contadores del proceso que atiende la petición)
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(metricas_integraciones())